@@ -0,0 +1,64 @@
+"""
+Shows how `XmlUpdater.handle_additional_apps` scales with the number of additional applications in a file.
+
+Run from the repository root: python -m benchmarks.bench_additional_apps
+"""
+
+from lxml import etree as ET
+
+import time
+import uuid
+
+from src.util.xml_updater import XmlUpdater
+
+APP_COUNTS = [10_000, 20_000, 40_000]
+EDITED_GAMES = 100
+
+
+def generate_root(app_count: int) -> ET.Element:
+    root = ET.Element("LaunchBox")
+
+    # Two additional applications per game
+    for game_index in range(app_count // 2):
+        game_id = str(uuid.UUID(int=game_index))
+
+        for app_name in ("Extras", "Message"):
+            app = ET.SubElement(root, "AdditionalApplication")
+            ET.SubElement(app, "Id").text = str(uuid.uuid4())
+            ET.SubElement(app, "GameID").text = game_id
+            ET.SubElement(app, "Name").text = app_name
+            ET.SubElement(app, "ApplicationPath").text = ":extras:"
+            ET.SubElement(app, "CommandLine").text = "extras"
+
+    return root
+
+
+def time_edits(app_count: int, regroup_every_call: bool) -> float:
+    root = generate_root(app_count)
+    updater = XmlUpdater()
+
+    start = time.perf_counter()
+
+    for game_index in range(EDITED_GAMES):
+        if regroup_every_call:
+            # What every call used to cost: a scan over all of the additional applications
+            updater.additional_apps_by_game = None
+
+        game_id = str(uuid.UUID(int=game_index))
+        updater.handle_additional_apps(root, game_id, {"Extras": "edited", "Message": {"CommandLine": "edited"}}, [])
+
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"Editing the additional applications of {EDITED_GAMES} games")
+    print(f"{'apps':>8} {'rescanning (s)':>16} {'grouped once (s)':>18}")
+
+    for app_count in APP_COUNTS:
+        rescanning = time_edits(app_count, True)
+        grouped = time_edits(app_count, False)
+        print(f"{app_count:>8} {rescanning:>16.3f} {grouped:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares `ChangesParser.parse_changes_str` with the libyaml and pure Python loaders on a scaled up
+copy of tests/big_changes.yml.
+
+Run from the repository root: python -m benchmarks.bench_changes_parser
+"""
+
+import re
+import time
+import uuid
+
+import yaml
+
+from src.util.xml_updater import ChangesParser
+
+COPIES = [1, 10, 50]
+
+
+def scale_changes(changes_str: str, copies: int) -> str:
+    """Repeats the changes `copies` times, giving every document a new game ID."""
+    documents = []
+
+    for _ in range(copies):
+        documents.append(re.sub(r"^GAME: .*$", lambda _: f"GAME: {uuid.uuid4()}", changes_str, flags=re.MULTILINE).strip())
+
+    return "\n---\n".join(documents)
+
+
+def time_parse(changes_str: str, loader: type) -> float:
+    start = time.perf_counter()
+    ChangesParser.parse_changes_str(changes_str, loader=loader)
+    return time.perf_counter() - start
+
+
+def main():
+    with open("tests/big_changes.yml", encoding="utf8") as file:
+        big_changes = file.read()
+
+    loaders = [yaml.SafeLoader]
+    if hasattr(yaml, "CSafeLoader"):
+        loaders.append(yaml.CSafeLoader)
+    else:
+        print("libyaml isn't available, only timing the pure Python loader")
+
+    print(f"{'documents':>10}" + "".join(f"{loader.__name__ + ' (s)':>18}" for loader in loaders))
+
+    for copies in COPIES:
+        changes_str = scale_changes(big_changes, copies)
+        document_count = len(re.findall("^GAME:", changes_str, flags=re.MULTILINE))
+
+        timings = [time_parse(changes_str, loader) for loader in loaders]
+        print(f"{document_count:>10}" + "".join(f"{timing:>18.3f}" for timing in timings))
+
+
+if __name__ == "__main__":
+    main()
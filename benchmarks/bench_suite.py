@@ -0,0 +1,188 @@
+"""
+Times every phase of applying a changes file to a generated platform XML file, and optionally compares
+the results with a baseline saved by an earlier run to catch regressions.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite --games 10000 --output results.json
+    python -m benchmarks.bench_suite --games 10000 --baseline results.json
+
+The exit code is 1 if any phase got slower than the baseline by more than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from lxml import etree as ET
+
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.library_generator import write_platform_xml, generate_changes
+from src.util.xml_updater import ChangesParser, XmlUpdater, explain_changes
+from src.util.xml_writer import write_full, write_minimal
+from src.util.backup_store import BackupStore
+from src.util.id_scan import locate_games
+
+# Phases that take less than this (in seconds) are too noisy to compare with a baseline
+MIN_COMPARED_SECONDS = 0.005
+
+WHITELIST = ["Notes", "Genre"]
+
+
+class TimedXmlUpdater(XmlUpdater):
+    """Adds up the time spent on additional applications, which is otherwise part of updating each game."""
+
+    def __init__(self):
+        super().__init__()
+        self.additional_apps_seconds = 0.0
+
+    def handle_additional_apps(self, xml_root: ET.Element, game_id: str, changes: dict, create_elements_whitelist: list):
+        start = time.perf_counter()
+        super().handle_additional_apps(xml_root, game_id, changes, create_elements_whitelist)
+        self.additional_apps_seconds += time.perf_counter() - start
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark every phase of applying a changes file.")
+    parser.add_argument("--games", type=int, default=10_000, help="games in the generated platform file (1k to 500k)")
+    parser.add_argument("--changes", type=int, default=1_000, help="games edited by the generated changes file")
+    parser.add_argument("--app-ratio", type=float, default=0.5, help="additional applications per game")
+    parser.add_argument("--text-length", type=int, default=600, help="characters of Notes and OriginalDescription")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every phase, the fastest one is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="where to save the results as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="how much slower (0.2 = 20%%) a phase may get")
+
+    return parser.parse_args(argv)
+
+
+def run_once(xml_path: str, changes_str: str, work_dir: str) -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+
+    def timed(phase: str, function: Callable):
+        start = time.perf_counter()
+        value = function()
+        timings[phase] = time.perf_counter() - start
+        return value
+
+    changes = timed("parse_changes_str", lambda: ChangesParser.parse_changes_str(changes_str))
+    timed("prescan", lambda: locate_games(os.path.dirname(xml_path), changes))
+
+    updater = TimedXmlUpdater()
+    tree, games_changed, games_failed = timed("get_updated_xml", lambda: updater.get_updated_xml(changes, xml_path, WHITELIST))
+    timings["handle_additional_apps"] = updater.additional_apps_seconds
+
+    if games_failed:
+        raise RuntimeError(f"{len(games_failed)} games failed to update, the generated changes are broken")
+
+    output_path = os.path.join(work_dir, "output.xml")
+    timed("serialize_full", lambda: write_full(tree, output_path))
+    timed("serialize_minimal", lambda: write_minimal(tree, xml_path, updater.modified_elements, updater.created_elements, output_path))
+
+    # A new store every time, otherwise the object would already exist and nothing would be compressed
+    store = BackupStore(tempfile.mkdtemp(dir=work_dir), 2 ** 40)
+
+    def backup():
+        backup_run = store.start_run(os.path.dirname(xml_path))
+        backup_run.backup_file(os.path.basename(xml_path), xml_path, updater.journal)
+        backup_run.finish()
+
+    timed("backup", backup)
+    timed("explain_changes", lambda: explain_changes(changes))
+
+    return timings
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Alone in its directory, so the pre-scan doesn't search the output too
+        os.mkdir(os.path.join(work_dir, "Platforms"))
+        xml_path = os.path.join(work_dir, "Platforms", "Flash.xml")
+
+        game_ids = write_platform_xml(xml_path, args.games, args.app_ratio, args.text_length, args.seed)
+        changes_str = generate_changes(game_ids, args.changes, args.app_ratio, args.text_length, args.seed)
+
+        runs = [run_once(xml_path, changes_str, work_dir) for _ in range(args.repeat)]
+
+        return {
+            "config": {
+                "games": args.games,
+                "changes": args.changes,
+                "app_ratio": args.app_ratio,
+                "text_length": args.text_length,
+                "xml_mb": round(os.path.getsize(xml_path) / (1024 * 1024), 2),
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "lxml": ".".join(str(part) for part in ET.LXML_VERSION),
+                "machine": platform.machine(),
+            },
+            "timings": {phase: round(min(run[phase] for run in runs), 4) for phase in runs[0]},
+        }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Returns the phases that got slower than in `baseline` by more than `tolerance`."""
+    regressions = []
+
+    if results["config"] != baseline["config"]:
+        print("Warning: the baseline was run with different settings, the comparison is meaningless")
+
+    print(f"{'phase':<24} {'baseline (s)':>14} {'now (s)':>10} {'change':>8}")
+
+    for phase, seconds in results["timings"].items():
+        baseline_seconds = baseline["timings"].get(phase)
+
+        if baseline_seconds is None:
+            print(f"{phase:<24} {'-':>14} {seconds:>10.4f}")
+            continue
+
+        change = (seconds - baseline_seconds) / baseline_seconds if baseline_seconds else 0.0
+        regressed = change > tolerance and max(seconds, baseline_seconds) >= MIN_COMPARED_SECONDS
+
+        if regressed:
+            regressions.append(phase)
+
+        print(f"{phase:<24} {baseline_seconds:>14.4f} {seconds:>10.4f} {change:>+8.0%}" + ("  REGRESSION" if regressed else ""))
+
+    return regressions
+
+
+def print_throughput(results: dict):
+    # The pre-scan stops at the last game it looks for, which the generated changes spread over the whole file
+    prescan_seconds = results["timings"]["prescan"]
+    if prescan_seconds:
+        print(f"Pre-scan throughput: {results['config']['xml_mb'] / 1024 / prescan_seconds:.2f} GB/s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = run_benchmarks(args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf8") as file:
+            baseline = json.load(file)
+
+        regressions = compare(results, baseline, args.tolerance)
+        print_throughput(results)
+        return 1 if regressions else 0
+
+    print(f"{args.games} games ({results['config']['xml_mb']} MB), {args.changes} changed")
+    for phase, seconds in results["timings"].items():
+        print(f"{phase:<24} {seconds:>10.4f} s")
+    print_throughput(results)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Generates platform XML files shaped like the ones in a Flashpoint library, along with changes files
+editing them, so the rest of the benchmarks can run at any size without a copy of the real data.
+
+Everything is seeded, so the same arguments always give the same files.
+"""
+
+import random
+import uuid
+
+from typing import List
+
+WORDS = [
+    "adventure", "arcade", "puzzle", "shooter", "platform", "racing", "point", "click", "escape", "room",
+    "flash", "unity", "shockwave", "game", "level", "player", "score", "collect", "avoid", "enemies",
+    "keys", "mouse", "arrow", "jump", "run", "build", "defend", "tower", "castle", "space",
+]
+
+PLATFORMS = ["Flash", "Unity", "Shockwave", "HTML5", "Java"]
+GENRES = ["Action", "Puzzle", "Arcade", "Adventure", "Driving", "Toy", "Simulation"]
+
+
+def get_game_id(index: int) -> str:
+    return str(uuid.UUID(int=index + 1))
+
+
+def get_app_id(index: int, app_index: int) -> str:
+    return str(uuid.UUID(int=(app_index + 1) << 64 | index + 1))
+
+
+def get_text(rng: random.Random, length: int) -> str:
+    """Returns about `length` characters of words split into sentences."""
+    words = []
+    size = 0
+
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word if len(words) % 12 else word.capitalize())
+        size += len(word) + 1
+
+    return " ".join(words) + "."
+
+
+def write_platform_xml(file_path: str, game_count: int, app_ratio: float = 0.5, text_length: int = 600, seed: int = 0) -> List[str]:
+    """
+    Writes a platform XML file with `game_count` games, on average `app_ratio` additional applications per
+    game and `Notes` and `OriginalDescription` of about `text_length` characters. Returns the game IDs.
+    """
+    rng = random.Random(seed)
+    game_ids = []
+    apps = []
+
+    with open(file_path, "w", encoding="utf8", newline="\n") as file:
+        file.write("<LaunchBox>\n")
+
+        for index in range(game_count):
+            game_id = get_game_id(index)
+            game_ids.append(game_id)
+
+            file.write(
+                "  <Game>\n"
+                f"    <ID>{game_id}</ID>\n"
+                f"    <Title>{get_text(rng, 20).rstrip('.').title()}</Title>\n"
+                "    <Series/>\n"
+                f"    <Developer>{rng.choice(WORDS).title()} Studios</Developer>\n"
+                "    <Publisher/>\n"
+                f"    <Platform>{rng.choice(PLATFORMS)}</Platform>\n"
+                "    <DateAdded>2019-07-21T00:11:44.471230+00:00</DateAdded>\n"
+                "    <Broken>false</Broken>\n"
+                "    <Hide>false</Hide>\n"
+                "    <PlayMode>Single Player</PlayMode>\n"
+                "    <Status>Playable</Status>\n"
+                f"    <Notes>{get_text(rng, text_length)}</Notes>\n"
+                f"    <Genre>{rng.choice(GENRES)}</Genre>\n"
+                f"    <Source>https://{rng.choice(WORDS)}.com/</Source>\n"
+                "    <ApplicationPath>FPSoftware\\Flash\\flashplayer_32_sa.exe</ApplicationPath>\n"
+                f"    <CommandLine>http://www.{rng.choice(WORDS)}.com/games/{index}.swf</CommandLine>\n"
+                "    <ReleaseDate>2009</ReleaseDate>\n"
+                "    <Version/>\n"
+                f"    <OriginalDescription>{get_text(rng, text_length)}</OriginalDescription>\n"
+                "    <Language>en</Language>\n"
+                "  </Game>\n"
+            )
+
+            # Whole applications for the integer part of the ratio, and maybe one more for the rest
+            app_count = int(app_ratio) + (rng.random() < app_ratio - int(app_ratio))
+            for app_index in range(app_count):
+                apps.append((index, app_index))
+
+        # Like in the real files, every additional application comes after the games
+        for index, app_index in apps:
+            name = "Extras" if app_index == 0 else f"Alternate {app_index}"
+
+            file.write(
+                "  <AdditionalApplication>\n"
+                f"    <Id>{get_app_id(index, app_index)}</Id>\n"
+                f"    <GameID>{get_game_id(index)}</GameID>\n"
+                f"    <Name>{name}</Name>\n"
+                "    <ApplicationPath>:extras:</ApplicationPath>\n"
+                f"    <CommandLine>{rng.choice(WORDS)}</CommandLine>\n"
+                "    <AutoRunBefore>false</AutoRunBefore>\n"
+                "    <WaitForExit>false</WaitForExit>\n"
+                "  </AdditionalApplication>\n"
+            )
+
+        file.write("</LaunchBox>\n")
+
+    return game_ids
+
+
+def generate_changes(game_ids: List[str], change_count: int, app_ratio: float = 0.5, text_length: int = 600, seed: int = 0) -> str:
+    """
+    Returns a changes file editing `change_count` of `game_ids`, picked evenly across the file. A share of
+    them, following `app_ratio`, also edit their extras and create a message.
+    """
+    rng = random.Random(seed)
+    step = max(1, len(game_ids) // max(1, change_count))
+    documents = []
+
+    for game_id in game_ids[::step][:change_count]:
+        lines = [
+            f"GAME: {game_id}",
+            f"Title: {get_text(rng, 20).rstrip('.').title()}",
+            "Genre: Puzzle; Arcade",
+            "Notes: |",
+            *("    " + line for line in get_text(rng, text_length).split(". ")),
+        ]
+
+        if rng.random() < min(1.0, app_ratio):
+            lines += [
+                "Additional Applications:",
+                "    Extras: edited",
+                "    Message: Click to start",
+            ]
+
+        documents.append("\n".join(lines))
+
+    return "\n---\n".join(documents) + "\n"
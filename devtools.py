@@ -1,34 +1,44 @@
 import tkinter as tk
 import tkinter.ttk as ttk
 
+from multiprocessing import freeze_support
+
 from src.ui.metadata_editor import MetadataEditorTab
 
 WINDOW_WIDTH = 550
-WINDOW_HEIGHT = 200
+WINDOW_HEIGHT = 240
+
+
+def main():
+    root = tk.Tk()
+    root.title("Flashpoint DevTools")
+
+    root.iconbitmap("icon.ico")
 
-root = tk.Tk()
-root.title("Flashpoint DevTools")
+    root.minsize(WINDOW_WIDTH, WINDOW_HEIGHT)
+    root.maxsize(WINDOW_WIDTH, WINDOW_HEIGHT)
+    root.resizable(False, False)
 
-root.iconbitmap("icon.ico")
+    root.rowconfigure(0, weight=1)
+    root.columnconfigure(0, weight=1)
 
-root.minsize(WINDOW_WIDTH, WINDOW_HEIGHT)
-root.maxsize(WINDOW_WIDTH, WINDOW_HEIGHT)
-root.resizable(False, False)
+    style = ttk.Style()
+    style.configure("MY.TFrame", background="white")
+    style.configure("MY.TLabel", background="white")
 
-root.rowconfigure(0, weight=1)
-root.columnconfigure(0, weight=1)
+    style.configure("WARN.TLabel", background="white", foreground="red")
 
-style = ttk.Style()
-style.configure("MY.TFrame", background="white")
-style.configure("MY.TLabel", background="white")
+    note = ttk.Notebook(root)
 
-style.configure("WARN.TLabel", background="white", foreground="red")
+    tab1 = MetadataEditorTab(note, style="MY.TFrame")
 
-note = ttk.Notebook(root)
+    note.add(tab1, text="Metadata Editor", padding="24px 0px")
+    note.grid(sticky=tk.NW + tk.SE)
 
-tab1 = MetadataEditorTab(note, style="MY.TFrame")
+    root.mainloop()
 
-note.add(tab1, text="Metadata Editor", padding="24px 0px")
-note.grid(sticky=tk.NW + tk.SE)
 
-root.mainloop()
+# Worker processes import this module too, they shouldn't open a window
+if __name__ == "__main__":
+    freeze_support()
+    main()
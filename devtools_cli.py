@@ -0,0 +1,185 @@
+"""
+Applies one or more changes files to a directory of platform XML files without opening a window, and writes
+a JSON summary of what happened. Meant for scheduled jobs, so it never imports tkinter.
+
+Usage: python devtools_cli.py XML_DIRECTORY CHANGES_FILE [CHANGES_FILE ...] [--summary summary.json] [--dry-run] [--merge]
+       python devtools_cli.py XML_DIRECTORY CHANGES_FILE_OR_FOLDER [...] --watch [--interval 0.5]
+
+The exit code is 0 if every change was applied, 1 if some games failed or weren't found and 2 if a
+changes file couldn't be applied at all. With --watch, the changes files are applied every time they're
+saved until interrupted, writing a JSON summary of every run on its own line.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from multiprocessing import freeze_support
+from typing import List, Optional, TextIO
+
+from src.util.config import BASE_DIR, ELEMENTS_WHITELIST_PATH, SETTINGS_PATH, load_elements_whitelist
+from src.util.instrumentation import Instrumentation
+from src.util.runner import ChangesRunner
+from src.util.changes_watcher import ChangesWatcher
+from src.util.settings import load_settings
+
+EXIT_OK = 0
+EXIT_GAMES_FAILED = 1
+EXIT_ERROR = 2
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Apply changes files to platform XML files without the UI.")
+    parser.add_argument("xml_directory", help="directory containing the platform XML files")
+    parser.add_argument("changes_files", nargs="+", help="changes files to apply, in order")
+    parser.add_argument("--summary", help="where to write the JSON summary (default: standard output)")
+    parser.add_argument("--settings", default=SETTINGS_PATH, help="settings.json to use")
+    parser.add_argument("--whitelist", default=ELEMENTS_WHITELIST_PATH, help="elements whitelist to use")
+    parser.add_argument("--data-dir", default=BASE_DIR, help="where the index, caches and backups are kept")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would fail, without writing anything")
+    parser.add_argument("--merge", action="store_true", help="apply every changes file together, in one pass over each XML file")
+    parser.add_argument("--watch", action="store_true", help="apply the changes files (or every changes file in the given folders) each time they're saved")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between looking for saves with --watch")
+
+    return parser.parse_args(argv)
+
+
+def check_changeset(runner: ChangesRunner, xml_directory: str, changes: dict, instrumentation: Instrumentation) -> dict:
+    problems, missing_games = runner.check(xml_directory, changes, instrumentation)
+
+    return {
+        "problems": [
+            {"game_id": game_id, "type": type(problem).__name__, "error": str(problem)}
+            for game_id, game_problems in problems.items() for problem in game_problems
+        ],
+        "missing": missing_games,
+        **instrumentation.to_json()
+    }
+
+
+def run_changesets(runner: ChangesRunner, xml_directory: str, changes_files: List[str], dry_run: bool = False, merge: bool = False) -> dict:
+    """
+    Applies every changes file in turn, or only checks them with `dry_run`. A changes file that can't be
+    applied doesn't stop the others. With `merge`, the changes files are applied together as a single
+    changeset instead, which fails as a whole if they conflict.
+    """
+    summary = {"xml_directory": xml_directory, "dry_run": dry_run, "changesets": []}
+    exit_code = EXIT_OK
+    start = time.perf_counter()
+
+    groups = [changes_files] if merge else [[changes_file] for changes_file in changes_files]
+
+    for group in groups:
+        changeset = {"changes_files": group} if merge else {"changes_file": group[0]}
+        # The summary always has timings, whatever the settings say
+        instrumentation = Instrumentation()
+
+        try:
+            changes = runner.parse_changes_files(group, instrumentation)
+
+            if dry_run:
+                changeset.update(check_changeset(runner, xml_directory, changes, instrumentation))
+                has_errors = len(changeset["problems"]) > 0 or len(changeset["missing"]) > 0
+            else:
+                run_summary = runner.run(xml_directory, changes, instrumentation)
+                changeset.update(run_summary.to_json())
+                has_errors = run_summary.has_errors()
+
+            if has_errors:
+                exit_code = max(exit_code, EXIT_GAMES_FAILED)
+        except Exception as e:
+            changeset["error"] = {"type": type(e).__name__, "error": str(e)}
+            changeset.update(instrumentation.to_json())
+            exit_code = EXIT_ERROR
+
+        summary["changesets"].append(changeset)
+
+    summary["timings"] = {"total": round(time.perf_counter() - start, 4)}
+
+    if runner.tree_cache is not None:
+        summary["tree_cache"] = {"hits": runner.tree_cache.hits, "misses": runner.tree_cache.misses}
+
+    summary["exit_code"] = exit_code
+    return summary
+
+
+def watch_changes(runner: ChangesRunner, xml_directory: str, changes_paths: List[str], interval: float, output: TextIO, max_polls: Optional[int] = None) -> int:
+    """
+    Applies the games that changed every time a changes file is saved, until interrupted or `max_polls` polls
+    have been made. Errors are written out like summaries and don't stop watching.
+    """
+    watcher = ChangesWatcher(runner, xml_directory, changes_paths)
+    polls = 0
+
+    try:
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            instrumentation = Instrumentation()
+
+            try:
+                run_summary = watcher.poll(instrumentation)
+                line = None if run_summary is None else run_summary.to_json()
+            except Exception as e:
+                line = {"error": {"type": type(e).__name__, "error": str(e)}, **instrumentation.to_json()}
+
+            if line is not None:
+                json.dump({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **line}, output)
+                output.write("\n")
+                output.flush()
+
+            if max_polls is None or polls < max_polls:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+    watcher.stop()
+    return EXIT_OK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    try:
+        settings = load_settings(args.settings)
+        create_elements_whitelist = load_elements_whitelist(args.whitelist)
+    except FileNotFoundError:
+        print(f"Elements whitelist not found: {args.whitelist}", file=sys.stderr)
+        return EXIT_ERROR
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        return EXIT_ERROR
+
+    # One runner for every changes file, so the trees loaded by the first one are reused by the next
+    runner = ChangesRunner(settings, create_elements_whitelist, args.data_dir)
+
+    try:
+        recovered = runner.recover_interrupted_run(args.xml_directory)
+    except Exception as e:
+        print(f"Unable to recover the previous run: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.watch:
+        if args.summary:
+            with open(args.summary, "a", encoding="utf8") as file:
+                return watch_changes(runner, args.xml_directory, args.changes_files, args.interval, file)
+
+        return watch_changes(runner, args.xml_directory, args.changes_files, args.interval, sys.stdout)
+
+    summary = run_changesets(runner, args.xml_directory, args.changes_files, args.dry_run, args.merge)
+    summary["recovered"] = recovered
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf8") as file:
+            json.dump(summary, file, indent=2)
+    else:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+
+    return summary["exit_code"]
+
+
+# Worker processes import this module too, they shouldn't run it again
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
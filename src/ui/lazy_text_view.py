@@ -0,0 +1,147 @@
+import tkinter as tk
+import tkinter.ttk as ttk
+
+from tkinter.font import Font
+
+from typing import Iterable, Optional, Tuple, Union
+
+from src.util.lazy_lines import LazyLines
+
+
+class LazyTextView(ttk.Frame):
+    """
+    A read only text, which can be a string or an iterable of chunks (like `iter_explain_changes`), with a
+    find bar. Only the lines that fit in the widget are put in it, and the chunks are only pulled as far as
+    the user scrolls, so huge reports show up right away.
+    """
+
+    # Lines scrolled by one step of the mouse wheel
+    WHEEL_LINES = 3
+
+    def __init__(self, parent, text: Union[str, Iterable[str]] = "", width: int = 100, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+
+        self.lines = LazyLines([])
+        self.first_line = 0
+        self.visible_lines = 40
+        # Line, column and length of the last search result
+        self.search_match: Optional[Tuple[int, int, int]] = None
+
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.font = Font(size=13)
+        self.text_area = tk.Text(self, font=self.font, width=width)
+        self.text_area.grid(row=0, column=0, sticky=tk.NW + tk.SE)
+        self.text_area.tag_configure("search", background="yellow")
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky=tk.NS)
+
+        self.text_area.bind("<Configure>", self.on_resize)
+        self.text_area.bind("<MouseWheel>", lambda event: self.scroll_by(-self.WHEEL_LINES if event.delta > 0 else self.WHEEL_LINES))
+        self.text_area.bind("<Button-4>", lambda event: self.scroll_by(-self.WHEEL_LINES))
+        self.text_area.bind("<Button-5>", lambda event: self.scroll_by(self.WHEEL_LINES))
+        self.text_area.bind("<Prior>", lambda event: self.scroll_by(-self.visible_lines))
+        self.text_area.bind("<Next>", lambda event: self.scroll_by(self.visible_lines))
+
+        self.search_frame = ttk.Frame(self)
+        self.search_frame.grid(row=1, column=0, columnspan=2, sticky=tk.EW)
+        self.search_frame.columnconfigure(1, weight=1)
+
+        ttk.Label(self.search_frame, text="Find:").grid(row=0, column=0, padx=(20, 5), pady=(10, 0))
+        self.search_entry = ttk.Entry(self.search_frame)
+        self.search_entry.grid(row=0, column=1, sticky=tk.EW, pady=(10, 0))
+        self.search_entry.bind("<Return>", lambda event: self.find_next())
+        ttk.Button(self.search_frame, text="Find next", command=self.find_next).grid(row=0, column=2, padx=5, pady=(10, 0))
+        self.search_status = ttk.Label(self.search_frame, text="", width=12)
+        self.search_status.grid(row=0, column=3, padx=(0, 20), pady=(10, 0))
+
+        self.set_text(text)
+
+    def set_text(self, text: Union[str, Iterable[str]]):
+        self.lines = LazyLines([text] if isinstance(text, str) else text)
+        self.first_line = 0
+        self.search_match = None
+        self.search_status.configure(text="")
+
+        self.render()
+
+    def get_total_lines(self) -> int:
+        # Until every chunk was pulled, pretend there's one more page so the scrollbar can always go further
+        if self.lines.exhausted:
+            return max(1, len(self.lines.lines))
+
+        return len(self.lines.lines) + self.visible_lines
+
+    def render(self):
+        lines = self.lines.get(self.first_line, self.first_line + self.visible_lines)
+
+        self.text_area.configure(state="normal")
+        self.text_area.delete("1.0", tk.END)
+        self.text_area.insert(tk.END, "\n".join(lines))
+
+        if self.search_match is not None:
+            line, column, length = self.search_match
+            row = line - self.first_line + 1
+
+            if 0 < row <= len(lines):
+                self.text_area.tag_add("search", f"{row}.{column}", f"{row}.{column + length}")
+
+        self.text_area.configure(state="disabled")
+
+        total = self.get_total_lines()
+        self.scrollbar.set(self.first_line / total, min(1.0, (self.first_line + self.visible_lines) / total))
+
+    def scroll_to(self, line: int):
+        self.lines.load(line + self.visible_lines)
+
+        last_first_line = max(0, len(self.lines.lines) - self.visible_lines)
+        first_line = max(0, min(line, last_first_line))
+
+        if first_line != self.first_line:
+            self.first_line = first_line
+            self.render()
+
+    def scroll_by(self, lines: int):
+        self.scroll_to(self.first_line + lines)
+        return "break"
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.get_total_lines()))
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.visible_lines)
+        else:
+            self.scroll_by(int(amount))
+
+    def on_resize(self, event):
+        visible_lines = max(1, event.height // self.font.metrics("linespace"))
+
+        if visible_lines != self.visible_lines:
+            self.visible_lines = visible_lines
+            self.render()
+
+    def find_next(self):
+        query = self.search_entry.get()
+
+        if self.search_match is not None:
+            start_line, start_column = self.search_match[0], self.search_match[1] + 1
+        else:
+            start_line, start_column = self.first_line, 0
+
+        found = self.lines.find(query, start_line, start_column)
+
+        if found is None:
+            self.search_match = None
+            self.search_status.configure(text="Not found")
+            self.render()
+            return
+
+        line, column = found
+        self.search_match = (line, column, len(query))
+        self.search_status.configure(text=f"Line {line + 1}")
+
+        # Keep a few lines of context above the match
+        self.scroll_to(max(0, line - 3))
+        self.render()
@@ -1,17 +1,27 @@
 import tkinter as tk
 import tkinter.ttk as ttk
 
-from tkinter.filedialog import askopenfilename, askdirectory
+from tkinter.filedialog import askopenfilenames, askdirectory
 import tkinter.messagebox
 
 import threading
+import queue
+import time
 import os
-from shutil import copy2
 
-from src.util.xml_updater import ChangesParser, XmlUpdater, explain_changes
+from typing import Callable, Dict, List, Optional, Tuple
 
-from src.ui.diff_view_dialog import DiffViewDialog
-from src.ui.error_viewer_dialog import ErrorViewerDialog
+from src.util.xml_updater import ChangesParser
+from src.util.runner import ChangesRunner, RunSummary
+from src.util.changes_merge import ConflictingChanges
+from src.util.changes_watcher import ChangesWatcher
+from src.util.batch_updater import FileResult
+from src.util.progress import Progress, Cancelled, format_progress
+from src.util.settings import load_settings, DEFAULT_SETTINGS
+from src.util.config import BASE_DIR, SETTINGS_PATH, load_elements_whitelist
+
+from src.ui.results_browser import ResultsBrowser
+from src.ui.text_area_modal import TextAreaModal
 
 try:
     import winsound
@@ -19,28 +29,29 @@ except ImportError:
     pass
 
 
-ERROR_LOADING_ELEMENTS_WHITELIST = False
+# How often the main thread looks for what the worker thread posted, in milliseconds
+POLL_INTERVAL_MS = 50
 
-ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
-BASE_DIR = os.path.normpath(ROOT_DIR + "/../..")
+# How often the changes files are checked for saves while watching, in milliseconds
+WATCH_INTERVAL_MS = 500
+
+# Separates the changes files in the entry, which are all applied together
+CHANGES_FILES_SEPARATOR = ";"
+
+ERROR_LOADING_ELEMENTS_WHITELIST = False
 
-BACKUPS_DIR = BASE_DIR + "/xmlbackups"
 try:
-    with open(BASE_DIR + "/elements_whitelist.txt", encoding="utf8") as file:
-        create_elements_whitelist = [line.strip() for line in file if line.strip()]
+    create_elements_whitelist = load_elements_whitelist()
 except FileNotFoundError:
     create_elements_whitelist = []
     ERROR_LOADING_ELEMENTS_WHITELIST = True
 
-
-def backup_xml_file(current_file_path, backup_file_name):
-    if not os.path.isdir(BACKUPS_DIR):
-        os.mkdir(BACKUPS_DIR)
-
-    new_path = f"{BACKUPS_DIR}/{backup_file_name}"
-    copy2(current_file_path, new_path)
-
-    return new_path
+ERROR_LOADING_SETTINGS = None
+try:
+    settings = load_settings(SETTINGS_PATH)
+except Exception as e:
+    settings = dict(DEFAULT_SETTINGS)
+    ERROR_LOADING_SETTINGS = str(e)
 
 
 class MetadataEditorTab(ttk.Frame):
@@ -48,6 +59,13 @@ class MetadataEditorTab(ttk.Frame):
         super().__init__(parent, *args, **kwargs)
 
         self.generating_xml = False
+        # Functions (and their arguments) posted by the worker thread, to be run on the main thread
+        self.events: queue.Queue = queue.Queue()
+        self.progress: Optional[Progress] = None
+        # The results window of the saves applied while watching
+        self.watch_browser: Optional[ResultsBrowser] = None
+        # The index, caches and backups are kept for as long as the editor is open
+        self.runner = ChangesRunner(settings, create_elements_whitelist)
 
         self.columnconfigure(0, weight=1)
         self.columnconfigure(1, weight=10)
@@ -58,11 +76,16 @@ class MetadataEditorTab(ttk.Frame):
         if ERROR_LOADING_ELEMENTS_WHITELIST:
             tkinter.messagebox.showerror("Elements Whitelist Not Found", "The elements_whitelist.txt could not be found. Running with empty whitelist.")
 
+        if ERROR_LOADING_SETTINGS:
+            tkinter.messagebox.showerror("Invalid Settings", ERROR_LOADING_SETTINGS + "\n\nRunning with default settings.")
+
         if os.path.exists(BASE_DIR + "/last_xml_directory.txt"):
             with open(BASE_DIR + "/last_xml_directory.txt", "r", encoding="utf8") as file:
                 self.xml_path.delete(0, tk.END)
                 self.xml_path.insert(0, file.read())
 
+        self.recover_interrupted_run()
+
     def add_widgets(self):
         description = ttk.Label(self, text="Quickly edit XML files from the specified directory using a list of changes", style="MY.TLabel")
         description.grid(columnspan=3, pady=(5, 10))
@@ -74,15 +97,32 @@ class MetadataEditorTab(ttk.Frame):
 
         ttk.Button(self, text="Browse", command=self.choose_xml_directory).grid(row=1, column=2, sticky=tk.E)
 
-        ttk.Label(self, text="Changes File", style="MY.TLabel").grid(row=2, column=0)
+        ttk.Label(self, text="Changes Files", style="MY.TLabel").grid(row=2, column=0)
         self.change_file_path = ttk.Entry(self)
         self.change_file_path.grid(row=2, column=1, sticky=tk.EW, pady=(5, 5))
 
         self.browse_changes_button = ttk.Button(self, text="Browse", command=self.choose_changes_file)
         self.browse_changes_button.grid(row=2, column=2, sticky=tk.E)
 
-        self.help_button = ttk.Button(self, text="Help", command=self.show_help)
-        self.help_button.grid(row=4, column=1, sticky=tk.E, pady=20)
+        actions_frame = ttk.Frame(self, style="MY.TFrame")
+        actions_frame.grid(row=4, column=1, sticky=tk.E, pady=20)
+
+        self.help_button = ttk.Button(actions_frame, text="Help", command=self.show_help)
+        self.help_button.grid(row=0, column=0, padx=(0, 5))
+
+        # Finds every problem of the changes file without writing anything
+        self.validate_button = ttk.Button(actions_frame, text="Validate", command=self.threaded_validate)
+        self.validate_button.grid(row=0, column=1, padx=(0, 5))
+
+        # Applies the changes files every time they're saved, until stopped
+        self.watch_button = ttk.Button(actions_frame, text="Watch", command=self.threaded_watch)
+        self.watch_button.grid(row=0, column=2)
+
+        self.progress_bar = ttk.Progressbar(self, orient=tk.HORIZONTAL, mode="determinate", maximum=100)
+        self.progress_bar.grid(row=3, column=1, sticky=tk.EW, pady=(5, 0))
+
+        self.progress_label = ttk.Label(self, text="", style="MY.TLabel")
+        self.progress_label.grid(row=5, column=0, columnspan=3, sticky=tk.W)
 
         self.generate_button = ttk.Button(self, text="Generate XML", command=self.threaded_update)
         self.generate_button.grid(row=4, column=2, sticky=tk.E, pady=20)
@@ -91,141 +131,317 @@ class MetadataEditorTab(ttk.Frame):
             whitelist_warning = ttk.Label(self, text="Running with empty elements whitelist...", style="WARN.TLabel", font="TkDefaultFont 10 bold")
             whitelist_warning.grid(row=4, column=0, columnspan=3, sticky=tk.W)
 
+    def recover_interrupted_run(self):
+        """Finishes replacing the XML files of a run that was interrupted partway through, and backs up their originals."""
+        try:
+            recovered = self.runner.recover_interrupted_run(self.xml_path.get() or None)
+        except Exception as e:
+            tkinter.messagebox.showerror("Unable to recover the previous run", str(e))
+            return
+
+        if len(recovered) > 0:
+            file_names = "\n".join(os.path.basename(file_path) for file_path in recovered)
+            tkinter.messagebox.showinfo("Previous run recovered", "The previous run was interrupted while writing the following XML files. All of them were updated, and their originals were backed up:\n\n" + file_names)
+
     def choose_xml_directory(self):
         directory = askdirectory()
         self.xml_path.delete(0, tk.END)
         self.xml_path.insert(0, directory)
 
     def choose_changes_file(self):
-        file = askopenfilename()
+        files = askopenfilenames()
         self.change_file_path.delete(0, tk.END)
-        self.change_file_path.insert(0, file)
+        self.change_file_path.insert(0, CHANGES_FILES_SEPARATOR.join(files))
 
-    def update_metadata(self, xml_directory, changes_file_path):
+    def post(self, function: Callable, *args):
+        """Runs `function` on the main thread the next time the events are polled. Safe to call from any thread."""
+        self.events.put((function, args))
 
-        def freeze():
-            self.generating_xml = True
-            self.generate_button.configure(state=tk.DISABLED)
+    def poll_events(self):
+        """Runs what the worker thread posted, and keeps polling for as long as it runs."""
+        while True:
+            try:
+                function, args = self.events.get_nowait()
+            except queue.Empty:
+                break
 
-        def unfreeze():
-            self.generating_xml = False
-            self.generate_button.configure(state=tk.NORMAL)
+            function(*args)
 
-        if not os.path.isdir(xml_directory):
-            tkinter.messagebox.showerror("Directory not found", f"Invalid XML directory: \'{xml_directory}\'")
-            self.generating_xml = False
-            return
-        else:
-            with open(BASE_DIR + "/last_xml_directory.txt", "w", encoding="utf8") as file:
-                file.write(xml_directory)
+        if self.generating_xml:
+            self.after(POLL_INTERVAL_MS, self.poll_events)
 
-        if not os.path.isfile(changes_file_path):
-            tkinter.messagebox.showerror("File not found", f"Invalid change file path: \'{changes_file_path}\'")
-            self.generating_xml = False
-            return
+    def freeze(self, status: str = "Reading changes file...", cancellable: bool = True):
+        self.generating_xml = True
+        self.validate_button.configure(state=tk.DISABLED)
+        self.watch_button.configure(state=tk.DISABLED)
+        self.generate_button.configure(text="Cancel", command=self.cancel_update, state=tk.NORMAL if cancellable else tk.DISABLED)
+        self.progress_bar.configure(value=0)
+        self.progress_label.configure(text=status)
 
-        freeze()
+    def unfreeze(self):
+        self.generating_xml = False
+        self.progress = None
+        self.validate_button.configure(state=tk.NORMAL)
+        self.watch_button.configure(state=tk.NORMAL)
+        self.generate_button.configure(text="Generate XML", command=self.threaded_update, state=tk.NORMAL)
+        self.progress_bar.configure(value=0)
+        self.progress_label.configure(text="")
+
+    def show_progress(self, snapshot: dict):
+        if snapshot["total_bytes"] > 0:
+            self.progress_bar.configure(value=100 * snapshot["bytes_done"] / snapshot["total_bytes"])
+
+        self.progress_label.configure(text=format_progress(snapshot))
+
+    def cancel_update(self):
+        if self.progress is not None:
+            self.progress.cancel()
+            self.generate_button.configure(state=tk.DISABLED)
+            self.progress_label.configure(text="Cancelling after the current file...")
+
+    def show_error(self, title: str, message: str):
+        self.post(tkinter.messagebox.showerror, title, message)
+
+    def update_metadata(self, xml_directory: str, changes_file_paths: List[str], progress: Progress):
+        """Runs in the worker thread, so everything touching the UI is posted to the main thread."""
 
         changes = {}
+        instrumentation = self.runner.create_instrumentation()
 
         try:
-            changes = ChangesParser.parse_changes_file(changes_file_path)
+            # Several changes files are merged, so every XML file is still only parsed, backed up and written once
+            changes = self.runner.parse_changes_files(changes_file_paths, instrumentation)
         except ChangesParser.InvalidGameId as e:
-            tkinter.messagebox.showerror("Invalid Game ID", str(e))
-            unfreeze()
+            self.show_error("Invalid Game ID", str(e))
+            self.post(self.unfreeze)
             return
         except ChangesParser.ForbiddenElementChange as e:
-            tkinter.messagebox.showerror("Forbidden Element Change", str(e))
-            unfreeze()
+            self.show_error("Forbidden Element Change", str(e))
+            self.post(self.unfreeze)
             return
         except ChangesParser.NotEnoughDocuments as e:
-            tkinter.messagebox.showerror("Invalid YAML", str(e))
-            unfreeze()
+            self.show_error("Invalid YAML", str(e))
+            self.post(self.unfreeze)
             return
         except ChangesParser.DuplicateGameId as e:
-            tkinter.messagebox.showerror("Invalid YAML", str(e))
-            unfreeze()
+            self.show_error("Invalid YAML", str(e))
+            self.post(self.unfreeze)
+            return
+        except ConflictingChanges as e:
+            # Can be a long list, which doesn't fit in a message box
+            self.post(TextAreaModal, self, "Conflicting Changes", str(e))
+            self.post(self.unfreeze)
             return
         except Exception as e:
-            tkinter.messagebox.showerror("Error while parsing changes file", str(e))
-            unfreeze()
+            self.show_error("Error while parsing changes file", str(e))
+            self.post(self.unfreeze)
             return
 
-        platform_xml_files = os.listdir(xml_directory)
-        platform_xml_files = [
-            file for file in platform_xml_files
-            if os.path.isfile(os.path.join(xml_directory, file)) and file.endswith(".xml")
-        ]
+        try:
+            game_ids_by_file, missing_games = self.runner.locate(xml_directory, changes, instrumentation)
+        except Exception as e:
+            self.show_error("Error while indexing XML files", str(e))
+            self.post(self.unfreeze)
+            return
 
-        view_diff_prompts = []
-        view_error_prompts = []
-        files_backed_up = []
+        for game_id in missing_games:
+            del changes[game_id]
 
-        for platform_xml in platform_xml_files:
-            # All games have been found and updated
-            # No need to keep looking in the rest of the files
-            if len(changes) == 0:
-                break
+        try:
+            results, not_found, run_id = self.runner.apply(xml_directory, changes, game_ids_by_file, instrumentation, progress)
+        except Cancelled as e:
+            self.post(tkinter.messagebox.showinfo, "Cancelled", str(e))
+            self.post(self.unfreeze)
+            return
+        except Exception as e:
+            if self.runner.has_pending_commit():
+                outcome = "The XML files couldn't all be replaced, or their originals couldn't be backed up. This is finished the next time the editor starts."
+            else:
+                outcome = "None of the XML files were changed."
+
+            self.show_error("Error while updating XML files", str(e) + "\n\n" + outcome)
+            self.post(self.unfreeze)
+            return
+
+        missing_games.extend(not_found)
 
-            file_path = os.path.join(xml_directory, platform_xml)
+        report = None
+        if instrumentation.enabled:
+            try:
+                report = self.runner.write_report(run_id, instrumentation)
+            except OSError:
+                # Only informative, the run itself went through
+                report = {"run_id": run_id, **instrumentation.to_json()}
 
-            updater = XmlUpdater()
-            updated_xml, games_changed, games_failed = updater.get_updated_xml(changes, file_path, create_elements_whitelist)
+        self.post(self.show_results, xml_directory, results, missing_games, run_id, report)
 
-            for game_id, error in games_failed.items():
-                view_error_prompts.append(error)
-                del changes[game_id]
+    def show_results(self, xml_directory: str, results: List[FileResult], missing_games: List[str], run_id: Optional[str], report: Optional[dict]):
+        has_errors = len(missing_games) > 0 or any(len(result.games_failed) > 0 for result in results)
 
-            changes_in_file = {}
+        if has_errors:
+            try:
+                winsound.PlaySound("SystemHand", winsound.SND_ALIAS + winsound.SND_ASYNC)
+            except NameError:
+                pass
 
-            if len(games_changed) > 0:
+        # Everything from the run in one window, which doesn't block the editor
+        if len(results) > 0 or has_errors:
+            ResultsBrowser(self, xml_directory, results, missing_games, self.runner.backup_store, run_id, report)
 
-                for game in games_changed:
-                    changes_in_file[game] = changes[game]
-                    del changes[game]
+        self.change_file_path.delete(0, tk.END)
+        self.unfreeze()
 
-                backup_path = backup_xml_file(file_path, platform_xml)
-                files_backed_up.append(platform_xml)
+    def validate_changes(self, xml_directory: str, changes_file_paths: List[str]):
+        """Runs in the worker thread, like `update_metadata`, but only reports what would go wrong."""
+        try:
+            changes = self.runner.parse_changes_files(changes_file_paths)
+            problems, missing_games = self.runner.check(xml_directory, changes)
+        except Exception as e:
+            self.show_error("Invalid changes file", str(e))
+            self.post(self.unfreeze)
+            return
 
-                updated_xml.write(file_path, encoding="utf8", pretty_print=True)
-                explanation = explain_changes(changes_in_file)
-                view_diff_prompts.append((backup_path, file_path, explanation, platform_xml))
+        self.post(self.show_problems, len(changes), problems, missing_games)
 
-        restored_backups = False
+    def watch_changes(self, xml_directory: str, changes_file_paths: List[str], progress: Progress):
+        """Runs in the worker thread until the watch is stopped through `progress`, applying every save."""
+        watcher = ChangesWatcher(self.runner, xml_directory, changes_file_paths)
 
-        if len(view_error_prompts) or len(changes):
-            text = "\n\n".join([f"{e.game_id}\n      {str(e)}" for e in view_error_prompts])
-            missing_text = "\n\n".join([f"Game with ID \'{game_id}\' could not be found" for game_id in changes])
+        while not progress.is_cancelled():
+            instrumentation = self.runner.create_instrumentation()
 
             try:
-                winsound.PlaySound("SystemHand", winsound.SND_ALIAS + winsound.SND_ASYNC)
-            except NameError:
-                pass
+                summary = watcher.poll(instrumentation)
+            except Exception as e:
+                # Shown until the next save, instead of a message box on every save
+                self.post(self.show_watch_status, f"{time.strftime('%H:%M:%S')} Not applied: {e}")
+            else:
+                if summary is not None:
+                    self.post(self.show_watch_results, xml_directory, summary)
+
+            time.sleep(WATCH_INTERVAL_MS / 1000)
+
+        try:
+            watcher.stop()
+        except Exception as e:
+            self.show_error("Error while backing up XML files", str(e) + "\n\nThe backups are finished the next time the editor starts.")
 
-            title = "One or more errors occurred while updating the XML"
-            restored_backups = ErrorViewerDialog(files_backed_up, BACKUPS_DIR, xml_directory, self, title, missing_text + "\n\n" + text).restored_backups
-            # tkinter.messagebox.showerror("Unable to find games", "The following games could not be found and were not changed:\n  " + "\n  ".join(changes.keys()))
+        self.post(self.unfreeze)
 
-        if not restored_backups:
-            for backup_path, file_path, explanation, platform_xml in view_diff_prompts:
-                DiffViewDialog(backup_path, file_path, self, f"Changes made to {platform_xml}", explanation)
+    def show_watch_status(self, text: str):
+        if self.generating_xml:
+            self.progress_label.configure(text=text)
 
-        self.change_file_path.delete(0, tk.END)
-        unfreeze()
+    def show_watch_results(self, xml_directory: str, summary: RunSummary):
+        game_count = sum(len(result.games_changed) for result in summary.results)
+        self.show_watch_status(f"{time.strftime('%H:%M:%S')} Applied the changes of {game_count} games. Watching for saves...")
+
+        if summary.has_errors():
+            report = {"run_id": summary.run_id, **summary.instrumentation.to_json()} if summary.instrumentation.enabled else None
+
+            # One window for the whole watch, showing the last save that had errors
+            if self.watch_browser is not None and self.watch_browser.winfo_exists():
+                self.watch_browser.show_run(xml_directory, summary.results, summary.missing_games, summary.run_id, report)
+                self.watch_browser.lift()
+            else:
+                self.watch_browser = ResultsBrowser(self, xml_directory, summary.results, summary.missing_games, self.runner.backup_store, summary.run_id, report)
+
+    def show_problems(self, game_count: int, problems: Dict[str, List[Exception]], missing_games: List[str]):
+        self.unfreeze()
+
+        if not problems and not missing_games:
+            tkinter.messagebox.showinfo("Validation", f"No problems found, all {game_count} games can be updated.")
+            return
+
+        text = f"{len(problems) + len(missing_games)} of {game_count} games would fail. Nothing was written.\n\n"
+        text += "\n\n".join(f"{game_id}\n      " + "\n      ".join(str(problem) for problem in game_problems) for game_id, game_problems in problems.items())
+
+        if missing_games:
+            text += "\n\n" + "\n\n".join(f"Game with ID '{game_id}' could not be found" for game_id in missing_games)
+
+        TextAreaModal(self, "Validation", text)
+
+    def get_paths(self) -> Optional[Tuple[str, List[str]]]:
+        """Returns the XML directory and the changes files once they were checked, or None after showing why not."""
+        xml_directory = self.xml_path.get()
+        changes_file_paths = [path.strip() for path in self.change_file_path.get().split(CHANGES_FILES_SEPARATOR) if path.strip()]
+
+        if not os.path.isdir(xml_directory):
+            tkinter.messagebox.showerror("Directory not found", f"Invalid XML directory: \'{xml_directory}\'")
+            return None
+        else:
+            with open(BASE_DIR + "/last_xml_directory.txt", "w", encoding="utf8") as file:
+                file.write(xml_directory)
+
+        if not changes_file_paths:
+            tkinter.messagebox.showerror("File not found", "No changes file was chosen")
+            return None
+
+        for changes_file_path in changes_file_paths:
+            if not os.path.isfile(changes_file_path):
+                tkinter.messagebox.showerror("File not found", f"Invalid change file path: \'{changes_file_path}\'")
+                return None
+
+        return xml_directory, changes_file_paths
+
+    def threaded_validate(self):
+
+        if self.generating_xml:
+            return
+
+        paths = self.get_paths()
+        if paths is None:
+            return
+
+        self.freeze("Validating changes file...", cancellable=False)
+
+        threading.Thread(target=self.validate_changes, args=paths, daemon=True).start()
+        self.after(POLL_INTERVAL_MS, self.poll_events)
 
     def threaded_update(self):
 
-        if not self.generating_xml:
+        if self.generating_xml:
+            return
+
+        paths = self.get_paths()
+        if paths is None:
+            return
+
+        xml_directory, changes_file_paths = paths
+        self.freeze()
+
+        # Snapshots are taken in the worker thread and shown once the main thread polls them
+        self.progress = Progress(lambda snapshot: self.post(self.show_progress, snapshot))
+
+        thread = threading.Thread(
+            target=self.update_metadata,
+            args=(
+                xml_directory,
+                changes_file_paths,
+                self.progress
+            ),
+            daemon=True
+        )
+
+        thread.start()
+        self.after(POLL_INTERVAL_MS, self.poll_events)
+
+    def threaded_watch(self):
+
+        if self.generating_xml:
+            return
+
+        paths = self.get_paths()
+        if paths is None:
+            return
 
-            thread = threading.Thread(
-                target=self.update_metadata,
-                args=(
-                    self.xml_path.get(),
-                    self.change_file_path.get()
-                )
-            )
+        self.freeze("Watching for saves...")
+        self.generate_button.configure(text="Stop watching")
+        # Only used to stop watching
+        self.progress = Progress()
 
-            thread.start()
+        threading.Thread(target=self.watch_changes, args=(*paths, self.progress), daemon=True).start()
+        self.after(POLL_INTERVAL_MS, self.poll_events)
 
     def show_help(self):
 
@@ -0,0 +1,266 @@
+import tkinter as tk
+import tkinter.ttk as ttk
+
+from tkinter.messagebox import showinfo, askokcancel, showerror
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
+
+from src.ui.lazy_text_view import LazyTextView
+from src.util.backup_store import BackupStore
+from src.util.batch_updater import FileResult
+from src.util.instrumentation import render_report
+from src.util.xml_diff import render_diffs
+from src.util.xml_updater import iter_explain_changes
+
+MISSING_GAMES_ID = "missing"
+REPORT_ID = "report"
+
+NO_SELECTION_TEXT = "Select a file or game to see its changes."
+# How often to look for the backup of a run that's still being finished in the background
+PENDING_RUN_POLL_MS = 1000
+
+
+class ResultsBrowser(tk.Toplevel):
+    """
+    A single window listing every file, game and error of a run. The explanation and diff of an entry are
+    only built once it's selected, and the window never blocks the main one, so it can be left open, and
+    show the next run with `show_run`.
+    """
+
+    def __init__(self, master, xml_directory: str, results: List[FileResult], missing_games: List[str], backup_store: BackupStore, run_id: Optional[str], report: Optional[dict] = None, *args, **kwargs):
+        super().__init__(master, *args, **kwargs)
+
+        self.title("Results")
+        self.iconbitmap("icon.ico")
+
+        self.xml_directory = xml_directory
+        self.results: Dict[str, FileResult] = {}
+        self.backup_store = backup_store
+        self.run_id = run_id
+
+        # Tree item -> function returning the text of the entry
+        self.entries: Dict[str, Callable[[], Union[str, Iterable[str]]]] = {}
+
+        # The runs that can be undone, None standing for the shown run while its backup is still being finished
+        self.runs: List[Optional[dict]] = []
+        self.undone_runs: Set[str] = set()
+        self.refresh_job: Optional[str] = None
+
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        panes = ttk.PanedWindow(self, orient=tk.HORIZONTAL)
+        panes.grid(row=0, column=0, sticky=tk.NW + tk.SE)
+
+        tree_frame = ttk.Frame(panes)
+        tree_frame.rowconfigure(0, weight=1)
+        tree_frame.columnconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(tree_frame, columns=("status",), selectmode="browse")
+        self.tree.heading("#0", text="File / Game")
+        self.tree.heading("status", text="Status")
+        self.tree.column("status", width=160, stretch=False)
+        self.tree.grid(row=0, column=0, sticky=tk.NW + tk.SE)
+
+        tree_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        tree_scrollbar.grid(row=0, column=1, sticky=tk.NS)
+        self.tree.configure(yscrollcommand=tree_scrollbar.set)
+
+        self.text_view = LazyTextView(panes, NO_SELECTION_TEXT, width=80)
+
+        panes.add(tree_frame, weight=1)
+        panes.add(self.text_view, weight=2)
+
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+        self.buttons_frame = ttk.Frame(self)
+        self.buttons_frame.grid(row=1, sticky=tk.EW)
+        self.buttons_frame.columnconfigure(0, weight=1)
+
+        # Any earlier run can be undone from here as well, the run that just happened is selected by default
+        self.run_selector = ttk.Combobox(self.buttons_frame, state="readonly", width=40)
+        self.run_selector.bind("<<ComboboxSelected>>", lambda event: self.update_undo_button())
+        self.undo_button = ttk.Button(self.buttons_frame, text="Undo changes", command=self.undo_changes)
+
+        # WinMerge only exists on Windows, the diff of every game is shown here either way
+        if shutil.which("winmergeu"):
+            ttk.Button(self.buttons_frame, text="View file with WinMerge", command=self.open_with_winmerge).grid(row=0, column=2, pady=10, padx=5)
+
+        ttk.Button(self.buttons_frame, text="Close", command=self.destroy).grid(row=0, column=3, pady=10, padx=20)
+
+        self.add_entries(results, missing_games, report)
+        self.refresh_runs()
+
+    def show_run(self, xml_directory: str, results: List[FileResult], missing_games: List[str], run_id: Optional[str], report: Optional[dict] = None):
+        """Replaces what's shown with the results of another run."""
+        self.xml_directory = xml_directory
+        self.run_id = run_id
+
+        self.tree.delete(*self.tree.get_children())
+        self.entries = {}
+        self.results = {}
+        self.text_view.set_text(NO_SELECTION_TEXT)
+
+        self.add_entries(results, missing_games, report)
+        self.refresh_runs()
+
+    def refresh_runs(self):
+        """
+        Lists the runs that can be undone. A run whose backup is still being finished in the background can't
+        be undone yet, so it's listed as pending until its manifest was saved.
+        """
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+            self.refresh_job = None
+
+        self.runs = self.backup_store.list_runs()
+        values = [f"{run['created']}  ({len(run['files'])} files)" for run in self.runs]
+        run_ids = [run["id"] for run in self.runs]
+
+        if self.run_id is not None and self.run_id not in run_ids:
+            self.runs.insert(0, None)
+            values.insert(0, "This run (still being backed up)")
+            run_ids.insert(0, self.run_id)
+            self.refresh_job = self.after(PENDING_RUN_POLL_MS, self.wait_for_run)
+
+        if not self.runs:
+            self.run_selector.grid_remove()
+            self.undo_button.grid_remove()
+            return
+
+        self.run_selector.configure(values=values)
+        self.run_selector.current(run_ids.index(self.run_id) if self.run_id in run_ids else 0)
+        self.run_selector.grid(row=0, column=0, sticky=tk.W, pady=10, padx=20)
+        self.undo_button.grid(row=0, column=1, pady=10, padx=5)
+        self.update_undo_button()
+
+    def wait_for_run(self):
+        self.refresh_job = None
+
+        if self.backup_store.has_run(self.run_id):
+            self.refresh_runs()
+        else:
+            self.refresh_job = self.after(PENDING_RUN_POLL_MS, self.wait_for_run)
+
+    def update_undo_button(self):
+        run = self.runs[self.run_selector.current()]
+        can_undo = run is not None and run["id"] not in self.undone_runs
+        self.undo_button.configure(state=tk.NORMAL if can_undo else tk.DISABLED)
+
+    def destroy(self):
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+            self.refresh_job = None
+
+        super().destroy()
+
+    def add_entries(self, results: List[FileResult], missing_games: List[str], report: Optional[dict]):
+        for result in results:
+            self.results[result.file_name] = result
+
+            status = f"{len(result.games_changed)} changed"
+            if result.games_failed:
+                status += f", {len(result.games_failed)} failed"
+
+            file_item = self.tree.insert("", tk.END, text=result.file_name, values=(status,), open=len(results) == 1)
+            self.entries[file_item] = lambda result=result: iter_explain_changes(result.changes)
+
+            for game_id in sorted(result.games_changed):
+                item = self.tree.insert(file_item, tk.END, text=game_id, values=("Changed",))
+                self.entries[item] = lambda result=result, game_id=game_id: self.get_game_text(result, game_id)
+
+            for game_id, error in result.games_failed.items():
+                item = self.tree.insert(file_item, tk.END, text=game_id, values=("Failed",), tags=("failed",))
+                self.entries[item] = lambda error=error: f"{error.game_id}\n      {str(error)}"
+
+        if missing_games:
+            missing_item = self.tree.insert("", tk.END, iid=MISSING_GAMES_ID, text="Games not found", values=(f"{len(missing_games)} games",), tags=("failed",))
+            self.entries[missing_item] = lambda: "\n\n".join(f"Game with ID '{game_id}' could not be found" for game_id in missing_games)
+
+        # Where the time of the run went, see `Instrumentation`
+        if report is not None:
+            total = sum(report["timings"].get(phase, 0) for phase in ("parse_changes", "index", "apply"))
+            report_item = self.tree.insert("", tk.END, iid=REPORT_ID, text="Run report", values=(f"{total:.2f} s",))
+            self.entries[report_item] = lambda: render_report(report)
+
+        self.tree.tag_configure("failed", foreground="red")
+
+    @staticmethod
+    def get_game_text(result: FileResult, game_id: str) -> Iterable[str]:
+        yield from iter_explain_changes({game_id: result.changes[game_id]})
+
+        diffs = [diff for diff in result.diffs if diff.element_id == game_id or diff.game_id == game_id]
+        if diffs:
+            yield "\nDiff\n\n"
+            yield render_diffs(diffs)
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+
+        if selection and selection[0] in self.entries:
+            self.text_view.set_text(self.entries[selection[0]]())
+
+    def get_selected_result(self) -> Optional[FileResult]:
+        selection = self.tree.selection()
+
+        if not selection:
+            return None
+
+        item = selection[0]
+        # Games point to the file they're in
+        if self.tree.parent(item):
+            item = self.tree.parent(item)
+
+        return self.results.get(self.tree.item(item, "text"))
+
+    def undo_changes(self):
+        run = self.runs[self.run_selector.current()]
+        if run is None:
+            return
+
+        file_names = sorted(run["files"])
+
+        message = f"The changes made by the run of {run['created']} will be undone in the following files in {run['xml_directory']}: \n\n" + "\n".join(file_names)
+        if not askokcancel("Are you sure?", message, parent=self):
+            return
+
+        try:
+            conflicts = self.backup_store.undo(run["id"])
+        except Exception as e:
+            showerror("Error occurred while undoing changes", str(e), parent=self)
+            return
+
+        if conflicts:
+            text = "\n\n".join(f"{file_name}:\n  " + "\n  ".join(file_conflicts) for file_name, file_conflicts in conflicts.items())
+            showinfo("Backups", "Changes undone, except for the following ones which were edited again since:\n\n" + text, parent=self)
+        else:
+            showinfo("Backups", "Changes undone successfully", parent=self)
+
+        self.undone_runs.add(run["id"])
+        self.update_undo_button()
+
+    def open_with_winmerge(self):
+        result = self.get_selected_result()
+
+        if result is None or result.backup_hash is None:
+            showinfo("No file selected", "Select a file that was changed first.", parent=self)
+            return
+
+        # Backups are stored compressed, so WinMerge gets a plain copy in the temp directory
+        file_path = os.path.join(self.xml_directory, result.file_name)
+        backup_path = os.path.join(tempfile.gettempdir(), "xmlbackups", f"{result.backup_hash[:12]}_{result.file_name}")
+
+        try:
+            if not os.path.exists(backup_path):
+                os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+                self.backup_store.extract(result.backup_hash, backup_path)
+
+            subprocess.Popen(["winmergeu", backup_path.replace("\\", "/"), file_path.replace("\\", "/")])
+        except Exception as e:
+            msg = f"Please make sure WinMerge is in your PATH, and that the backup XML and updated XML are still available.\n\n" + str(e)
+            showerror("Unable to open WinMerge", msg, parent=self)
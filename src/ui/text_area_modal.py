@@ -1,12 +1,13 @@
 import tkinter as tk
 import tkinter.ttk as ttk
 
-from tkinter.scrolledtext import ScrolledText
-from tkinter.font import Font
+from typing import Iterable, Union
+
+from src.ui.lazy_text_view import LazyTextView
 
 
 class TextAreaModal(tk.Toplevel):
-    def __init__(self, master, initial_title, initial_text, *args, **kwargs):
+    def __init__(self, master, initial_title, initial_text: Union[str, Iterable[str]], *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.title(initial_title)
@@ -25,12 +26,9 @@ class TextAreaModal(tk.Toplevel):
         self.text_frame.rowconfigure(0, weight=1)
         self.text_frame.columnconfigure(0, weight=1)
 
-        font = Font(size=13)
-        text_area = ScrolledText(self.text_frame, font=font, width=100)
-        text_area.grid(row=0, column=0, sticky=tk.NW + tk.SE)
-
-        text_area.insert(tk.END, initial_text)
-        text_area.configure(state="disabled")
+        # Only renders the lines that are on screen, so huge reports open right away
+        self.text_view = LazyTextView(self.text_frame, initial_text)
+        self.text_view.grid(row=0, column=0, sticky=tk.NW + tk.SE)
 
         self.buttons_frame = ttk.Frame(self)
         self.buttons_frame.grid(row=1, sticky=tk.EW)
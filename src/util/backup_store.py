@@ -0,0 +1,387 @@
+"""Keeps compressed, deduplicated backups of platform XML files for every run."""
+
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+
+from typing import Dict, List, Optional, Tuple
+
+from src.util.undo_journal import undo_file
+
+OBJECT_EXTENSION = ".zlib"
+# Files moved out of the way by a run, until they're compressed into the store
+PENDING_EXTENSION = ".pending-backup"
+
+# Files are hashed, compressed and extracted this much at a time, so they're never held in memory all at once
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupStore:
+    """
+    Stores file contents under the hash of their contents, compressed with zlib, so identical backups
+    are only kept once. Every run writes a manifest of the files it backed up, and the oldest runs are
+    removed once the objects take up more than `max_bytes`.
+    """
+
+    class UnknownRun(Exception):
+        pass
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self.objects_dir = os.path.join(directory, "objects")
+        self.runs_dir = os.path.join(directory, "runs")
+        # What every unfinished run moved out of the way, so it can still be finished after a crash
+        self.pending_dir = os.path.join(directory, "pending")
+
+        # Objects of the runs that are still being backed up, which have no manifest keeping them yet
+        self.unfinished_hashes: Dict[str, int] = {}
+
+    @staticmethod
+    def hash_file(file_path: str) -> Tuple[str, int]:
+        """Returns the hash and size of the contents of `file_path`."""
+        content_hash = hashlib.sha256()
+        size = 0
+
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                content_hash.update(chunk)
+                size += len(chunk)
+
+        return content_hash.hexdigest(), size
+
+    def get_object_path(self, content_hash: str) -> str:
+        return os.path.join(self.objects_dir, content_hash + OBJECT_EXTENSION)
+
+    def has_object(self, content_hash: str) -> bool:
+        return os.path.exists(self.get_object_path(content_hash))
+
+    def write_object(self, content_hash: str, file_path: str):
+        """Compresses the contents of `file_path`, whose hash is `content_hash`, into the store."""
+        if self.has_object(content_hash):
+            return
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        object_path = self.get_object_path(content_hash)
+        temp_path = f"{object_path}.{os.getpid()}.tmp"
+        compressor = zlib.compressobj()
+
+        try:
+            with open(file_path, "rb") as source, open(temp_path, "wb") as file:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    file.write(compressor.compress(chunk))
+                file.write(compressor.flush())
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        os.replace(temp_path, object_path)
+
+    def read_object(self, content_hash: str) -> bytes:
+        with open(self.get_object_path(content_hash), "rb") as file:
+            return zlib.decompress(file.read())
+
+    def release_hash(self, content_hash: str):
+        """Lets `enforce_retention` remove the object again, once the run that backed it up is finished."""
+        count = self.unfinished_hashes.pop(content_hash, 0) - 1
+
+        if count > 0:
+            self.unfinished_hashes[content_hash] = count
+
+    def start_run(self, xml_directory: str) -> "BackupRun":
+        return BackupRun(self, xml_directory)
+
+    def list_runs(self) -> List[dict]:
+        """Returns the manifests of every run, newest first."""
+        if not os.path.isdir(self.runs_dir):
+            return []
+
+        runs = []
+
+        for file_name in os.listdir(self.runs_dir):
+            if not file_name.endswith(".json"):
+                continue
+
+            try:
+                with open(os.path.join(self.runs_dir, file_name), "r", encoding="utf8") as file:
+                    runs.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+
+        return sorted(runs, key=lambda run: run["id"], reverse=True)
+
+    def has_run(self, run_id: str) -> bool:
+        return os.path.exists(os.path.join(self.runs_dir, run_id + ".json"))
+
+    def load_run(self, run_id: str) -> dict:
+        try:
+            with open(os.path.join(self.runs_dir, run_id + ".json"), "r", encoding="utf8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            raise self.UnknownRun(f"No backups exist for the run '{run_id}'")
+
+    def write_run(self, manifest: dict):
+        os.makedirs(self.runs_dir, exist_ok=True)
+
+        run_path = os.path.join(self.runs_dir, manifest["id"] + ".json")
+        with open(run_path + ".tmp", "w", encoding="utf8") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(run_path + ".tmp", run_path)
+
+    def get_pending_path(self, run_id: str) -> str:
+        return os.path.join(self.pending_dir, run_id + ".json")
+
+    def write_pending(self, run: "BackupRun"):
+        """Records the files `run` moved out of the way, before they're moved."""
+        os.makedirs(self.pending_dir, exist_ok=True)
+
+        pending_path = self.get_pending_path(run.id)
+        with open(pending_path + ".tmp", "w", encoding="utf8") as file:
+            json.dump({"id": run.id, "xml_directory": run.xml_directory, "files": run.files, "pending": run.pending}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(pending_path + ".tmp", pending_path)
+
+    def remove_pending(self, run_id: str):
+        pending_path = self.get_pending_path(run_id)
+
+        if os.path.exists(pending_path):
+            os.remove(pending_path)
+
+    def has_pending_runs(self) -> bool:
+        return os.path.isdir(self.pending_dir) and any(file_name.endswith(".json") for file_name in os.listdir(self.pending_dir))
+
+    def recover_pending_runs(self) -> List[str]:
+        """
+        Finishes the runs whose moved files were never compressed, because they failed or were interrupted.
+        Returns the IDs of the finished runs.
+        """
+        if not os.path.isdir(self.pending_dir):
+            return []
+
+        recovered = []
+
+        for file_name in sorted(os.listdir(self.pending_dir)):
+            if not file_name.endswith(".json"):
+                continue
+
+            with open(os.path.join(self.pending_dir, file_name), "r", encoding="utf8") as file:
+                pending = json.load(file)
+
+            run = BackupRun(self, pending["xml_directory"])
+            run.id = pending["id"]
+            run.files = pending["files"]
+
+            for content_hash, pending_path in pending["pending"]:
+                if os.path.exists(pending_path) or self.has_object(content_hash):
+                    run.pending.append((content_hash, pending_path))
+                else:
+                    # Interrupted before the file was moved, the commit journal still has it
+                    run.files = {name: entry for name, entry in run.files.items() if entry["hash"] != content_hash}
+
+            for entry in run.files.values():
+                self.unfinished_hashes[entry["hash"]] = self.unfinished_hashes.get(entry["hash"], 0) + 1
+
+            if run.finish() is not None:
+                recovered.append(run.id)
+
+        return recovered
+
+    def recover_orphans(self, xml_directory: str) -> Optional[str]:
+        """
+        Backs up the files in `xml_directory` that a run moved out of the way without a record of it, and
+        removes them afterwards. Returns the ID of the run they were backed up in, or None if there weren't any.
+        """
+        orphans = [file_name for file_name in os.listdir(xml_directory) if file_name.endswith(PENDING_EXTENSION)]
+
+        if not orphans:
+            return None
+
+        run = self.start_run(xml_directory)
+        for orphan in orphans:
+            # <file name>.<run ID>.pending-backup
+            file_name = orphan[:-len(PENDING_EXTENSION)].rsplit(".", 1)[0]
+            run.backup_file(file_name, os.path.join(xml_directory, orphan))
+
+        run_id = run.finish()
+
+        for orphan in orphans:
+            os.remove(os.path.join(xml_directory, orphan))
+
+        return run_id
+
+    def extract(self, content_hash: str, dest_path: str):
+        temp_path = dest_path + ".tmp"
+        decompressor = zlib.decompressobj()
+
+        with open(self.get_object_path(content_hash), "rb") as source, open(temp_path, "wb") as file:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                file.write(decompressor.decompress(chunk))
+            file.write(decompressor.flush())
+
+        os.replace(temp_path, dest_path)
+
+    def restore(self, run_id: str, dest_directory: Optional[str] = None, file_names: Optional[List[str]] = None) -> List[str]:
+        """
+        Puts the files backed up by `run_id` back the way they were before that run. Returns the names
+        of the restored files.
+        """
+        manifest = self.load_run(run_id)
+        dest_directory = dest_directory or manifest["xml_directory"]
+        restored = []
+
+        for file_name, entry in manifest["files"].items():
+            if file_names is not None and file_name not in file_names:
+                continue
+
+            self.extract(entry["hash"], os.path.join(dest_directory, file_name))
+            restored.append(file_name)
+
+        return restored
+
+    def undo(self, run_id: str, dest_directory: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Undoes the changes made by `run_id` using the journal of every file, so only the changed elements are
+        touched and anything else edited since is kept. Files without a journal are restored from their backup.
+        Returns the changes that couldn't be undone, by file name.
+        """
+        manifest = self.load_run(run_id)
+        dest_directory = dest_directory or manifest["xml_directory"]
+        conflicts: Dict[str, List[str]] = {}
+
+        for file_name, entry in manifest["files"].items():
+            file_path = os.path.join(dest_directory, file_name)
+
+            if entry.get("journal") is None:
+                self.extract(entry["hash"], file_path)
+                continue
+
+            file_conflicts = undo_file(file_path, entry["journal"])
+            if file_conflicts:
+                conflicts[file_name] = file_conflicts
+
+        return conflicts
+
+    def enforce_retention(self, keep_run_id: Optional[str] = None):
+        """Removes the oldest runs, and the objects only they used, until the objects fit in `max_bytes`."""
+        runs = self.list_runs()
+
+        if not os.path.isdir(self.objects_dir):
+            return
+
+        object_sizes = {}
+        for file_name in os.listdir(self.objects_dir):
+            if file_name.endswith(OBJECT_EXTENSION):
+                object_sizes[file_name[:-len(OBJECT_EXTENSION)]] = os.path.getsize(os.path.join(self.objects_dir, file_name))
+
+        total_size = sum(object_sizes.values())
+
+        while total_size > self.max_bytes and runs and runs[-1]["id"] != keep_run_id:
+            oldest_run = runs.pop()
+            os.remove(os.path.join(self.runs_dir, oldest_run["id"] + ".json"))
+
+            still_used = {entry["hash"] for run in runs for entry in run["files"].values()} | set(self.unfinished_hashes)
+
+            for entry in oldest_run["files"].values():
+                content_hash = entry["hash"]
+
+                if content_hash not in still_used and content_hash in object_sizes:
+                    os.remove(self.get_object_path(content_hash))
+                    total_size -= object_sizes.pop(content_hash)
+
+
+class BackupRun:
+    """
+    The backups taken during a single run. Files are hashed right away, one chunk at a time. Files that
+    are about to be removed anyway can be moved out of the way instead, so they're only compressed by
+    `finish`, which can run in the background while the next run starts.
+    """
+
+    def __init__(self, store: BackupStore, xml_directory: str):
+        self.store = store
+        self.xml_directory = os.path.abspath(xml_directory)
+
+        self.id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        self.files: Dict[str, dict] = {}
+
+        # (hash, path) of the files moved out of the way, left to be compressed
+        self.pending: List[Tuple[str, str]] = []
+
+    def backup_file(self, file_name: str, file_path: str, journal: Optional[list] = None, move: bool = False) -> Tuple[str, int]:
+        """
+        Backs up `file_path` as the original contents of `file_name`, along with the journal of the changes
+        made to it. Returns the hash and size of the contents.
+
+        With `move`, the file is renamed out of the way (in the same directory) and compressed by `finish`,
+        otherwise it's compressed right away.
+        """
+        content_hash, size = self.store.hash_file(file_path)
+
+        if file_name in self.files:
+            self.store.release_hash(self.files[file_name]["hash"])
+
+        self.files[file_name] = {"hash": content_hash, "size": size}
+        self.store.unfinished_hashes[content_hash] = self.store.unfinished_hashes.get(content_hash, 0) + 1
+
+        if journal is not None:
+            self.files[file_name]["journal"] = journal
+
+        if self.store.has_object(content_hash) or any(pending_hash == content_hash for pending_hash, _ in self.pending):
+            if self.pending:
+                self.store.write_pending(self)
+
+            return content_hash, size
+
+        if move:
+            pending_path = f"{file_path}.{self.id}{PENDING_EXTENSION}"
+            self.pending.append((content_hash, pending_path))
+            # Recorded first, so the file is never out of the way without anything pointing to it
+            self.store.write_pending(self)
+            os.replace(file_path, pending_path)
+        else:
+            self.store.write_object(content_hash, file_path)
+
+        return content_hash, size
+
+    def finish(self) -> Optional[str]:
+        """
+        Compresses the files that were moved out of the way and saves the manifest of the run. Returns the
+        ID of the run, or None if nothing was backed up.
+
+        The moved files are only removed once the manifest was saved. If anything fails before that, they're
+        left where they are, and `BackupStore.recover_pending_runs` finishes the run later.
+        """
+        try:
+            for content_hash, pending_path in self.pending:
+                if not self.store.has_object(content_hash):
+                    self.store.write_object(content_hash, pending_path)
+
+            if self.files:
+                self.store.write_run({
+                    "id": self.id,
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "xml_directory": self.xml_directory,
+                    "files": self.files
+                })
+        finally:
+            for entry in self.files.values():
+                self.store.release_hash(entry["hash"])
+
+        for _, pending_path in self.pending:
+            if os.path.exists(pending_path):
+                os.remove(pending_path)
+
+        if self.pending:
+            self.store.remove_pending(self.id)
+
+        if not self.files:
+            return None
+
+        self.store.enforce_retention(keep_run_id=self.id)
+
+        return self.id
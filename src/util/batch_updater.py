@@ -0,0 +1,294 @@
+"""Applies parsed changes to a directory of platform XML files, one file at a time or in parallel."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from typing import Dict, List, Optional, Tuple
+
+from src.util.backup_store import BackupRun
+from src.util.file_transaction import FileTransaction, get_staged_path, get_old_path
+from src.util.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from src.util.progress import Progress
+from src.util.xml_updater import XmlUpdater
+from src.util.xml_index import XmlIndex
+from src.util.xml_streaming import StreamingXmlUpdater, parse_sparse_tree
+from src.util.tree_cache import TreeCache
+from src.util.xml_diff import ElementDiff, diff_updater
+from src.util.xml_writer import write_full, write_minimal
+
+
+class FileResult:
+    """What happened to a single platform XML file during a run."""
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.games_changed: set = set()
+        self.games_failed: Dict[str, Exception] = {}
+        # The changes of the games in `games_changed`
+        self.changes: Dict[str, dict] = {}
+        # Where the updated file was written, until it's committed over the original
+        self.staged_path: Optional[str] = None
+        # Hash of the contents of the file before it was changed, as stored in the backup store
+        self.backup_hash: Optional[str] = None
+        # [size, modification time] of the file before and after it was replaced, see `XmlIndex.record_rewrites`
+        self.original_fingerprint: Optional[List[int]] = None
+        self.fingerprint: Optional[List[int]] = None
+        # The changes made to the file, so they can be undone later
+        self.journal: List[list] = []
+        # What every changed game and additional application looked like before and after
+        self.diffs: List[ElementDiff] = []
+        # Timings and counters of updating this file, merged into the ones of the run
+        self.instrumentation: Instrumentation = NULL_INSTRUMENTATION
+
+
+def should_stream(file_path: str, streaming_threshold_mb: Optional[float]) -> bool:
+    return streaming_threshold_mb is not None and os.path.getsize(file_path) >= streaming_threshold_mb * 1024 * 1024
+
+
+def apply_changes_to_file(xml_directory: str, file_name: str, changes: dict, create_elements_whitelist: list, streaming_threshold_mb: Optional[float] = None, tree_cache: Optional[TreeCache] = None, minimal_rewrite: bool = False, instrument: bool = False, progress: Optional[Progress] = None) -> FileResult:
+    """
+    Applies `changes` to a single platform XML file. If any game was changed, the updated file is written to
+    its staged path (see `FileTransaction`), leaving the original untouched until the run is committed.
+    If a `tree_cache` is given, the file is only parsed if it changed since it was last cached. With
+    `minimal_rewrite`, only the changed games and additional applications are rewritten in the file.
+    With `instrument`, the timings and counters of the file are recorded in `result.instrumentation`.
+    Every game is reported to `progress` as soon as it was updated, which only works in this process.
+
+    This runs inside of worker processes, so everything it takes and returns has to be picklable.
+    """
+    result = FileResult(file_name)
+    file_path = os.path.join(xml_directory, file_name)
+    staged_path = get_staged_path(file_path)
+    streamed = should_stream(file_path, streaming_threshold_mb)
+
+    instrumentation = Instrumentation() if instrument else NULL_INSTRUMENTATION
+    result.instrumentation = instrumentation
+
+    if streamed:
+        # Write the updated file without ever holding the whole tree in memory
+        updated_xml = None
+
+        updater = StreamingXmlUpdater(instrumentation)
+        if progress is not None:
+            updater.on_game_updated = progress.game_done
+
+        try:
+            with instrumentation.timer("stream_xml"), open(staged_path, "wb") as streamed_file:
+                games_changed, games_failed = updater.write_updated_xml(changes, file_path, streamed_file, create_elements_whitelist)
+        except Exception:
+            os.remove(staged_path)
+            raise
+
+        instrumentation.count("xml_bytes_read", os.path.getsize(file_path))
+    else:
+        updated_xml = tree_cache.take(file_path) if tree_cache else None
+        if updated_xml is None:
+            with instrumentation.timer("parse_xml"):
+                updated_xml = XmlUpdater.parse_xml(file_path)
+
+            instrumentation.count("xml_bytes_read", os.path.getsize(file_path))
+        else:
+            instrumentation.count("trees_reused")
+
+        updater = XmlUpdater(instrumentation)
+        if progress is not None:
+            updater.on_game_updated = progress.game_done
+
+        games_changed, games_failed = updater.update_tree(changes, updated_xml, create_elements_whitelist)
+
+    result.games_changed = games_changed
+    result.games_failed = games_failed
+
+    if len(games_changed) > 0:
+        result.changes = {game_id: changes[game_id] for game_id in games_changed}
+        result.journal = updater.journal
+        result.staged_path = staged_path
+
+        # A streamed file was diffed while it was written
+        with instrumentation.timer("diff"):
+            result.diffs = updater.diffs if streamed else diff_updater(updater)
+
+        # A streamed file was already written while updating it
+        with instrumentation.timer("serialize"):
+            if not streamed and minimal_rewrite:
+                write_minimal(updated_xml, file_path, updater.modified_elements, updater.created_elements, staged_path)
+            elif not streamed:
+                write_full(updated_xml, staged_path)
+
+        instrumentation.count("files_written")
+        instrumentation.count("xml_bytes_written", os.path.getsize(staged_path))
+    elif streamed:
+        os.remove(staged_path)
+
+    # Failed games can leave changes behind in a tree that was never written, so it's only kept when
+    # it's either what is about to be committed or still identical to the file
+    if tree_cache and not streamed and (len(games_changed) > 0 or len(games_failed) == 0):
+        tree_cache.put(file_path, updated_xml, result.staged_path)
+
+    return result
+
+
+def check_changes(xml_directory: str, changes: dict, game_ids_by_file: Dict[str, List[str]], create_elements_whitelist: list, streaming_threshold_mb: Optional[float] = None, tree_cache: Optional[TreeCache] = None, instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Tuple[Dict[str, List[Exception]], List[str]]:
+    """
+    Dry run of `apply_changes`, which resolves every change against the files without writing or backing
+    anything up. Returns every problem by game ID, and the IDs of the games that weren't found.
+
+    Files that would be streamed are only read for the games being checked. The trees of the other ones
+    are left unchanged, so they're put back in `tree_cache` for the next check or run.
+    """
+    remaining_ids = set(changes)
+    problems: Dict[str, List[Exception]] = {}
+
+    for file_name in game_ids_by_file:
+        file_changes = {game_id: changes[game_id] for game_id in game_ids_by_file[file_name] if game_id in remaining_ids}
+
+        if len(file_changes) == 0:
+            continue
+
+        file_path = os.path.join(xml_directory, file_name)
+        streamed = should_stream(file_path, streaming_threshold_mb)
+
+        if streamed:
+            with instrumentation.timer("parse_xml"):
+                tree = parse_sparse_tree(file_path, set(file_changes))
+        else:
+            tree = tree_cache.take(file_path) if tree_cache else None
+            if tree is None:
+                with instrumentation.timer("parse_xml"):
+                    tree = XmlUpdater.parse_xml(file_path)
+
+        games_found, file_problems = XmlUpdater(instrumentation).check_tree(file_changes, tree, create_elements_whitelist)
+
+        if tree_cache and not streamed:
+            tree_cache.put(file_path, tree)
+
+        remaining_ids.difference_update(games_found)
+        problems.update(file_problems)
+
+    not_found = [game_id for game_id in changes if game_id in remaining_ids]
+    return problems, not_found
+
+
+def apply_changes(xml_directory: str, changes: dict, game_ids_by_file: Dict[str, List[str]], create_elements_whitelist: list, backup_run: BackupRun, commit_journal_path: str, streaming_threshold_mb: Optional[float] = None, workers: int = 1, tree_cache: Optional[TreeCache] = None, minimal_rewrite: bool = False, instrumentation: Instrumentation = NULL_INSTRUMENTATION, progress: Optional[Progress] = None) -> Tuple[List[FileResult], List[str]]:
+    """
+    Applies `changes` to the files in `game_ids_by_file` (as returned by `XmlIndex.locate`) and returns the
+    result of every file that was opened, in order, along with the IDs of the games that weren't found.
+
+    Nothing is replaced until every file was updated, then all of them are committed together (see
+    `FileTransaction`, which keeps its journal at `commit_journal_path`). If anything goes wrong before
+    that, no file is changed at all. The originals of the replaced files are added to `backup_run`,
+    which is left for the caller to finish.
+
+    With more than one worker, the files are handled in a process pool. The results are the same either way,
+    but `tree_cache` is only used when the files are handled one at a time in this process. The timings and
+    counters of every file are added to `instrumentation`.
+
+    How far along the run is, is reported to `progress`. Cancelling it stops the run before the next file
+    (or as soon as the files being updated by the workers are done) and raises `Cancelled`, in which case
+    nothing is changed either.
+    """
+    # Checked before anything is written, and again when staging each file
+    for file_name in game_ids_by_file:
+        FileTransaction.check_old_path(os.path.join(xml_directory, file_name))
+
+    progress = progress or Progress()
+    progress.start_run({file_name: os.path.getsize(os.path.join(xml_directory, file_name)) for file_name in game_ids_by_file}, len(changes))
+
+    # A game that's found in one file isn't looked for in the following ones
+    remaining_ids = set(changes)
+    results: List[FileResult] = []
+    transaction = FileTransaction(commit_journal_path)
+
+    def take_changes(file_name: str) -> dict:
+        file_changes = {game_id: changes[game_id] for game_id in game_ids_by_file[file_name] if game_id in remaining_ids}
+        remaining_ids.difference_update(file_changes)
+        return file_changes
+
+    def stage(result: FileResult):
+        if result.staged_path is not None:
+            transaction.stage(os.path.join(xml_directory, result.file_name))
+
+    # The same game can only be assigned to several files when some of them couldn't be indexed, in which
+    # case it's only known where it ended up after applying the changes one file at a time
+    assigned_ids = [game_id for ids in game_ids_by_file.values() for game_id in ids]
+    is_partitioned = len(assigned_ids) == len(set(assigned_ids))
+
+    try:
+        if workers > 1 and len(game_ids_by_file) > 1 and is_partitioned:
+            with ProcessPoolExecutor(max_workers=min(workers, len(game_ids_by_file))) as executor:
+                futures = {
+                    executor.submit(apply_changes_to_file, xml_directory, file_name, take_changes(file_name), create_elements_whitelist, streaming_threshold_mb, None, minimal_rewrite, instrumentation.enabled): file_name
+                    for file_name in game_ids_by_file
+                }
+
+                for future in as_completed(futures):
+                    games = 0 if future.exception() else len(future.result().games_changed) + len(future.result().games_failed)
+                    progress.file_done(futures[future], os.path.getsize(os.path.join(xml_directory, futures[future])), games)
+
+                    if progress.is_cancelled():
+                        # The files that are already being updated are left to finish, before rolling them back
+                        for pending in futures:
+                            pending.cancel()
+                        break
+
+            # Everything that was written is staged before raising the first error, so the rollback removes it
+            for future in futures:
+                if not future.cancelled() and future.exception() is None:
+                    results.append(future.result())
+                    stage(results[-1])
+
+            progress.check_cancelled()
+
+            for future in futures:
+                future.result()
+        else:
+            for file_name in game_ids_by_file:
+                progress.check_cancelled()
+                file_changes = take_changes(file_name)
+
+                if len(file_changes) == 0:
+                    continue
+
+                progress.start_file(file_name)
+                result = apply_changes_to_file(xml_directory, file_name, file_changes, create_elements_whitelist, streaming_threshold_mb, tree_cache, minimal_rewrite, instrumentation.enabled, progress)
+                # Games that weren't actually in this file can still be in one of the next ones
+                remaining_ids.update(set(file_changes) - result.games_changed - set(result.games_failed))
+                results.append(result)
+                stage(result)
+                progress.file_done(file_name, os.path.getsize(os.path.join(xml_directory, file_name)))
+
+        # Last chance to cancel, nothing was changed yet
+        progress.check_cancelled()
+
+        with instrumentation.timer("commit"):
+            transaction.commit()
+    except BaseException:
+        transaction.rollback()
+        raise
+
+    for result in results:
+        instrumentation.merge(result.instrumentation)
+
+    # The originals were renamed out of the way instead of being copied beforehand, and are only
+    # compressed once the backup run is finished
+    with instrumentation.timer("backup"):
+        for result in results:
+            if result.staged_path is not None:
+                file_path = os.path.join(xml_directory, result.file_name)
+                old_path = get_old_path(file_path)
+
+                # Renaming keeps the size and modification time
+                result.original_fingerprint = XmlIndex.get_fingerprint(old_path)
+                result.fingerprint = XmlIndex.get_fingerprint(file_path)
+
+                result.backup_hash, size = backup_run.backup_file(result.file_name, old_path, result.journal, move=True)
+                instrumentation.count("backup_bytes_read", size)
+
+    transaction.finish()
+
+    found_ids = set()
+    for result in results:
+        found_ids.update(result.games_changed, result.games_failed)
+
+    not_found = [game_id for game_id in changes if game_id not in found_ids]
+    return results, not_found
@@ -0,0 +1,133 @@
+"""Caches parsed changes files on disk, keyed by a hash of their contents."""
+
+import hashlib
+import io
+import json
+import os
+import pickle
+
+from typing import Dict, List, Tuple, Optional
+
+from src.util.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from src.util.xml_updater import ChangesParser, LineRange, aliased_keys
+
+# Bump whenever the way changes are processed changes, so older cache entries are ignored
+CACHE_FORMAT_VERSION = 1
+
+CACHE_FILE_EXTENSION = ".pickle"
+
+ChangesEntries = List[Tuple[str, Dict, LineRange]]
+
+
+def get_aliased_keys_version() -> str:
+    return hashlib.sha256(json.dumps(aliased_keys, sort_keys=True).encode("utf8")).hexdigest()
+
+
+class ChangesCache:
+    """
+    Keeps the result of `ChangesParser.iter_changes` for recently used changes files, so running the
+    same file again skips YAML parsing entirely. The oldest entries are removed once the cache grows
+    past `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(changes_bytes: bytes) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_FORMAT_VERSION}:{get_aliased_keys_version()}:".encode("utf8"))
+        digest.update(changes_bytes)
+
+        return digest.hexdigest()
+
+    def get_cache_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_FILE_EXTENSION)
+
+    def load(self, key: str) -> Optional[ChangesEntries]:
+        cache_path = self.get_cache_path(key)
+
+        try:
+            with open(cache_path, "rb") as file:
+                entries = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated, or from an older layout, which can fail in about any way. It's parsed again instead
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+            return None
+
+        # Mark it as recently used
+        os.utime(cache_path)
+        return entries
+
+    def store(self, key: str, entries: ChangesEntries):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        cache_path = self.get_cache_path(key)
+        temp_path = cache_path + ".tmp"
+
+        with open(temp_path, "wb") as file:
+            pickle.dump(entries, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in `max_bytes`."""
+        cache_files = []
+
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(CACHE_FILE_EXTENSION):
+                stat = os.stat(os.path.join(self.directory, file_name))
+                cache_files.append((stat.st_mtime_ns, stat.st_size, file_name))
+
+        total_size = sum(size for _, size, _ in cache_files)
+
+        for _, size, file_name in sorted(cache_files):
+            if total_size <= self.max_bytes:
+                break
+
+            os.remove(os.path.join(self.directory, file_name))
+            total_size -= size
+
+    def load_entries(self, file_path: str, instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> ChangesEntries:
+        """Returns what `ChangesParser.iter_changes` yields for `file_path`, parsing it only if it isn't cached."""
+        with open(file_path, "rb") as file:
+            changes_bytes = file.read()
+
+        instrumentation.count("changes_bytes_read", len(changes_bytes))
+
+        key = self.get_key(changes_bytes)
+        entries = self.load(key)
+
+        if entries is not None:
+            self.hits += 1
+            instrumentation.count("changes_cache_hits")
+            return entries
+
+        self.misses += 1
+
+        # Decoded the same way `ChangesParser.parse_changes_file` opens the file. Errors are raised
+        # before anything is stored, so only valid changes are cached
+        entries = list(ChangesParser.iter_changes(io.TextIOWrapper(io.BytesIO(changes_bytes), encoding="utf8")))
+        self.store(key, entries)
+
+        return entries
+
+    def parse_changes_file(self, file_path: str, instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Dict:
+        """A cached version of `ChangesParser.parse_changes_file`."""
+        with instrumentation.timer("parse_changes"):
+            changes = {game_id: document for game_id, document, _ in self.load_entries(file_path, instrumentation)}
+
+        instrumentation.count("games_in_changes", len(changes))
+        return changes
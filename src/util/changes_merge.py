@@ -0,0 +1,134 @@
+"""Merges several parsed changes files into one, so they can all be applied in a single pass."""
+
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.util.xml_updater import ChangesParser, aliased_keys
+
+# Game ID, then the element, the additional application and its element, as far as they apply
+ElementPath = Tuple[str, ...]
+
+
+class Conflict:
+    """Two or more changes files setting the same element of the same game to different values."""
+
+    def __init__(self, path: ElementPath, sources: List[Tuple[str, Any]]):
+        self.game_id = path[0]
+        self.element = " > ".join(path[1:])
+        # (changes file, value) in the order the files were given
+        self.sources = sources
+        # First line of the game in each changes file, filled in once the conflicts are known
+        self.lines: Dict[str, int] = {}
+
+    def __str__(self) -> str:
+        sources = ", ".join(
+            f"{file_path}:{self.lines[file_path]} sets {value!r}" if file_path in self.lines else f"{file_path} sets {value!r}"
+            for file_path, value in self.sources
+        )
+        return f"{self.game_id} '{self.element}': {sources}"
+
+
+class ConflictingChanges(Exception):
+    def __init__(self, conflicts: List[Conflict]):
+        super().__init__(f"{len(conflicts)} elements are changed differently by more than one changes file:\n" + "\n".join(str(conflict) for conflict in conflicts))
+        self.conflicts = conflicts
+
+
+class ChangesMerger:
+    """Merges changes files one at a time, remembering which file set every element first."""
+
+    def __init__(self):
+        self.merged: Dict[str, dict] = {}
+        self.conflicts: Dict[ElementPath, Conflict] = {}
+        # Element -> the changes file it was first set by, and the key it was set with (which may be an alias)
+        self.owners: Dict[ElementPath, Tuple[str, str]] = {}
+
+    def add(self, file_path: str, changes: dict):
+        for game_id, game_changes in changes.items():
+            self.merge_into(self.merged.setdefault(game_id, {}), game_changes, (game_id,), file_path)
+
+    def set_value(self, target: dict, key: str, value: Any, path: ElementPath, file_path: str):
+        if path not in self.owners:
+            self.owners[path] = (file_path, key)
+            target[key] = value
+            return
+
+        owner_file_path, existing_key = self.owners[path]
+        existing = target[existing_key]
+
+        if existing == value:
+            return
+
+        conflict = self.conflicts.get(path)
+        if conflict is None:
+            self.conflicts[path] = Conflict(path, [(owner_file_path, existing), (file_path, value)])
+        else:
+            conflict.sources.append((file_path, value))
+
+    def merge_into(self, target: dict, changes: dict, path: ElementPath, file_path: str, is_additional_application: bool = False):
+        for key, value in changes.items():
+            element_path = path + (aliased_keys.get(key, key),)
+
+            if key == "Additional Applications" and not is_additional_application and isinstance(value, dict):
+                if isinstance(target.get(key, value), dict):
+                    self.owners.setdefault(element_path, (file_path, key))
+                    self.merge_apps(target.setdefault(key, {}), value, element_path, file_path)
+                    continue
+
+            self.set_value(target, key, value, element_path, file_path)
+
+    def merge_apps(self, target: dict, apps: dict, path: ElementPath, file_path: str):
+        # Names of additional applications aren't aliased
+        for app_name, app_changes in apps.items():
+            app_path = path + (app_name,)
+
+            if isinstance(app_changes, dict) and isinstance(target.get(app_name, app_changes), dict):
+                self.owners.setdefault(app_path, (file_path, app_name))
+                self.merge_into(target.setdefault(app_name, {}), app_changes, app_path, file_path, True)
+            else:
+                self.set_value(target, app_name, app_changes, app_path, file_path)
+
+
+def find_game_lines(file_path: str) -> Dict[str, int]:
+    """Returns the first line of every game in a changes file."""
+    with open(file_path, "r", encoding="utf8") as changes_file:
+        return {game_id: line_range[0] for game_id, _, line_range in ChangesParser.iter_changes(changes_file)}
+
+
+def merge_changes_files(file_paths: List[str], parse_changes_file: Callable[[str], dict] = ChangesParser.parse_changes_file) -> dict:
+    """
+    Parses every changes file with `parse_changes_file` and merges them. Games changed by several files get
+    the changes of all of them, but setting the same element to different values raises `ConflictingChanges`,
+    listing every conflict with the files and lines involved.
+    """
+    if len(file_paths) == 1:
+        return parse_changes_file(file_paths[0])
+
+    merger = ChangesMerger()
+
+    for file_path in file_paths:
+        try:
+            changes = parse_changes_file(file_path)
+        except ChangesParser.ChangesError as e:
+            # Same type of error, so it's reported the same way, but saying which file it's in
+            e.args = (f"{file_path}: {e}",)
+            raise
+
+        merger.add(file_path, changes)
+
+    if merger.conflicts:
+        conflicts = list(merger.conflicts.values())
+        game_lines: Dict[str, Dict[str, int]] = {}
+
+        # Lines aren't kept when parsing, so only the files with conflicts are read again to find them
+        for conflict in conflicts:
+            for file_path, _ in conflict.sources:
+                if file_path not in game_lines:
+                    game_lines[file_path] = find_game_lines(file_path)
+
+                line = game_lines[file_path].get(conflict.game_id)
+                if line is not None:
+                    conflict.lines[file_path] = line
+
+        raise ConflictingChanges(conflicts)
+
+    return merger.merged
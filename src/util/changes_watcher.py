@@ -0,0 +1,177 @@
+"""Watches changes files for saves and applies only what changed since the last time, for watch mode."""
+
+import hashlib
+import os
+import re
+
+from typing import Dict, List, Optional, Tuple
+
+from src.util.xml_updater import ChangesParser
+from src.util.changes_merge import merge_changes_files
+from src.util.runner import ChangesRunner, RunSummary
+from src.util.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+
+# Separates two documents of a changes file, see `ChangesParser.iter_changes`
+DOCUMENT_SEPARATOR = re.compile(r"^---[ \t]*(?:#[^\n]*)?$", re.MULTILINE)
+
+# What counts as a changes file when watching a folder
+CHANGES_FILE_EXTENSIONS = (".yml", ".yaml", ".txt")
+
+
+class IncrementalChangesParser:
+    """
+    Parses a changes file like `ChangesParser.parse_changes_str`, but only the documents that changed since the
+    last call are parsed again. Anything the documents can't be split cleanly for, like an invalid file, goes
+    through the full parser, so errors are the same.
+    """
+
+    def __init__(self):
+        # Hash of a document -> its game ID and processed changes
+        self.documents: Dict[bytes, Tuple[str, dict]] = {}
+        self.documents_parsed = 0
+
+    def parse(self, changes_str: str) -> dict:
+        documents: Dict[bytes, Tuple[str, dict]] = {}
+        changes: Dict[str, dict] = {}
+
+        try:
+            for chunk in DOCUMENT_SEPARATOR.split(changes_str):
+                key = hashlib.sha1(chunk.encode("utf8")).digest()
+                parsed = self.documents.get(key)
+
+                if parsed is None:
+                    # Exactly one document, anything else is left to the full parser
+                    (game_id, document, _), = ChangesParser.iter_changes(chunk)
+                    parsed = (game_id, document)
+                    self.documents_parsed += 1
+
+                if parsed[0] in changes:
+                    raise ChangesParser.DuplicateGameId(f"The game ID '{parsed[0]}' already has changes associated with it")
+
+                documents[key] = parsed
+                changes[parsed[0]] = parsed[1]
+        except Exception:
+            # Raises the error with the right lines, or parses what the documents were split wrong for
+            self.documents = {}
+            return ChangesParser.parse_changes_str(changes_str)
+
+        self.documents = documents
+        return changes
+
+
+class ChangesWatcher:
+    """
+    Applies changes files, and every changes file in the given folders, each time one of them is saved. Only the games
+    whose changes are different from the last ones that were applied are applied again, and the platform files
+    they're in stay parsed in the runner's tree cache in between.
+
+    The platform files are never streamed, so their trees are kept whatever the streaming threshold and the memory budget of the
+    cache, and their backups are compressed in the background without holding up the next save. Call `stop`
+    when done.
+    """
+
+    def __init__(self, runner: ChangesRunner, xml_directory: str, changes_paths: List[str]):
+        self.runner = runner
+        self.xml_directory = xml_directory
+        self.changes_paths = changes_paths
+
+        # Changes file -> [size, modification time] when it was last read
+        self.fingerprints: Dict[str, List[int]] = {}
+        self.parsers: Dict[str, IncrementalChangesParser] = {}
+        self.parsed: Dict[str, dict] = {}
+        # Game ID -> the changes last applied to it successfully
+        self.applied: Dict[str, dict] = {}
+        # The files read by a poll that raised still have to be applied by the next one
+        self.pending = False
+
+    def list_changes_files(self) -> List[str]:
+        file_paths = []
+
+        for changes_path in self.changes_paths:
+            if os.path.isdir(changes_path):
+                file_paths += sorted(
+                    os.path.join(changes_path, file_name) for file_name in os.listdir(changes_path)
+                    if file_name.lower().endswith(CHANGES_FILE_EXTENSIONS) and os.path.isfile(os.path.join(changes_path, file_name))
+                )
+            elif os.path.isfile(changes_path):
+                file_paths.append(changes_path)
+
+        return file_paths
+
+    def get_saved_files(self) -> Tuple[List[str], bool]:
+        """Returns the changes files that are new or were saved since the last poll, and whether any were removed."""
+        file_paths = self.list_changes_files()
+        saved = []
+
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            fingerprint = [stat.st_size, stat.st_mtime_ns]
+
+            if self.fingerprints.get(file_path) != fingerprint:
+                self.fingerprints[file_path] = fingerprint
+                saved.append(file_path)
+
+        removed = set(self.fingerprints) - set(file_paths)
+        for file_path in removed:
+            del self.fingerprints[file_path]
+            self.parsers.pop(file_path, None)
+            self.parsed.pop(file_path, None)
+
+        return saved, len(removed) > 0
+
+    def get_delta(self, changes: dict) -> dict:
+        """The games whose changes aren't the ones that were last applied to them."""
+        return {game_id: game_changes for game_id, game_changes in changes.items() if self.applied.get(game_id) != game_changes}
+
+    def poll(self, instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Optional[RunSummary]:
+        """
+        Applies whatever changed since the last poll. Returns None if no changes file was saved or the saves
+        didn't change anything. Errors in the changes files are raised, and the files are read again once
+        they're saved next.
+        """
+        saved, removed = self.get_saved_files()
+        if not saved and not removed and not self.pending:
+            return None
+
+        self.pending = False
+
+        error: Optional[Exception] = None
+
+        with instrumentation.timer("parse_changes"):
+            for file_path in saved:
+                try:
+                    with open(file_path, "r", encoding="utf8") as file:
+                        self.parsed[file_path] = self.parsers.setdefault(file_path, IncrementalChangesParser()).parse(file.read())
+                except Exception as e:
+                    # Left out until it's saved again, the other saved files are still read
+                    self.parsed.pop(file_path, None)
+                    error = error or e
+
+            if error is not None:
+                self.pending = True
+                raise error
+
+            # Conflicts between the files are raised with their lines, like when applying them by hand. Nothing
+            # is applied until they're fixed
+            changes = merge_changes_files(list(self.parsed), self.parsed.__getitem__) if self.parsed else {}
+
+        delta = self.get_delta(changes)
+        instrumentation.count("games_in_changes", len(changes))
+        instrumentation.count("games_in_delta", len(delta))
+
+        if not delta:
+            return None
+
+        summary = self.runner.run(self.xml_directory, delta, instrumentation, wait_for_backup=False, keep_trees=True)
+
+        for result in summary.results:
+            for game_id in result.games_changed:
+                if game_id not in result.games_failed:
+                    self.applied[game_id] = delta[game_id]
+
+        return summary
+
+    def stop(self):
+        """Lets the trees of the platform files be evicted again and waits for the backups, raising what went wrong with them."""
+        self.runner.release_trees()
+        self.runner.finish_backups()
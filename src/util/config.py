@@ -0,0 +1,16 @@
+"""Where the editor keeps its files, and loading the ones the user can edit."""
+
+import os
+
+from typing import List
+
+BASE_DIR = os.path.normpath(os.path.dirname(os.path.abspath(__file__)) + "/../..")
+
+ELEMENTS_WHITELIST_PATH = BASE_DIR + "/elements_whitelist.txt"
+SETTINGS_PATH = BASE_DIR + "/settings.json"
+
+
+def load_elements_whitelist(file_path: str = ELEMENTS_WHITELIST_PATH) -> List[str]:
+    """Returns the elements that may be created when they're missing, one per line. Raises FileNotFoundError."""
+    with open(file_path, encoding="utf8") as file:
+        return [line.strip() for line in file if line.strip()]
@@ -0,0 +1,229 @@
+"""Replaces several platform XML files together, so a run either changes all of them or none."""
+
+import json
+import os
+
+from typing import List, Tuple
+
+STAGED_EXTENSION = ".new"
+OLD_EXTENSION = ".old"
+
+# Files are still being staged, a crash means nothing was replaced yet and the staged files are thrown away
+STATE_STAGING = "staging"
+# Every staged file was written and synced, a crash from here on means the replacement is finished on the next start
+STATE_PREPARED = "prepared"
+# Every file was replaced, only the original contents (kept as .old files) still have to be backed up
+STATE_COMMITTED = "committed"
+# Replacing the files failed partway through, a crash from here on means the originals are put back on the next start
+STATE_UNDOING = "undoing"
+
+
+def get_staged_path(file_path: str) -> str:
+    return file_path + STAGED_EXTENSION
+
+
+def get_old_path(file_path: str) -> str:
+    return file_path + OLD_EXTENSION
+
+
+def fsync_file(file_path: str):
+    # Windows only allows syncing files that are open for writing
+    with open(file_path, "ab") as file:
+        os.fsync(file.fileno())
+
+
+def fsync_directory(directory: str):
+    """Makes renames inside of `directory` durable. Not possible (or needed) on Windows."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FileTransaction:
+    """
+    New contents are written to a staged file next to every original. Once all of them are on disk, the
+    originals are renamed to .old files and the staged files renamed into their place. A journal at
+    `journal_path` records how far this got, so `recover` can finish or undo an interrupted run. If replacing
+    the files fails partway through, the originals are put back, and the journal is kept until they are.
+
+    The .old files are left for the caller to back up before calling `finish`, so the originals never
+    have to be copied before writing.
+    """
+
+    class RecoveryError(Exception):
+        pass
+
+    class OldFileExists(Exception):
+        pass
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        # Absolute paths of the files whose new contents were written to their staged path
+        self.files: List[str] = []
+        self.state = STATE_STAGING
+
+    def write_journal(self):
+        temp_path = self.journal_path + ".tmp"
+
+        with open(temp_path, "w", encoding="utf8") as file:
+            json.dump({"state": self.state, "files": self.files}, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, self.journal_path)
+
+    def stage(self, file_path: str):
+        """
+        Adds `file_path` to the transaction, once its new contents were written to `get_staged_path(file_path)`.
+        Refuses to, and throws the staged file away, if a file is already where the original would be moved to.
+        """
+        try:
+            self.check_old_path(file_path)
+        except self.OldFileExists:
+            os.remove(get_staged_path(file_path))
+            raise
+
+        self.files.append(os.path.abspath(file_path))
+        self.write_journal()
+
+    @classmethod
+    def check_old_path(cls, file_path: str):
+        """Raises `OldFileExists` if something that isn't ours is where the original of `file_path` would be moved to."""
+        old_path = get_old_path(file_path)
+
+        if os.path.exists(old_path):
+            raise cls.OldFileExists(f"'{old_path}' already exists and would be overwritten by the original of '{os.path.basename(file_path)}'. Move or rename it, then try again.")
+
+    def commit(self) -> List[Tuple[str, str]]:
+        """Replaces every staged file at once. Returns the path of every replaced file with the path of its original."""
+        if not self.files:
+            return []
+
+        for file_path in self.files:
+            fsync_file(get_staged_path(file_path))
+
+        self.state = STATE_PREPARED
+        self.write_journal()
+
+        try:
+            self.roll_forward(self.files)
+        except BaseException:
+            # Some of the files may already be replaced, so throwing the staged files away isn't enough
+            self.undo()
+            raise
+
+        self.state = STATE_COMMITTED
+        self.write_journal()
+
+        return [(file_path, get_old_path(file_path)) for file_path in self.files]
+
+    def rollback(self):
+        """
+        Throws away the staged files. Does nothing once `commit` started replacing the files, which either
+        finishes or puts the originals back itself, or leaves the journal for `recover` to do it.
+        """
+        if self.state != STATE_STAGING:
+            return
+
+        for file_path in self.files:
+            staged_path = get_staged_path(file_path)
+
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+
+        self.files = []
+        self.remove_journal()
+
+    def undo(self):
+        """Puts the originals of the files that were replaced back, and throws away the rest of the staged files."""
+        self.state = STATE_UNDOING
+        self.write_journal()
+
+        # Every step leaves the files in a state this can be repeated from after a crash
+        for file_path in self.files:
+            staged_path = get_staged_path(file_path)
+            old_path = get_old_path(file_path)
+
+            if os.path.exists(old_path):
+                if os.path.exists(file_path) and not os.path.exists(staged_path):
+                    os.replace(file_path, staged_path)
+                os.replace(old_path, file_path)
+
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+
+        for directory in {os.path.dirname(file_path) for file_path in self.files}:
+            fsync_directory(directory)
+
+        self.files = []
+        self.remove_journal()
+
+    def finish(self):
+        """Removes the originals of the replaced files, once they were backed up, and the journal."""
+        for file_path in self.files:
+            old_path = get_old_path(file_path)
+
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+        self.files = []
+        self.remove_journal()
+
+    def remove_journal(self):
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    @staticmethod
+    def roll_forward(files: List[str]):
+        # As long as a staged file exists, the file it replaces hasn't been touched, so this can be repeated after a crash
+        for file_path in files:
+            staged_path = get_staged_path(file_path)
+
+            if not os.path.exists(staged_path):
+                continue
+
+            if os.path.exists(file_path):
+                os.replace(file_path, get_old_path(file_path))
+            os.replace(staged_path, file_path)
+
+        for directory in {os.path.dirname(file_path) for file_path in files}:
+            fsync_directory(directory)
+
+    @classmethod
+    def recover(cls, journal_path: str) -> "FileTransaction":
+        """
+        Finishes a run that was interrupted after its files were prepared, or throws away its staged files
+        if it wasn't (putting back the originals of a run whose files failed to be replaced). Returns the transaction, whose `files` are the ones that were replaced (and still have
+        their .old file to back up) before `finish` is called.
+        """
+        transaction = cls(journal_path)
+
+        try:
+            with open(journal_path, "r", encoding="utf8") as file:
+                journal = json.load(file)
+        except FileNotFoundError:
+            return transaction
+        except ValueError as e:
+            raise cls.RecoveryError(f"The journal of an interrupted run ({journal_path}) is corrupted: {e}")
+
+        transaction.files = journal["files"]
+        transaction.state = journal["state"]
+
+        if transaction.state == STATE_STAGING:
+            transaction.rollback()
+        elif transaction.state == STATE_UNDOING:
+            transaction.undo()
+        elif transaction.state == STATE_PREPARED:
+            transaction.roll_forward(transaction.files)
+            transaction.state = STATE_COMMITTED
+            transaction.write_journal()
+
+        return transaction
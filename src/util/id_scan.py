@@ -0,0 +1,62 @@
+"""Finds which platform XML files contain some game IDs by searching their bytes, without parsing them."""
+
+import mmap
+import os
+import re
+
+from typing import Dict, Iterable, List, Set, Tuple
+
+from src.util.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from src.util.xml_index import XmlIndex
+
+# Only games have an <ID>, additional applications use <Id> and <GameID>
+GAME_ID_PATTERN = re.compile(rb"<ID>([^<]+)</ID>")
+
+
+def scan_file(file_path: str, game_ids: Set[bytes]) -> Set[bytes]:
+    """Returns which of `game_ids` are in the file, stopping as soon as all of them are found."""
+    found: Set[bytes] = set()
+
+    with open(file_path, "rb") as file:
+        # Empty files can't be mapped
+        if os.fstat(file.fileno()).st_size == 0:
+            return found
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in GAME_ID_PATTERN.finditer(data):
+                game_id = match.group(1)
+
+                if game_id in game_ids and game_id not in found:
+                    found.add(game_id)
+                    if len(found) == len(game_ids):
+                        break
+
+    return found
+
+
+def locate_games(directory: str, game_ids: Iterable[str], instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Tuple[Dict[str, List[str]], List[str]]:
+    """
+    Same as `XmlIndex.locate`, but searches the files of `directory` for the IDs every time instead of keeping
+    an index. Files are searched in directory order and the search stops once every ID has been found.
+    """
+    # A number in the changes file isn't a game ID the updater can match, but it still has to be reported as missing
+    remaining = {str(game_id).encode("utf8"): game_id for game_id in game_ids}
+    located: Dict[str, List[str]] = {}
+
+    for file_name in XmlIndex.list_xml_files(directory):
+        if not remaining:
+            break
+
+        file_path = os.path.join(directory, file_name)
+        found = scan_file(file_path, set(remaining))
+
+        instrumentation.count("files_prescanned")
+        instrumentation.count("bytes_prescanned", os.path.getsize(file_path))
+
+        if found:
+            # The first file containing an ID wins, like with the index
+            located[file_name] = [game_id for encoded_id, game_id in remaining.items() if encoded_id in found]
+            for encoded_id in found:
+                del remaining[encoded_id]
+
+    return located, list(remaining.values())
@@ -0,0 +1,102 @@
+"""Timers and counters recording where the time of a run goes and how much work it did."""
+
+import time
+
+from typing import Dict
+
+
+class Timer:
+    """Adds the time spent inside of a `with` block to a timing of an `Instrumentation`."""
+
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: Dict[str, float], name: str):
+        self.timings = timings
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+class Instrumentation:
+    """
+    Timings (in seconds) and counters of a run, by name. Timers of the same name add up, so phases that
+    happen once per file or per game are reported as a single total. Only holds plain dicts, so it can
+    be returned from worker processes and merged into the one of the run.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def timer(self, name: str) -> Timer:
+        return Timer(self.timings, name)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, other: "Instrumentation"):
+        for name, seconds in other.timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+
+    def to_json(self) -> dict:
+        return {
+            "timings": {name: round(seconds, 4) for name, seconds in self.timings.items()},
+            "counters": dict(self.counters)
+        }
+
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class NullInstrumentation(Instrumentation):
+    """Records nothing, used when instrumentation is turned off so callers never have to check."""
+
+    enabled = False
+
+    TIMER = NullTimer()
+
+    def timer(self, name: str) -> NullTimer:
+        return self.TIMER
+
+    def count(self, name: str, amount: int = 1):
+        pass
+
+    def merge(self, other: Instrumentation):
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+def render_report(report: dict) -> str:
+    """Formats what `Instrumentation.to_json` returns as text, slowest phases first."""
+    spacing = "      "
+    lines = ["Timings", ""]
+
+    for name, seconds in sorted(report["timings"].items(), key=lambda item: -item[1]):
+        lines.append(spacing + f"{name}: {seconds:.3f} s")
+
+    lines += ["", "Counters", ""]
+
+    for name, amount in sorted(report["counters"].items()):
+        lines.append(spacing + f"{name}: {amount:,}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,74 @@
+"""Splits text that's produced in chunks into lines, only as far as they're needed."""
+
+from typing import Iterable, List, Optional, Tuple
+
+
+class LazyLines:
+    """
+    The lines of the text made up of `chunks`, pulled from the iterable as they're asked for. The lines
+    are the same as the ones of `"".join(chunks).split("\\n")`.
+    """
+
+    def __init__(self, chunks: Iterable[str]):
+        self.chunks = iter(chunks)
+        self.lines: List[str] = []
+        # The end of the last chunk, which might continue in the next one
+        self.partial_line = ""
+        self.exhausted = False
+
+    def load(self, count: int):
+        """Makes sure at least `count` lines are loaded, unless there aren't that many."""
+        while len(self.lines) < count and not self.exhausted:
+            chunk = next(self.chunks, None)
+
+            if chunk is None:
+                self.lines.append(self.partial_line)
+                self.partial_line = ""
+                self.exhausted = True
+                break
+
+            parts = (self.partial_line + chunk).split("\n")
+            self.lines.extend(parts[:-1])
+            self.partial_line = parts[-1]
+
+    def load_all(self):
+        while not self.exhausted:
+            self.load(len(self.lines) + 1)
+
+    def get(self, start: int, end: int) -> List[str]:
+        self.load(end)
+        return self.lines[start:end]
+
+    def find(self, query: str, line: int = 0, column: int = 0) -> Optional[Tuple[int, int]]:
+        """
+        Returns the line and column of the next case insensitive match of `query`, starting at `line` and
+        `column`, and wrapping around to the start once the end is reached. Lines are only loaded as far
+        as the match.
+        """
+        query = query.lower()
+
+        if not query:
+            return None
+
+        index = line
+
+        while True:
+            self.load(index + 1)
+
+            if index >= len(self.lines):
+                break
+
+            found = self.lines[index].lower().find(query, column if index == line else 0)
+            if found != -1:
+                return index, found
+
+            index += 1
+
+        for index in range(0, min(line + 1, len(self.lines))):
+            found = self.lines[index].lower().find(query)
+
+            # The rest of the starting line was already searched
+            if found != -1 and (index < line or found < column):
+                return index, found
+
+        return None
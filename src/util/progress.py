@@ -0,0 +1,111 @@
+"""Progress of a run that goes on in another thread, and a way to cancel it."""
+
+import threading
+import time
+
+from typing import Callable, Dict, Optional
+
+
+class Cancelled(Exception):
+    """Raised between files once a run was cancelled. Nothing was written by then."""
+    pass
+
+
+class Progress:
+    """
+    How far a run got, in files, games and bytes of platform XML files. `listener` is called with a
+    snapshot from the thread doing the work, at most every `interval` seconds for games and always when
+    a file is done, so it should only hand the snapshot over to whoever displays it.
+    """
+
+    def __init__(self, listener: Optional[Callable[[dict], None]] = None, interval: float = 0.1):
+        self.listener = listener
+        self.interval = interval
+        self.cancel_event = threading.Event()
+
+        self.total_files = 0
+        self.total_games = 0
+        self.total_bytes = 0
+        self.files_done = 0
+        self.games_done = 0
+        self.bytes_done = 0
+        self.current_file: Optional[str] = None
+
+        self.start_time = time.perf_counter()
+        self.last_report = 0.0
+
+    def start_run(self, file_sizes: Dict[str, int], total_games: int):
+        self.total_files = len(file_sizes)
+        self.total_games = total_games
+        self.total_bytes = sum(file_sizes.values())
+        self.start_time = time.perf_counter()
+        self.report()
+
+    def start_file(self, file_name: str):
+        self.current_file = file_name
+        self.report()
+
+    def game_done(self, game_id: Optional[str] = None):
+        self.games_done += 1
+
+        if time.perf_counter() - self.last_report >= self.interval:
+            self.report()
+
+    def file_done(self, file_name: str, size: int, games: int = 0):
+        """`games` are the games of the file that weren't already reported one at a time."""
+        self.files_done += 1
+        self.bytes_done += size
+        self.games_done += games
+        self.report()
+
+    def cancel(self):
+        """Can be called from any thread, the run stops before its next file."""
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise Cancelled("The run was cancelled, none of the XML files were changed")
+
+    def get_eta(self) -> Optional[float]:
+        """Seconds left, estimated from the bytes done so far. None until the first file is done."""
+        if self.bytes_done == 0 or self.total_bytes == 0:
+            return None
+
+        elapsed = time.perf_counter() - self.start_time
+        return elapsed * (self.total_bytes - self.bytes_done) / self.bytes_done
+
+    def snapshot(self) -> dict:
+        return {
+            "current_file": self.current_file,
+            "files_done": self.files_done,
+            "total_files": self.total_files,
+            "games_done": self.games_done,
+            "total_games": self.total_games,
+            "bytes_done": self.bytes_done,
+            "total_bytes": self.total_bytes,
+            "eta": self.get_eta(),
+            "cancelled": self.is_cancelled()
+        }
+
+    def report(self):
+        self.last_report = time.perf_counter()
+
+        if self.listener is not None:
+            self.listener(self.snapshot())
+
+
+def format_progress(snapshot: dict) -> str:
+    """A single line describing a snapshot of `Progress`."""
+    text = f"{snapshot['files_done']}/{snapshot['total_files']} files, {snapshot['games_done']}/{snapshot['total_games']} games, "
+    text += f"{snapshot['bytes_done'] / (1024 * 1024):.1f}/{snapshot['total_bytes'] / (1024 * 1024):.1f} MB"
+
+    if snapshot["cancelled"]:
+        return text + ", cancelling..."
+
+    if snapshot["eta"] is not None:
+        text += f", about {int(snapshot['eta']) + 1} s left"
+
+    return text
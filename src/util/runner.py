@@ -0,0 +1,254 @@
+"""Everything needed to apply changes files to a directory of platform XML files, without any UI."""
+
+import json
+import os
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from src.util.xml_updater import ChangesParser
+from src.util.xml_index import XmlIndex
+from src.util.id_scan import locate_games
+from src.util.changes_merge import merge_changes_files
+from src.util.batch_updater import FileResult, apply_changes, check_changes
+from src.util.changes_cache import ChangesCache
+from src.util.tree_cache import TreeCache
+from src.util.backup_store import BackupStore
+from src.util.file_transaction import FileTransaction, get_old_path
+from src.util.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from src.util.progress import Progress
+from src.util.config import BASE_DIR
+
+
+class RunSummary:
+    """What happened when applying one changes file."""
+
+    def __init__(self, xml_directory: str, instrumentation: Instrumentation):
+        self.xml_directory = xml_directory
+        self.results: List[FileResult] = []
+        self.missing_games: List[str] = []
+        self.run_id: Optional[str] = None
+        self.instrumentation = instrumentation
+
+    def has_errors(self) -> bool:
+        return len(self.missing_games) > 0 or any(len(result.games_failed) > 0 for result in self.results)
+
+    def to_json(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "changed": {result.file_name: sorted(result.games_changed) for result in self.results if result.games_changed},
+            "failed": [
+                {"game_id": game_id, "file": result.file_name, "type": type(error).__name__, "error": str(error)}
+                for result in self.results for game_id, error in result.games_failed.items()
+            ],
+            "missing": self.missing_games,
+            **self.instrumentation.to_json()
+        }
+
+
+class ChangesRunner:
+    """
+    Holds everything that's kept around between runs: the index of the XML files, the changes cache,
+    the parsed trees and the backups. All of them live in `data_dir`.
+    """
+
+    def __init__(self, settings: dict, create_elements_whitelist: List[str], data_dir: str = BASE_DIR):
+        self.settings = settings
+        self.create_elements_whitelist = create_elements_whitelist
+
+        self.commit_journal_path = os.path.join(data_dir, "commit_journal.json")
+        self.report_path = os.path.join(data_dir, "last_run_report.json")
+        self.xml_index = XmlIndex(os.path.join(data_dir, "xml_index.json")) if settings["xml_index"] else None
+        self.backup_store = BackupStore(os.path.join(data_dir, "xmlbackups"), int(settings["backup_retention_mb"] * 1024 * 1024))
+
+        self.changes_cache = None
+        if settings["changes_cache_mb"] is not None:
+            self.changes_cache = ChangesCache(os.path.join(data_dir, "changes_cache"), int(settings["changes_cache_mb"] * 1024 * 1024))
+
+        # Platform files that only we touched since the last run don't need to be parsed again
+        self.tree_cache = None
+        if settings["tree_cache_mb"] is not None:
+            self.tree_cache = TreeCache(int(settings["tree_cache_mb"] * 1024 * 1024))
+
+        # The backups of the last runs, when they're left to finish in the background one after another
+        self.backup_executor: Optional[ThreadPoolExecutor] = None
+        self.pending_backups: List[Future] = []
+
+    def recover_interrupted_run(self, xml_directory: Optional[str] = None) -> List[str]:
+        """
+        Finishes replacing the XML files of a run that was interrupted partway through, and backs up their
+        originals. Also finishes the backups that failed or were interrupted, and backs up the originals left
+        in `xml_directory` without any record of them. Returns the paths of the files that were replaced.
+        """
+        self.backup_store.recover_pending_runs()
+
+        transaction = FileTransaction.recover(self.commit_journal_path)
+        recovered = list(transaction.files)
+
+        if len(transaction.files) > 0:
+            backup_run = self.backup_store.start_run(os.path.dirname(transaction.files[0]))
+            for file_path in transaction.files:
+                if os.path.exists(get_old_path(file_path)):
+                    backup_run.backup_file(os.path.basename(file_path), get_old_path(file_path), move=True)
+
+            # The journal is kept if this fails, so it's tried again next time
+            backup_run.finish()
+            transaction.finish()
+
+        directories = {os.path.dirname(file_path) for file_path in recovered}
+        if xml_directory is not None and os.path.isdir(xml_directory):
+            directories.add(os.path.abspath(xml_directory))
+
+        for directory in directories:
+            self.backup_store.recover_orphans(directory)
+
+        return recovered
+
+    def has_pending_commit(self) -> bool:
+        """
+        True if files were replaced but their originals still have to be backed up, or the originals still have
+        to be put back, by `recover_interrupted_run`.
+        """
+        return os.path.exists(self.commit_journal_path) or self.backup_store.has_pending_runs()
+
+    def create_instrumentation(self) -> Instrumentation:
+        """Returns what a run should record its timings and counters into, depending on the settings."""
+        return Instrumentation() if self.settings["instrumentation"] else NULL_INSTRUMENTATION
+
+    def parse_changes_file(self, file_path: str, instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Dict:
+        if self.changes_cache:
+            return self.changes_cache.parse_changes_file(file_path, instrumentation)
+
+        return ChangesParser.parse_changes_file(file_path, instrumentation)
+
+    def parse_changes_files(self, file_paths: List[str], instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Dict:
+        """Parses and merges several changes files, so they're applied with one pass over every platform file."""
+        return merge_changes_files(file_paths, lambda file_path: self.parse_changes_file(file_path, instrumentation))
+
+    def locate(self, xml_directory: str, changes: dict, instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Tuple[Dict[str, List[str]], List[str]]:
+        """Returns the IDs of the games in `changes` by the file they're in, and the ones that aren't in any file."""
+        # Only open the files that actually contain the games we're looking for
+        if self.xml_index is None:
+            with instrumentation.timer("prescan"):
+                return locate_games(xml_directory, changes, instrumentation)
+
+        with instrumentation.timer("index"):
+            self.xml_index.refresh(xml_directory)
+            return self.xml_index.locate(changes)
+
+    def finish_backups(self):
+        """
+        Waits for the backups left to finish in the background by the last runs, raising what went wrong with
+        the first one that failed, and stops the thread they were finished on.
+        """
+        pending_backups, self.pending_backups = self.pending_backups, []
+
+        if self.backup_executor is not None:
+            self.backup_executor.shutdown()
+            self.backup_executor = None
+
+        for pending_backup in pending_backups:
+            pending_backup.result()
+
+    def check_backups(self):
+        """Raises what went wrong with the backups that were finished in the background so far, without waiting for the others."""
+        done = [pending_backup for pending_backup in self.pending_backups if pending_backup.done()]
+        self.pending_backups = [pending_backup for pending_backup in self.pending_backups if not pending_backup.done()]
+
+        for pending_backup in done:
+            pending_backup.result()
+
+    def apply(self, xml_directory: str, changes: dict, game_ids_by_file: Dict[str, List[str]], instrumentation: Instrumentation = NULL_INSTRUMENTATION, progress: Optional[Progress] = None, wait_for_backup: bool = True, keep_trees: bool = False) -> Tuple[List[FileResult], List[str], Optional[str]]:
+        """
+        Applies `changes` to the files they were located in and backs up the originals. Returns the results,
+        the games that weren't found and the ID of the run in the backup store. Raises `Cancelled` if
+        `progress` was cancelled before the files were replaced.
+
+        Without `wait_for_backup`, the originals are still taken before the files are replaced, but compressing
+        them is finished in the background, after the backups of the previous runs and until `finish_backups`.
+        Until a backup is finished, the originals it moved out of the way are recorded in the backup store, so
+        `recover_interrupted_run` still backs them up if it failed or the process ended first.
+        With `keep_trees`, the files are never streamed, and their trees stay in the tree cache whatever its
+        memory budget, until `release_trees`.
+        """
+        if wait_for_backup:
+            with instrumentation.timer("backup_finish"):
+                self.finish_backups()
+        else:
+            self.check_backups()
+
+        if keep_trees and self.tree_cache:
+            for file_name in game_ids_by_file:
+                self.tree_cache.pin(os.path.join(xml_directory, file_name))
+
+        backup_run = self.backup_store.start_run(xml_directory)
+
+        try:
+            with instrumentation.timer("apply"):
+                results, not_found = apply_changes(
+                    xml_directory, changes, game_ids_by_file, self.create_elements_whitelist, backup_run, self.commit_journal_path,
+                    streaming_threshold_mb=None if keep_trees else self.settings["streaming_threshold_mb"], workers=self.settings["workers"],
+                    tree_cache=self.tree_cache, minimal_rewrite=self.settings["minimal_rewrite"], instrumentation=instrumentation,
+                    progress=progress
+                )
+
+            # The written files don't have to be rescanned by the next run
+            if self.xml_index is not None:
+                self.xml_index.record_rewrites(xml_directory, {
+                    result.file_name: (result.original_fingerprint, result.fingerprint) for result in results if result.fingerprint is not None
+                })
+        finally:
+            # Whatever was backed up is kept, even if something went wrong afterwards
+            if wait_for_backup:
+                with instrumentation.timer("backup_finish"):
+                    run_id = backup_run.finish()
+            else:
+                if self.backup_executor is None:
+                    self.backup_executor = ThreadPoolExecutor(max_workers=1)
+
+                self.pending_backups.append(self.backup_executor.submit(backup_run.finish))
+                run_id = backup_run.id if backup_run.files else None
+
+        return results, not_found, run_id
+
+    def release_trees(self):
+        """Lets the trees kept by `apply(keep_trees=True)` be evicted from the tree cache again."""
+        if self.tree_cache:
+            self.tree_cache.unpin_all()
+
+    def check(self, xml_directory: str, changes: dict, instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Tuple[Dict[str, List[Exception]], List[str]]:
+        """
+        Finds every problem `changes` would run into without changing anything, see `check_changes`. Returns
+        the problems by game ID and the games that weren't found.
+        """
+        game_ids_by_file, missing_games = self.locate(xml_directory, changes, instrumentation)
+
+        changes = {game_id: game_changes for game_id, game_changes in changes.items() if game_id not in missing_games}
+
+        problems, not_found = check_changes(
+            xml_directory, changes, game_ids_by_file, self.create_elements_whitelist,
+            streaming_threshold_mb=self.settings["streaming_threshold_mb"], tree_cache=self.tree_cache, instrumentation=instrumentation
+        )
+
+        return problems, missing_games + not_found
+
+    def run(self, xml_directory: str, changes: dict, instrumentation: Instrumentation = NULL_INSTRUMENTATION, wait_for_backup: bool = True, keep_trees: bool = False) -> RunSummary:
+        """Locates and applies `changes` in one go."""
+        summary = RunSummary(xml_directory, instrumentation)
+
+        game_ids_by_file, summary.missing_games = self.locate(xml_directory, changes, instrumentation)
+
+        changes = {game_id: game_changes for game_id, game_changes in changes.items() if game_id not in summary.missing_games}
+
+        summary.results, not_found, summary.run_id = self.apply(xml_directory, changes, game_ids_by_file, instrumentation, wait_for_backup=wait_for_backup, keep_trees=keep_trees)
+        summary.missing_games.extend(not_found)
+        return summary
+
+    def write_report(self, run_id: Optional[str], instrumentation: Instrumentation) -> dict:
+        """Saves the timings and counters of the last run as JSON next to the backups, and returns them."""
+        report = {"run_id": run_id, **instrumentation.to_json()}
+
+        with open(self.report_path, "w", encoding="utf8") as file:
+            json.dump(report, file, indent=2)
+
+        return report
@@ -0,0 +1,53 @@
+"""Loads the optional settings.json file, falling back to defaults for anything that isn't set."""
+
+import json
+
+from typing import Dict, Any
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    # Platform XML files at least this big (in megabytes) are streamed instead of being loaded
+    # into memory all at once. Set to null to never stream
+    "streaming_threshold_mb": 64,
+    # Number of processes used to update platform XML files in parallel. 1 updates them one after another
+    "workers": 1,
+    # Maximum size of the cache of parsed changes files, in megabytes. Set to null to always parse them
+    "changes_cache_mb": 32,
+    # Memory budget for keeping parsed platform XML files around between runs, in megabytes. Set to null to always reparse them
+    "tree_cache_mb": 512,
+    # Only rewrite the games and additional applications that changed, leaving the rest of the file as it was
+    "minimal_rewrite": True,
+    # Disk space the compressed backups of previous runs may take up, in megabytes. The oldest runs are removed first
+    "backup_retention_mb": 2048,
+    # Record how long every phase of a run takes and how much work it did, shown along with the results
+    "instrumentation": True,
+    # Remember which platform file every game is in between runs. When off, the files are searched for the
+    # IDs of the changed games every run instead, which is faster than building the index when it's only used once
+    "xml_index": True,
+}
+
+
+class InvalidSettings(Exception):
+    pass
+
+
+def load_settings(file_path: str) -> Dict[str, Any]:
+    """Returns the settings from `file_path` merged over the defaults. A missing file isn't an error."""
+    settings = dict(DEFAULT_SETTINGS)
+
+    try:
+        with open(file_path, "r", encoding="utf8") as file:
+            user_settings = json.load(file)
+    except FileNotFoundError:
+        return settings
+    except ValueError as e:
+        raise InvalidSettings(f"settings.json is not valid JSON: {e}")
+
+    if not isinstance(user_settings, dict):
+        raise InvalidSettings("settings.json must contain an object")
+
+    unknown_keys = set(user_settings) - set(DEFAULT_SETTINGS)
+    if unknown_keys:
+        raise InvalidSettings("Unknown settings: " + ", ".join(sorted(unknown_keys)))
+
+    settings.update(user_settings)
+    return settings
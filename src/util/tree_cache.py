@@ -0,0 +1,97 @@
+"""Keeps parsed platform XML trees in memory between runs."""
+
+from lxml import etree as ET
+
+import os
+from collections import OrderedDict
+
+from typing import Optional, Set, Tuple
+
+# Rough size of a parsed tree compared to the size of its file
+TREE_MEMORY_FACTOR = 5
+
+
+class TreeCache:
+    """
+    A least recently used cache of parsed trees, keyed by file path and invalidated whenever the
+    size or modification time of the file changes. Trees are evicted once their estimated memory
+    usage goes past `max_bytes`. Pinned files are kept whatever their size, until they're unpinned.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+
+        # Path -> (fingerprint, tree, estimated size)
+        self.trees: "OrderedDict[str, Tuple[Tuple[int, int], ET.ElementTree, int]]" = OrderedDict()
+        self.pinned: Set[str] = set()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_fingerprint(file_path: str) -> Tuple[int, int]:
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def take(self, file_path: str) -> Optional[ET.ElementTree]:
+        """
+        Returns the cached tree of `file_path` if the file hasn't changed since it was cached. The tree is
+        removed from the cache, since it's about to be modified, and has to be `put` back afterwards.
+        """
+        file_path = os.path.abspath(file_path)
+        entry = self.trees.get(file_path)
+        self.invalidate(file_path)
+
+        if entry is not None and entry[0] == self.get_fingerprint(file_path):
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        return None
+
+    def put(self, file_path: str, tree: ET.ElementTree, staged_path: Optional[str] = None):
+        """
+        Caches `tree` as the current contents of `file_path`. Call it again after writing the tree to the file.
+        If the tree was written to a `staged_path` that's about to be renamed over `file_path`, the fingerprint
+        is taken from there, since renaming keeps the size and modification time.
+        """
+        file_path = os.path.abspath(file_path)
+        self.invalidate(file_path)
+
+        fingerprint = self.get_fingerprint(staged_path or file_path)
+        estimated_size = fingerprint[0] * TREE_MEMORY_FACTOR
+
+        if estimated_size > self.max_bytes and file_path not in self.pinned:
+            return
+
+        self.trees[file_path] = (fingerprint, tree, estimated_size)
+        self.used_bytes += estimated_size
+        self.evict()
+
+    def evict(self):
+        # Least recently used first
+        for file_path in list(self.trees):
+            if self.used_bytes <= self.max_bytes:
+                break
+
+            if file_path not in self.pinned:
+                self.invalidate(file_path)
+
+    def pin(self, file_path: str):
+        """Keeps the tree of `file_path` cached from now on, even if it goes past the memory budget."""
+        self.pinned.add(os.path.abspath(file_path))
+
+    def unpin_all(self):
+        self.pinned.clear()
+        self.evict()
+
+    def invalidate(self, file_path: str):
+        entry = self.trees.pop(os.path.abspath(file_path), None)
+
+        if entry is not None:
+            self.used_bytes -= entry[2]
+
+    def clear(self):
+        self.trees.clear()
+        self.used_bytes = 0
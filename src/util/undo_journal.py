@@ -0,0 +1,196 @@
+"""Undoes the changes recorded in `XmlUpdater.journal` by patching only the affected elements of a file."""
+
+from lxml import etree as ET
+
+import os
+import re
+from xml.sax.saxutils import escape
+
+from typing import Dict, List, Optional, Tuple
+
+from src.util.xml_updater import JournalEntry, OWNER_ID_TAGS
+from src.util.xml_writer import serialize_in_place, get_newline
+
+ROOT_TAG_PATTERN = re.compile(rb"<(?![?!])([^\s/>]+)")
+
+Owner = Tuple[str, str]
+
+
+def find_element_spans(data: bytes, tag: str, element_id: str) -> List[Tuple[int, int]]:
+    """
+    Returns the byte spans of the `tag` elements in `data` whose ID is `element_id`. Only the bytes around
+    each match are looked at, so this is about as fast as searching the file for the ID.
+    """
+    id_tag = OWNER_ID_TAGS[tag].encode("utf8")
+    needle = b"<" + id_tag + b">" + escape(element_id).encode("utf8") + b"</" + id_tag + b">"
+    start_tag = b"<" + tag.encode("utf8")
+    end_tag = b"</" + tag.encode("utf8") + b">"
+
+    spans = []
+    position = data.find(needle)
+
+    while position != -1:
+        # Skip over longer tags starting with the same name, like <GameID> when looking for <Game>
+        start = data.rfind(start_tag, 0, position)
+        while start != -1 and data[start + len(start_tag):start + len(start_tag) + 1] not in (b">", b" ", b"\t", b"\r", b"\n"):
+            start = data.rfind(start_tag, 0, start)
+
+        end = data.find(end_tag, position)
+
+        # The ID has to be inside of the element, not in between two of them
+        if start != -1 and end != -1 and data.find(end_tag, start, position) == -1:
+            spans.append((start, end + len(end_tag)))
+
+        position = data.find(needle, position + len(needle))
+
+    return spans
+
+
+def get_current_ids(journal: List[JournalEntry]) -> Dict[Owner, str]:
+    """Returns the ID every owner ended up with, for the rare case where the journal changed an ID itself."""
+    renamed: Dict[Owner, str] = {}
+
+    for entry in journal:
+        if entry[0] == "set" and entry[3] == OWNER_ID_TAGS.get(entry[1]) and entry[5]:
+            renamed[(entry[1], entry[2])] = entry[5]
+
+    current_ids: Dict[Owner, str] = {}
+
+    for owner in renamed:
+        tag, current_id = owner
+        seen = set()
+
+        while (tag, current_id) in renamed and current_id not in seen:
+            seen.add(current_id)
+            current_id = renamed[(tag, current_id)]
+
+        current_ids[owner] = current_id
+
+    return current_ids
+
+
+def undo_entry(entry: JournalEntry, candidates: List[ET.Element]) -> Optional[ET.Element]:
+    """Reverts `entry` in the first of `candidates` that still has the value it set. Returns the changed element."""
+    action, _, _, tag = entry[:4]
+
+    for candidate in candidates:
+        if action == "set":
+            new_text = entry[5]
+            child = candidate.find(tag)
+
+            # An empty element is read back without any text
+            if child is not None and (child.text or "") == (new_text or ""):
+                child.text = entry[4]
+                return candidate
+        else:
+            new_text = entry[4]
+
+            for child in reversed(candidate.findall(tag)):
+                if (child.text or "") == (new_text or ""):
+                    candidate.remove(child)
+                    return candidate
+
+    return None
+
+
+def get_reverse_patch(data: bytes, journal: List[JournalEntry]) -> Tuple[bytes, List[str]]:
+    """
+    Returns `data` with the changes in `journal` undone, along with a description of every change that
+    couldn't be undone because the element was changed again or removed since.
+
+    Only the elements named in the journal are parsed and rewritten, every other byte is left untouched.
+    """
+    conflicts: List[str] = []
+    current_ids = get_current_ids(journal)
+
+    root_match = ROOT_TAG_PATTERN.search(data)
+    if root_match is None:
+        return data, ["The file doesn't contain any elements"]
+
+    root = ET.Element(root_match.group(1).decode("utf8"))
+    parser = ET.XMLParser(remove_blank_text=True)
+
+    # Owner -> [(start, end, parsed element)], only parsed the first time the owner comes up
+    owners: Dict[Owner, List[Tuple[int, int, ET.Element]]] = {}
+    changed: Dict[Tuple[int, int], ET.Element] = {}
+    removed: List[Tuple[int, int]] = []
+
+    def get_candidates(tag: str, element_id: str) -> List[Tuple[int, int, ET.Element]]:
+        owner = (tag, element_id)
+
+        if owner not in owners:
+            current_id = current_ids.get(owner, element_id)
+            owners[owner] = [
+                (start, end, ET.fromstring(data[start:end], parser))
+                for start, end in find_element_spans(data, tag, current_id)
+            ]
+
+        return owners[owner]
+
+    for entry in reversed(journal):
+        if entry[0] == "create_app":
+            spans = find_element_spans(data, "AdditionalApplication", entry[1])
+
+            if spans:
+                removed.extend(spans)
+            else:
+                conflicts.append(f"Additional application '{entry[1]}' no longer exists")
+            continue
+
+        tag, element_id, child_tag = entry[1:4]
+        candidates = get_candidates(tag, element_id)
+        changed_element = undo_entry(entry, [element for _, _, element in candidates])
+
+        if changed_element is None:
+            what = "value" if entry[0] == "set" else "created element"
+            conflicts.append(f"{element_id}: The {what} of '{child_tag}' was changed since, so it was left alone")
+            continue
+
+        for start, end, element in candidates:
+            if element is changed_element:
+                changed[(start, end)] = element
+
+    newline = get_newline(data)
+    patches: List[Tuple[int, int, bytes]] = []
+
+    for (start, end), element in changed.items():
+        if (start, end) not in removed:
+            patches.append((start, end, serialize_in_place(root, element).replace(b"\n", newline)))
+
+    for start, end in set(removed):
+        # Take the indentation and line break around the element along with it
+        line_start = start
+        while line_start > 0 and data[line_start - 1:line_start] in (b" ", b"\t"):
+            line_start -= 1
+
+        if data[end:end + len(newline)] == newline:
+            end += len(newline)
+
+        patches.append((line_start, end, b""))
+
+    parts = []
+    position = 0
+
+    for start, end, replacement in sorted(patches):
+        parts.append(data[position:start])
+        parts.append(replacement)
+        position = end
+
+    parts.append(data[position:])
+    return b"".join(parts), conflicts
+
+
+def undo_file(file_path: str, journal: List[JournalEntry]) -> List[str]:
+    """Undoes `journal` in `file_path`. Returns the changes that couldn't be undone."""
+    with open(file_path, "rb") as file:
+        data = file.read()
+
+    patched, conflicts = get_reverse_patch(data, journal)
+
+    if patched != data:
+        temp_path = file_path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(patched)
+        os.replace(temp_path, file_path)
+
+    return conflicts
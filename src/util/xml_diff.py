@@ -0,0 +1,108 @@
+"""Compares the touched games and additional applications of an updated tree with how they were before."""
+
+from lxml import etree as ET
+
+from typing import Dict, List, Optional, Tuple
+
+from src.util.xml_updater import XmlUpdater, OWNER_ID_TAGS
+
+# Element name, old value and new value. A value is None if the element doesn't exist on that side
+FieldChange = Tuple[str, Optional[str], Optional[str]]
+
+# The child that names each kind of element in a report
+NAME_TAGS = {"Game": "Title", "AdditionalApplication": "Name"}
+
+
+class ElementDiff:
+    """The fields that changed in a single `<Game>` or `<AdditionalApplication>`."""
+
+    def __init__(self, tag: str, element_id: Optional[str], name: Optional[str], game_id: Optional[str], created: bool, fields: List[FieldChange]):
+        self.tag = tag
+        self.element_id = element_id
+        self.name = name
+        # The game an additional application belongs to
+        self.game_id = game_id
+        self.created = created
+        self.fields = fields
+
+
+def get_field_values(element: Optional[ET.Element]) -> Dict[str, List[str]]:
+    """Returns the text of every child of `element` by tag, with empty elements as empty strings."""
+    values: Dict[str, List[str]] = {}
+
+    if element is not None:
+        for child in element:
+            if isinstance(child.tag, str):
+                values.setdefault(child.tag, []).append(child.text or "")
+
+    return values
+
+
+def diff_element(before: Optional[ET.Element], after: ET.Element) -> ElementDiff:
+    """Compares the children of `after` with the ones of `before`, or with nothing if it was created."""
+    old_values = get_field_values(before)
+    new_values = get_field_values(after)
+    fields: List[FieldChange] = []
+
+    # Repeated elements are compared in the order they appear in
+    for tag in list(new_values) + [tag for tag in old_values if tag not in new_values]:
+        old_texts = old_values.get(tag, [])
+        new_texts = new_values.get(tag, [])
+
+        for index in range(max(len(old_texts), len(new_texts))):
+            old_text = old_texts[index] if index < len(old_texts) else None
+            new_text = new_texts[index] if index < len(new_texts) else None
+
+            if old_text != new_text:
+                fields.append((tag, old_text, new_text))
+
+    return ElementDiff(
+        after.tag,
+        after.findtext(OWNER_ID_TAGS.get(after.tag, "ID")),
+        after.findtext(NAME_TAGS.get(after.tag, "Title")),
+        after.findtext("GameID") if after.tag == "AdditionalApplication" else None,
+        before is None,
+        fields
+    )
+
+
+def diff_updater(updater: XmlUpdater) -> List[ElementDiff]:
+    """
+    Returns the differences of every element `updater` modified, in the order they were first changed.
+    Only the touched elements are compared, so this doesn't depend on the size of the file.
+    """
+    diffs = []
+
+    for element in updater.modified_elements:
+        diff = diff_element(updater.original_elements.get(element), element)
+
+        if diff.fields:
+            diffs.append(diff)
+
+    return diffs
+
+
+def render_diffs(diffs: List[ElementDiff]) -> str:
+    spacing = "      "
+    lines = []
+
+    def render_value(value: Optional[str]) -> str:
+        return "(missing)" if value is None else f"\"{value}\""
+
+    for diff in diffs:
+        status = " (created)" if diff.created else ""
+
+        if diff.tag == "Game":
+            lines.append(f"{diff.element_id} \"{diff.name}\"{status}")
+        else:
+            lines.append(f"{diff.game_id}: Additional application \"{diff.name}\"{status}")
+
+        for tag, old_text, new_text in diff.fields:
+            if diff.created:
+                lines.append(spacing + f"\"{tag}\": {render_value(new_text)}")
+            else:
+                lines.append(spacing + f"\"{tag}\": {render_value(old_text)} -> {render_value(new_text)}")
+
+        lines.append("")
+
+    return "\n".join(lines)
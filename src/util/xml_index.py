@@ -0,0 +1,181 @@
+"""Keeps track of which platform XML file every game lives in."""
+
+from lxml import etree as ET
+
+import json
+import os
+
+from typing import Dict, List, Optional, Tuple, Iterable
+
+INDEX_VERSION = 2
+
+
+class XmlIndex:
+    """
+    A sidecar index mapping game IDs to the platform XML file that contains them.
+
+    Every file is fingerprinted by its size and modification time, so only the files
+    that changed since the last run have to be scanned again. Files written by a run
+    are updated with `record_rewrites` instead, since runs never add or remove games.
+    """
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+
+        self.directory: Optional[str] = None
+        # File name -> {"fingerprint": [size, mtime], "games": [...]}
+        # `games` is None if the file could not be scanned
+        self.files: Dict[str, dict] = {}
+
+        self.games: Dict[str, str] = {}
+
+        self.load()
+
+    @staticmethod
+    def get_fingerprint(file_path: str) -> List[int]:
+        stat = os.stat(file_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    @staticmethod
+    def list_xml_files(directory: str) -> List[str]:
+        return [
+            file for file in os.listdir(directory)
+            if os.path.isfile(os.path.join(directory, file)) and file.endswith(".xml")
+        ]
+
+    @staticmethod
+    def scan_file(file_path: str) -> List[str]:
+        """Returns the game IDs inside of a platform XML file."""
+        game_ids: List[str] = []
+
+        for _, element in ET.iterparse(file_path, events=("end",), tag="Game"):
+            element_id = element.findtext("ID")
+            if element_id:
+                game_ids.append(element_id)
+
+            # Keep memory usage flat on big files
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+        return game_ids
+
+    def load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return
+
+        self.directory = data.get("directory")
+        self.files = data.get("files", {})
+        self.rebuild_lookups()
+
+    def save(self):
+        data = {"version": INDEX_VERSION, "directory": self.directory, "files": self.files}
+
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf8") as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.index_path)
+
+    def rebuild_lookups(self):
+        self.games = {}
+
+        # The first file containing an ID wins, the same way the editor stops looking
+        # for a game once it has been found
+        for file_name, entry in self.files.items():
+            for game_id in entry["games"] or []:
+                self.games.setdefault(game_id, file_name)
+
+    def refresh(self, directory: str) -> bool:
+        """
+        Brings the index up to date with `directory`, rescanning only the files whose
+        fingerprint changed. Returns True if anything had to be rescanned.
+        """
+        directory = os.path.abspath(directory)
+        changed = False
+
+        if directory != self.directory:
+            self.directory = directory
+            self.files = {}
+            changed = True
+
+        files: Dict[str, dict] = {}
+
+        for file_name in self.list_xml_files(directory):
+            file_path = os.path.join(directory, file_name)
+            fingerprint = self.get_fingerprint(file_path)
+            entry = self.files.get(file_name)
+
+            if entry is None or entry["fingerprint"] != fingerprint:
+                try:
+                    game_ids = self.scan_file(file_path)
+                except ET.XMLSyntaxError:
+                    # Leave the file unindexed so it's still opened (and the error reported) when updating
+                    game_ids = None
+
+                entry = {"fingerprint": fingerprint, "games": game_ids}
+                changed = True
+
+            files[file_name] = entry
+
+        if len(files) != len(self.files):
+            changed = True
+
+        self.files = files
+        self.rebuild_lookups()
+
+        if changed:
+            self.save()
+
+        return changed
+
+    def record_rewrites(self, directory: str, fingerprints: Dict[str, Tuple[List[int], List[int]]]):
+        """
+        Takes the new fingerprints of the files a run wrote, by file name along with their fingerprint before
+        the run, so they aren't rescanned by the next `refresh`. Runs never add or remove games, so the games
+        of a file stay the same, but only if the index was up to date with the file before the run.
+        """
+        if os.path.abspath(directory) != self.directory:
+            return
+
+        changed = False
+
+        for file_name, (old_fingerprint, new_fingerprint) in fingerprints.items():
+            entry = self.files.get(file_name)
+
+            if entry is not None and entry["fingerprint"] == old_fingerprint:
+                entry["fingerprint"] = new_fingerprint
+                changed = True
+
+        if changed:
+            self.save()
+
+    def locate(self, game_ids: Iterable[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+        """
+        Groups `game_ids` by the file they're in. Returns the grouping (in directory order)
+        along with the IDs that don't exist in any file.
+
+        IDs that aren't in the index are assigned to every file that couldn't be indexed, so
+        they're only reported as missing if the whole directory was indexed successfully.
+        """
+        unindexed_files = [file_name for file_name, entry in self.files.items() if entry["games"] is None]
+        located: Dict[str, List[str]] = {file_name: [] for file_name in self.files}
+        missing: List[str] = []
+
+        for game_id in game_ids:
+            file_name = self.games.get(game_id)
+
+            if file_name is not None:
+                located[file_name].append(game_id)
+            elif unindexed_files:
+                for unindexed_file in unindexed_files:
+                    located[unindexed_file].append(game_id)
+            else:
+                missing.append(game_id)
+
+        return {file_name: ids for file_name, ids in located.items() if ids}, missing
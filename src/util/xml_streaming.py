@@ -0,0 +1,246 @@
+"""Applies changes to a platform XML file one element at a time, without loading the whole tree."""
+
+from lxml import etree as ET
+
+import copy
+
+from typing import Dict, List, Tuple, BinaryIO, Union
+
+from src.util.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from src.util.xml_updater import XmlUpdater, MESSAGE_APPLICATION_PATHS
+from src.util.xml_writer import serialize_root_child
+from src.util.xml_diff import ElementDiff, diff_element
+
+
+def parse_sparse_tree(source_xml_path: str, game_ids: set) -> ET.ElementTree:
+    """
+    Streams `source_xml_path` into a tree holding only the games in `game_ids` and their additional
+    applications, which is all that's needed to check changes to them without loading the whole file.
+    """
+    root = ET.Element("LaunchBox")
+
+    for _, element in ET.iterparse(source_xml_path, events=("end",), tag=("Game", "AdditionalApplication")):
+        if not StreamingXmlUpdater.is_root_child(element):
+            continue
+
+        if element.findtext("ID" if element.tag == "Game" else "GameID") in game_ids:
+            root.append(copy.deepcopy(element))
+
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+    return ET.ElementTree(root)
+
+
+class StreamingXmlUpdater(XmlUpdater):
+    """
+    An `XmlUpdater` that streams `<Game>` and `<AdditionalApplication>` elements through `iterparse`,
+    writing and freeing each one as soon as it has been updated, so memory usage stays flat
+    regardless of the size of the file.
+
+    Produces the same output as writing the tree from `get_updated_xml` with `pretty_print=True`.
+    Changes to existing additional applications are applied when the stream reaches them, so an
+    error inside of one is only noticed after the game itself was written. An existing additional
+    application that comes before its game was already written by then, so changing it fails the game
+    with `AppAlreadyWritten` instead.
+    """
+
+    class AppAlreadyWritten(Exception):
+        def __init__(self, message, game_id, app_name):
+            super().__init__(message)
+            self.game_id = game_id
+            self.app_name = app_name
+
+        def __reduce__(self):
+            return (self.__class__, (str(self), self.game_id, self.app_name))
+
+    def __init__(self, instrumentation: Instrumentation = NULL_INSTRUMENTATION):
+        super().__init__(instrumentation)
+
+        # Game ID -> {additional application name -> ordinal of the matching <AdditionalApplication>, or the created element}
+        self.found_apps: Dict[str, Dict[str, Union[int, ET.Element]]] = {}
+        # Ordinal of an existing <AdditionalApplication> -> [(game ID, app name, changes)]
+        self.pending_app_changes: Dict[int, List[Tuple[str, str, Union[dict, str]]]] = {}
+        self.created_apps: List[ET.Element] = []
+        # How many root <AdditionalApplication> elements were streamed so far
+        self.apps_written = 0
+        # What `diff_updater` returns for a tree, worked out as soon as each changed element is written
+        self.diffs: List[ElementDiff] = []
+
+    @staticmethod
+    def is_root_child(element: ET.Element) -> bool:
+        parent = element.getparent()
+        return parent is not None and parent.getparent() is None
+
+    def find_existing_apps(self, source_xml_path: str, game_ids: set):
+        """
+        A quick pass over the additional applications of `game_ids`, so we know which ones
+        already exist (and which one wins if there are duplicate names) before writing anything.
+        """
+        ordinal = 0
+
+        for _, app in ET.iterparse(source_xml_path, events=("end",), tag="AdditionalApplication"):
+            if not self.is_root_child(app):
+                continue
+
+            app_game_id = app.findtext("GameID")
+
+            if app_game_id in game_ids:
+                app_name = app.findtext("Name")
+                if app_name:
+                    self.found_apps.setdefault(app_game_id, {})[app_name] = ordinal
+
+            ordinal += 1
+
+            app.clear()
+            while app.getprevious() is not None:
+                del app.getparent()[0]
+
+    def handle_additional_apps(self, xml_root: ET.Element, game_id: str, changes: dict, create_elements_whitelist: list):
+        """Creates new additional applications right away and defers changes to existing ones until they're streamed."""
+        found_apps = self.found_apps.setdefault(game_id, {})
+
+        for app_name in changes:
+            changes_list = changes[app_name]
+            found_app = found_apps.get(app_name)
+
+            if found_app is None:
+                if isinstance(changes_list, dict):
+                    missing_key = self.get_missing_app_key(changes_list)
+                    if missing_key is not None:
+                        raise self.missing_app_key_error(self.current_game_id, app_name, missing_key)
+
+                    new_add_app_el = self.create_additional_application(xml_root, game_id, app_name, changes_list["ApplicationPath"], changes_list["CommandLine"])
+                    self.update_xml_element(xml_root, new_add_app_el, changes_list, game_id, create_elements_whitelist, True)
+
+                elif self.is_message(app_name, changes_list):
+                    application_path = MESSAGE_APPLICATION_PATHS[app_name]
+                    new_add_app_el = self.create_additional_application(xml_root, game_id, app_name, application_path, changes_list)
+                else:
+                    raise self.string_app_error(self.current_game_id, True)
+
+                found_apps[app_name] = new_add_app_el
+                self.created_apps.append(new_add_app_el)
+
+            elif not isinstance(changes_list, dict) and not self.is_message(app_name, changes_list):
+                raise self.string_app_error(self.current_game_id, False)
+
+            elif isinstance(found_app, int) and found_app < self.apps_written:
+                msg = f"The additional application '{app_name}' comes before its game in the file, so it can't be changed while streaming it. Raise the streaming threshold above the size of the file to change it"
+                raise self.AppAlreadyWritten(msg, self.current_game_id, app_name)
+
+            elif isinstance(found_app, int):
+                self.pending_app_changes.setdefault(found_app, []).append((game_id, app_name, changes_list))
+
+            else:
+                self.update_existing_app(found_app, changes_list, create_elements_whitelist)
+
+    def update_existing_app(self, app_element: ET.Element, changes_list: Union[dict, str], create_elements_whitelist: list):
+        app_id = self.try_get_element("Id", app_element, True, True)[1]
+
+        if isinstance(changes_list, str):
+            changes_list = {"CommandLine": changes_list}
+
+        self.update_xml_element(None, app_element, changes_list, app_id, create_elements_whitelist, True)
+
+    def write_updated_xml(self, changes: dict, source_xml_path: str, output: BinaryIO, create_elements_whitelist: list) -> Tuple[set, dict]:
+        """
+        Streams `source_xml_path` into `output` with `changes` applied. Returns the games that were changed
+        and the ones that failed, the same way `get_updated_xml` does.
+        """
+        games_changed: set = set()
+        games_failed: Dict[str, Exception] = {}
+
+        apps_game_ids = {game_id for game_id, game_changes in changes.items() if "Additional Applications" in game_changes}
+        if apps_game_ids:
+            self.find_existing_apps(source_xml_path, apps_game_ids)
+
+        create_elements_whitelist = frozenset(create_elements_whitelist)
+
+        self.apps_written = 0
+        root = None
+        root_start = b""
+        root_end = b""
+        depth = 0
+        games_scanned = 0
+
+        def write_root_child(element: ET.Element):
+            nonlocal root_start, root_end
+
+            if not root_start:
+                root_start, serialized, root_end = serialize_root_child(root, element)
+                output.write(root_start)
+            else:
+                _, serialized, _ = serialize_root_child(root, element)
+
+            output.write(serialized)
+
+            # Changed elements are diffed before they're freed, along with the copy of how they were
+            if element in self.modified_elements:
+                del self.modified_elements[element]
+
+                diff = diff_element(self.original_elements.pop(element, None), element)
+                if diff.fields:
+                    self.diffs.append(diff)
+
+            element.clear()
+
+        for event, element in ET.iterparse(source_xml_path, events=("start", "end"), remove_blank_text=True):
+            if event == "start":
+                if root is None:
+                    root = element
+                depth += 1
+                continue
+
+            depth -= 1
+
+            # Only the direct children of the root are handled, everything else is written along with them
+            if depth != 1:
+                continue
+
+            if element.tag == "Game":
+                # Games without an ID are skipped, like `XmlUpdater.iter_games` does
+                game_id = element.findtext("ID")
+                if game_id:
+                    games_scanned += 1
+
+                if game_id and game_id in changes:
+                    self.current_game_id = game_id
+                    try:
+                        self.update_xml_element(None, element, changes[game_id], game_id, create_elements_whitelist)
+                        games_changed.add(game_id)
+                    except Exception as e:
+                        games_failed[game_id] = e
+
+                    if self.on_game_updated is not None:
+                        self.on_game_updated(game_id)
+
+            elif element.tag == "AdditionalApplication":
+                for game_id, app_name, changes_list in self.pending_app_changes.pop(self.apps_written, []):
+                    self.current_game_id = game_id
+                    try:
+                        self.update_existing_app(element, changes_list, create_elements_whitelist)
+                    except Exception as e:
+                        games_changed.discard(game_id)
+                        games_failed.setdefault(game_id, e)
+
+                self.apps_written += 1
+
+            write_root_child(element)
+
+            # Drop the written elements from the root as usual for iterparse, wherever serializing left them
+            del root[:]
+
+        # New additional applications go at the end, just like `XmlUpdater.handle_additional_apps` appends them
+        for app in self.created_apps:
+            write_root_child(app)
+
+        if root_start:
+            output.write(root_end)
+        else:
+            # Nothing was inside of the root element
+            output.write(ET.tostring(root, encoding="utf8") + b"\n")
+
+        self.instrumentation.count("games_scanned", games_scanned)
+        return games_changed, games_failed
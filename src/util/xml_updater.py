@@ -3,10 +3,14 @@
 from lxml import etree as ET
 import yaml
 import uuid
+import copy
+import os
 
 import re
 
-from typing import Dict, Union, Tuple, Optional, List
+from typing import Callable, Dict, Union, Tuple, Optional, List, Iterator, TextIO
+
+from src.util.instrumentation import Instrumentation, NULL_INSTRUMENTATION
 
 aliased_keys = {
     "Application Path": "ApplicationPath",
@@ -22,22 +26,55 @@ aliased_keys = {
     "Original Description": "OriginalDescription"
 }
 
+# libyaml is a lot faster, but isn't always available
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Three dashes before the first document, only preceded by blank lines and comments
+LEADING_DOCUMENT_START = re.compile(r"(?:[ \t]*(?:#[^\n]*)?\r?\n)*---(?:\s|$)")
+
+
+NOT_ENOUGH_DOCUMENTS_MESSAGE = "Each new game, except for the last, should be followed by three dashes (---). The first game should not be preceded by three dashes. GAME should be followed by a colon (GAME: id)."
+
+# First and last line (starting at 1) of a document in the changes file
+LineRange = Tuple[int, int]
+
+
+class FirstChunkReader:
+    """Passes reads through to `stream`, remembering what the first one returned."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.first_chunk: Optional[str] = None
+
+    def read(self, size: int = -1) -> str:
+        chunk = self.stream.read(size)
+
+        if self.first_chunk is None:
+            self.first_chunk = chunk
+
+        return chunk
+
 
 class ChangesParser:
 
-    class InvalidGameId(Exception):
+    class ChangesError(Exception):
+        def __init__(self, message: str = "", line_range: Optional[LineRange] = None):
+            super().__init__(message)
+            self.line_range = line_range
+
+    class InvalidGameId(ChangesError):
         pass
 
-    class ForbiddenElementChange(Exception):
+    class ForbiddenElementChange(ChangesError):
         pass
 
-    class NotEnoughDocuments(Exception):
+    class NotEnoughDocuments(ChangesError):
         pass
 
-    class DuplicateGameId(Exception):
+    class DuplicateGameId(ChangesError):
         pass
 
-    class InvalidChangesSyntax(Exception):
+    class InvalidChangesSyntax(ChangesError):
         pass
 
     @staticmethod
@@ -108,80 +145,220 @@ class ChangesParser:
         return len(re.findall(query, string, flags=re.MULTILINE))
 
     @staticmethod
-    def parse_changes_str(changes_str: str) -> Dict:
-        """Turns the user-supplied changes file into a dictionary."""
-        changes: Dict[str, dict] = {}
+    def count_game_keys(node: yaml.Node) -> int:
+        if not isinstance(node, yaml.MappingNode):
+            return 0
+
+        return sum(1 for key_node, _ in node.value if isinstance(key_node, yaml.ScalarNode) and key_node.value == "GAME")
+
+    @staticmethod
+    def process_document(document, index: int) -> Tuple[str, Dict]:
+        """Validates a single YAML document from the changes file and returns its game ID and processed changes."""
+        if isinstance(document, str):
+            raise ChangesParser.InvalidChangesSyntax("The changes file is in an incorrect format")
+
+        if not document or "GAME" not in document:
+            raise ChangesParser.InvalidGameId(f"Document {index + 1} is missing a \'GAME\' entry")
+
+        if "ID" in document:
+            raise ChangesParser.ForbiddenElementChange("The \'ID\' element cannot be modified")
+
+        if "Curation Notes" in document:
+            del document["Curation Notes"]
+
+        game_id = document["GAME"]
+
+        if not game_id:
+            raise ChangesParser.InvalidGameId(f"Document {index + 1} is has an invalid \'GAME\' value")
+
+        del document["GAME"]
+        return game_id, ChangesParser.process_yaml(document)
+
+    @staticmethod
+    def get_line_range(node: yaml.Node) -> LineRange:
+        first_line = node.start_mark.line + 1
+        # The end mark is usually at the start of the line after the document
+        last_line = node.end_mark.line if node.end_mark.column == 0 else node.end_mark.line + 1
+
+        return first_line, max(first_line, last_line)
+
+    @staticmethod
+    def iter_changes(changes: Union[str, TextIO], loader: type = YamlLoader) -> Iterator[Tuple[str, Dict, LineRange]]:
+        """
+        Reads the user-supplied changes one document at a time, yielding the game ID, the processed
+        changes and the lines the document spans as soon as each document has been read.
+
+        Errors are raised as soon as they're found and carry the lines of the document at fault. Having
+        more `GAME` keys than documents can only be noticed once everything else has been read.
+        """
+        if isinstance(changes, str):
+            changes_str: Optional[str] = changes
+            yaml_loader = loader(changes)
+        else:
+            changes_str = None
+            reader = FirstChunkReader(changes)
+            yaml_loader = loader(reader)
+
+        seen_game_ids = set()
+        document_count = 0
+        game_key_count = 0
+
+        try:
+            while yaml_loader.check_node():
+                node = yaml_loader.get_node()
+                line_range = ChangesParser.get_line_range(node)
+                index = document_count
+
+                document_count += 1
+                document_game_keys = ChangesParser.count_game_keys(node)
+                game_key_count += document_game_keys
 
-        game_id_count = ChangesParser.find_all_occurrences("^GAME:", changes_str)
-        new_document_count = ChangesParser.find_all_occurrences("^---", changes_str)
+                try:
+                    if index == 0:
+                        if changes_str is None:
+                            changes_str = reader.first_chunk or ""
 
-        if new_document_count != game_id_count - 1:
-            raise ChangesParser.NotEnoughDocuments("Each new game, except for the last, should be followed by three dashes (---). The first game should not be preceded by three dashes. GAME should be followed by a colon (GAME: id).")
+                        if LEADING_DOCUMENT_START.match(changes_str):
+                            raise ChangesParser.NotEnoughDocuments(NOT_ENOUGH_DOCUMENTS_MESSAGE)
 
-        for index, document in enumerate(yaml.safe_load_all(changes_str)):
-            if isinstance(document, str):
-                raise ChangesParser.InvalidChangesSyntax("The changes file is in an incorrect format")
+                    if document_game_keys == 0:
+                        is_empty = isinstance(node, yaml.ScalarNode) and node.tag == "tag:yaml.org,2002:null"
 
-            if not document or "GAME" not in document:
-                raise ChangesParser.InvalidGameId(f"Document {index + 1} is missing a \'GAME\' entry")
+                        # Three dashes that aren't followed by a game, or a misspelled `GAME` key
+                        if is_empty or (isinstance(node, yaml.MappingNode) and game_key_count < document_count):
+                            raise ChangesParser.NotEnoughDocuments(NOT_ENOUGH_DOCUMENTS_MESSAGE)
 
-            if "ID" in document:
-                raise ChangesParser.ForbiddenElementChange("The \'ID\' element cannot be modified")
+                    game_id, document = ChangesParser.process_document(yaml_loader.construct_document(node), index)
 
-            if "Curation Notes" in document:
-                del document["Curation Notes"]
+                    if game_id in seen_game_ids:
+                        raise ChangesParser.DuplicateGameId(f"The game ID \'{game_id}\' already has changes associated with it")
 
-            game_id = document["GAME"]
+                except ChangesParser.ChangesError as e:
+                    if e.line_range is None:
+                        first_line, last_line = line_range
+                        lines = f"line {first_line}" if first_line == last_line else f"lines {first_line}-{last_line}"
 
-            if not game_id:
-                raise ChangesParser.InvalidGameId(f"Document {index + 1} is has an invalid \'GAME\' value")
+                        e.line_range = line_range
+                        e.args = (f"{e} ({lines})",)
+                    raise
 
-            if game_id in changes:
-                raise ChangesParser.DuplicateGameId(f"The game ID \'{game_id}\' already has changes associated with it")
+                seen_game_ids.add(game_id)
+                yield game_id, document, line_range
+        finally:
+            yaml_loader.dispose()
 
-            del document["GAME"]
-            changes[game_id] = ChangesParser.process_yaml(document)
+        # An empty changes file has one fewer game than it has separators, too
+        if game_key_count != document_count or document_count == 0:
+            raise ChangesParser.NotEnoughDocuments(NOT_ENOUGH_DOCUMENTS_MESSAGE)
 
+    @staticmethod
+    def parse_changes_str(changes_str: str, loader: type = YamlLoader, instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Dict:
+        """Turns the user-supplied changes file into a dictionary."""
+        with instrumentation.timer("parse_changes"):
+            changes = {game_id: document for game_id, document, _ in ChangesParser.iter_changes(changes_str, loader)}
+
+        instrumentation.count("games_in_changes", len(changes))
         return changes
 
     @staticmethod
-    def parse_changes_file(file_path: str) -> Dict:
+    def parse_changes_file(file_path: str, instrumentation: Instrumentation = NULL_INSTRUMENTATION) -> Dict:
         """Turns the user-supplied changes file into a dictionary."""
 
-        with open(file_path, "r", encoding="utf8") as changes_file:
-            return ChangesParser.parse_changes_str(changes_file.read())
+        with instrumentation.timer("parse_changes"):
+            with open(file_path, "r", encoding="utf8") as changes_file:
+                changes = {game_id: document for game_id, document, _ in ChangesParser.iter_changes(changes_file)}
+
+        instrumentation.count("changes_bytes_read", os.path.getsize(file_path))
+        instrumentation.count("games_in_changes", len(changes))
+        return changes
 
 
 try_get_ret = Union[ET.Element, Tuple[ET.Element, Optional[str]]]
 
+# A single change made to a tree, in a form that can be saved as JSON and undone later (see `undo_journal`):
+#   ["set", owner tag, owner ID, element tag, old text, new text]
+#   ["create", owner tag, owner ID, element tag, new text]
+#   ["create_app", additional application ID]
+# The owner is the <Game> or <AdditionalApplication> that was changed, found again by its ID
+JournalEntry = list
+
+# The child holding the ID of each kind of element that gets changed
+OWNER_ID_TAGS = {"Game": "ID", "AdditionalApplication": "Id"}
+
+# The children every created additional application starts with, see `XmlUpdater.create_additional_application`
+NEW_APP_TAGS = ("Id", "GameID", "Name", "ApplicationPath", "CommandLine", "AutoRunBefore", "WaitForExit")
+
+# The additional applications that can be given just a string (their command line), and the application path they're created with
+MESSAGE_APPLICATION_PATHS = {"Extras": ":extras:", "Message": ":message:"}
+
+# The keys a new additional application can't be created without, and how they're described in errors
+REQUIRED_APP_KEYS = {"ApplicationPath": "'ApplicationPath' or 'Application Path'", "CommandLine": "'CommandLine' or 'Launch Command'"}
+
+# The ID of every game in a tree, as strings that know their element
+GAME_ID_TEXTS = ET.XPath(".//Game/ID[1]/text()[1]")
+
 
 class XmlUpdater:
 
+    # The exceptions define `__reduce__` so they survive being sent back from worker processes
+
     class GameNotFound(Exception):
         def __init__(self, message, game_id):
             super().__init__(message)
             self.game_id = game_id
 
+        def __reduce__(self):
+            return (self.__class__, (str(self), self.game_id))
+
     class MissingElement(Exception):
         def __init__(self, message, game_id, element_name):
             super().__init__(message)
             self.game_id = game_id
             self.element_name = element_name
 
+        def __reduce__(self):
+            return (self.__class__, (str(self), self.game_id, self.element_name))
+
     class MissingElementValue(Exception):
         def __init__(self, message, game_id, element_name):
             super().__init__(message)
             self.game_id = game_id
             self.element_name = element_name
 
+        def __reduce__(self):
+            return (self.__class__, (str(self), self.game_id, self.element_name))
+
     class ForbiddenElementChange(Exception):
         def __init__(self, message, game_id, element_name):
             super().__init__(message)
             self.game_id = game_id
             self.element_name = element_name
 
-    def __init__(self):
+        def __reduce__(self):
+            return (self.__class__, (str(self), self.game_id, self.element_name))
+
+    def __init__(self, instrumentation: Instrumentation = NULL_INSTRUMENTATION):
         self.current_game_id: Optional[str] = None
+        self.instrumentation = instrumentation
+        # Called with the ID of every game that was changed or failed, as soon as it's done
+        self.on_game_updated: Optional[Callable[[str], None]] = None
+
+        # Game ID -> {additional application name -> element} for `additional_apps_root`, built the first time it's needed
+        self.additional_apps: Dict[str, Dict[str, ET.Element]] = {}
+        self.additional_apps_by_game: Optional[Dict[str, List[ET.Element]]] = None
+        self.additional_apps_root: Optional[ET.Element] = None
+
+        # Elements whose children were changed, in the order they were first changed (used as an ordered set)
+        self.modified_elements: Dict[ET.Element, None] = {}
+        # Additional applications appended to the root
+        self.created_elements: List[ET.Element] = []
+
+        # Every change made, in order, so it can be undone without restoring the whole file
+        self.journal: List[JournalEntry] = []
+        # Elements created from scratch, whose own changes are covered by a single "create_app" entry
+        self.unjournaled_elements: set = set()
+        # Copies of the modified elements from before their first change, to diff them against afterwards
+        self.original_elements: Dict[ET.Element, ET.Element] = {}
 
     def try_get_element(self, element_name: str, root: ET.Element, get_text: bool = False, raise_on_no_text: bool = False) -> try_get_ret:
         """
@@ -204,11 +381,104 @@ class XmlUpdater:
         else:
             raise self.MissingElement(f"Element '{root.tag}' is missing a '{element_name}' element", self.current_game_id, element_name)
 
+    @staticmethod
+    def child_elements(element: ET.Element) -> Dict[str, ET.Element]:
+        """Maps the tags of the children of `element` to the first child with that tag, which is what `find` returns."""
+        return {child.tag: child for child in reversed(element)}
+
+    def iter_games(self, root: ET.Element, game_ids) -> Iterator[Tuple[ET.Element, str]]:
+        """
+        Yields the games of `root` whose ID is in `game_ids`, in order, along with their ID. Every ID is read with a
+        single XPath query, so only the matching games are looked at from Python. Games without an ID are skipped.
+        """
+        id_texts = GAME_ID_TEXTS(root)
+        self.instrumentation.count("games_scanned", len(id_texts))
+
+        for id_text in id_texts:
+            if id_text in game_ids:
+                yield id_text.getparent().getparent(), str(id_text)
+
+    def mark_modified(self, element: ET.Element):
+        """Call before changing a child of `element`, so a copy of how it was is kept the first time."""
+        if element not in self.modified_elements:
+            if element not in self.unjournaled_elements:
+                self.original_elements[element] = copy.deepcopy(element)
+
+            self.modified_elements[element] = None
+
+    def get_owner(self, element: ET.Element) -> Optional[list]:
+        """The tag and ID journal entries find `element` again by, or None if it was created from scratch."""
+        if element in self.unjournaled_elements:
+            return None
+
+        return [element.tag, element.findtext(OWNER_ID_TAGS.get(element.tag, "ID"))]
+
+    def set_element_text(self, element: ET.Element, key: str, text: Optional[str], can_create: bool, game_id: str, owner: Optional[list], children: Optional[Dict[str, ET.Element]]):
+        """
+        Sets the text of the `key` child of `element`, creating the child if it's missing and `can_create`.
+        `children` is the map from `child_elements`, or None to look the child up instead.
+        """
+        key_element = children.get(key) if children is not None else element.find(key)
+        self.instrumentation.count("element_lookups")
+
+        if key_element is not None:
+            self.mark_modified(element)
+            self.instrumentation.count("elements_updated")
+
+            old_text = key_element.text
+            key_element.text = text
+
+            if owner:
+                self.journal.append(["set", *owner, key, old_text, key_element.text])
+        elif can_create:
+            self.mark_modified(element)
+            self.instrumentation.count("elements_created")
+
+            created_el = ET.SubElement(element, key)
+            created_el.text = text
+            if children is not None:
+                children[key] = created_el
+
+            if owner:
+                self.journal.append(["create", *owner, key, created_el.text])
+        else:
+            raise self.missing_element_error(game_id, key)
+
+    def missing_element_error(self, game_id: str, key: str) -> "XmlUpdater.MissingElement":
+        error_text: str = f"{game_id} is missing element: \'{key}\'. If you'd prefer the element be created instead, add it on a new line in the elements whitelist (elements_whitelist.txt)"
+        return self.MissingElement(error_text, game_id, key)
+
+    def missing_app_key_error(self, game_id: str, app_name: str, key: str) -> "XmlUpdater.MissingElementValue":
+        msg = f"{app_name}: The {REQUIRED_APP_KEYS[key]} key must be included in the metadata edit in order to create a new Additional Application"
+        return self.MissingElementValue(msg, game_id, key)
+
+    def string_app_error(self, game_id: str, is_new: bool) -> "XmlUpdater.ForbiddenElementChange":
+        msg = "Inside of the 'Additional Applications' key, only 'Extras' and 'Message' can have a string as a value"
+        if is_new:
+            msg += ".\nIf you're trying to create an alternate, the value must be a mapping."
+
+        return self.ForbiddenElementChange(msg, game_id, None)
+
+    @staticmethod
+    def is_message(app_name: str, changes_list) -> bool:
+        """Whether `changes_list` is the string an Extras or Message additional application can be given instead of a mapping."""
+        return isinstance(changes_list, str) and app_name in MESSAGE_APPLICATION_PATHS
+
+    @staticmethod
+    def get_missing_app_key(changes_list: dict) -> Optional[str]:
+        """The first key a new additional application needs that isn't in `changes_list`."""
+        return next((key for key in REQUIRED_APP_KEYS if key not in changes_list), None)
+
     def update_xml_element(self, xml_root: ET.Element, element: ET.Element, changes: dict, game_id: str, create_elements_whitelist: list, is_additional_application: bool = False):
         """
         Updates the XML tree using the data from `changes`, creating new elements if necessary.
         """
 
+        owner = self.get_owner(element)
+
+        # Looking a single key up is cheaper than mapping every child first
+        children = self.child_elements(element) if len(changes) > 1 else None
+
         # `key` being the element name
         # `value` being the text value we want to change it to
         for key, value in changes.items():
@@ -218,22 +488,13 @@ class XmlUpdater:
                 self.handle_additional_apps(xml_root, game_id, value, create_elements_whitelist)
                 continue
 
-            key_element = element.find(key)
-
-            if key_element is not None:
-                if value is None:
-                    key_element.text = None
-                else:
-                    key_element.text = str(value)
-            elif key in create_elements_whitelist:
-                created_el = ET.SubElement(element, key)
-                created_el.text = value
-            else:
-                error_text: str = f"{game_id} is missing element: \'{key}\'. If you'd prefer the element be created instead, add it on a new line in the elements whitelist (elements_whitelist.txt)"
-                raise self.MissingElement(error_text, game_id, key)
+            text = None if value is None else str(value)
+            self.set_element_text(element, key, text, key in create_elements_whitelist, game_id, owner, children)
 
     def create_additional_application(self, xml_root: ET.Element, game_id: str, app_name: str, application_path: str, command_line: str) -> ET.Element:
         new_add_app_el = ET.Element("AdditionalApplication")
+        self.unjournaled_elements.add(new_add_app_el)
+        self.instrumentation.count("additional_apps_created")
 
         children = {
             "Id": str(uuid.uuid4()),
@@ -249,22 +510,61 @@ class XmlUpdater:
 
         elements_whitelist = list(children.keys())
         self.update_xml_element(xml_root, new_add_app_el, children, game_id, elements_whitelist, True)
+        self.journal.append(["create_app", children["Id"]])
 
         return new_add_app_el
 
-    def handle_additional_apps(self, xml_root: ET.Element, game_id: str, changes: dict, create_elements_whitelist: list):
-        """Handles creating new and updating existing additional applications."""
+    def get_additional_apps(self, xml_root: ET.Element, game_id: str) -> Dict[str, ET.Element]:
+        """
+        Returns the additional applications of `game_id` by name. All of the additional applications in the
+        tree are grouped by game once, so looking up the ones of many games doesn't rescan the whole tree each time.
+        """
+        if self.additional_apps_by_game is None or self.additional_apps_root is not xml_root:
+            apps_by_game: Dict[str, List[ET.Element]] = {}
+
+            with self.instrumentation.timer("additional_apps_scan"):
+                for app in xml_root.iter("AdditionalApplication"):
+                    app_game_id = self.try_get_element("GameID", app, get_text=True, raise_on_no_text=True)[1]
+                    apps_by_game.setdefault(app_game_id, []).append(app)
 
-        found_apps: Dict[str, ET.Element] = {}
+            self.instrumentation.count("additional_apps_scans")
+            self.instrumentation.count("additional_apps_scanned", sum(len(apps) for apps in apps_by_game.values()))
 
-        for app in xml_root.iter("AdditionalApplication"):
+            self.additional_apps_by_game = apps_by_game
+            self.additional_apps_root = xml_root
+            self.additional_apps = {}
 
-            app_game_id = self.try_get_element("GameID", app, get_text=True, raise_on_no_text=True)[1]
+        found_apps = self.additional_apps.get(game_id)
 
-            if app_game_id == game_id:
+        if found_apps is None:
+            found_apps = {}
+
+            # Later additional applications with the same name win
+            for app in self.additional_apps_by_game.get(game_id, []):
                 app_name = self.try_get_element("Name", app, get_text=True, raise_on_no_text=True)[1]
                 found_apps[app_name] = app
 
+            self.additional_apps[game_id] = found_apps
+
+        return found_apps
+
+    def register_additional_app(self, app: ET.Element):
+        """Adds a newly appended additional application to the lookups used by `get_additional_apps`."""
+        if self.additional_apps_by_game is None:
+            return
+
+        app_game_id = app.findtext("GameID")
+        self.additional_apps_by_game.setdefault(app_game_id, []).append(app)
+
+        found_apps = self.additional_apps.get(app_game_id)
+        if found_apps is not None:
+            found_apps[app.findtext("Name")] = app
+
+    def handle_additional_apps(self, xml_root: ET.Element, game_id: str, changes: dict, create_elements_whitelist: list):
+        """Handles creating new and updating existing additional applications."""
+
+        found_apps = self.get_additional_apps(xml_root, game_id)
+
         for app_name in changes:
             # If the additional application already exists
             if app_name in found_apps:
@@ -275,71 +575,165 @@ class XmlUpdater:
 
                 if isinstance(changes_list, dict):
                     self.update_xml_element(xml_root, app_element, changes_list, app_id, create_elements_whitelist, True)
-                elif isinstance(changes_list, str) and (app_name == "Extras" or app_name == "Message"):
+
+                    # Moved to another game or renamed, which is rare enough to just regroup everything next time
+                    if "GameID" in changes_list or "Name" in changes_list:
+                        self.additional_apps_by_game = None
+                elif self.is_message(app_name, changes_list):
                     changes_list = {"CommandLine": changes_list}
                     self.update_xml_element(xml_root, app_element, changes_list, app_id, create_elements_whitelist, True)
                 else:
-                    msg = f"Inside of the 'Additional Applications' key, only 'Extras' and 'Message' can have a string as a value"
-                    raise self.ForbiddenElementChange(msg, self.current_game_id, None)
+                    raise self.string_app_error(self.current_game_id, False)
 
             else:
                 # In the case of `Extras: str` and `Message: str`, this will be a string
                 changes_list = changes[app_name]
 
                 if isinstance(changes_list, dict):
-                    if "ApplicationPath" not in changes_list:
-                        msg = f"{app_name}: The 'ApplicationPath' or 'Application Path' key must be included in the metadata edit in order to create a new Additional Application"
-                        raise self.MissingElementValue(msg, self.current_game_id, "ApplicationPath")
-                    elif "CommandLine" not in changes_list:
-                        msg = f"{app_name}: The 'CommandLine' or 'Launch Command' key must be included in the metadata edit in order to create a new Additional Application"
-                        raise self.MissingElementValue(msg, self.current_game_id, "CommandLine")
+                    missing_key = self.get_missing_app_key(changes_list)
+                    if missing_key is not None:
+                        raise self.missing_app_key_error(self.current_game_id, app_name, missing_key)
 
                     application_path = changes_list["ApplicationPath"]
                     command_line = changes_list["CommandLine"]
 
                     new_add_app_el = self.create_additional_application(xml_root, game_id, app_name, application_path, command_line)
                     self.update_xml_element(xml_root, new_add_app_el, changes_list, game_id, create_elements_whitelist, True)
-                    xml_root.append(new_add_app_el)
+                    self.append_additional_app(xml_root, new_add_app_el)
 
-                elif isinstance(changes_list, str) and (app_name == "Extras" or app_name == "Message"):
-                    application_path = ":extras:" if app_name == "Extras" else ":message:"
+                elif self.is_message(app_name, changes_list):
+                    application_path = MESSAGE_APPLICATION_PATHS[app_name]
                     new_add_app_el = self.create_additional_application(xml_root, game_id, app_name, application_path, changes_list)
-                    xml_root.append(new_add_app_el)
+                    self.append_additional_app(xml_root, new_add_app_el)
                 else:
-                    msg = f"Inside of the 'Additional Applications' key, only 'Extras' and 'Message' can have a string as a value.\nIf you're trying to create an alternate, the value must be a mapping."
-                    raise self.ForbiddenElementChange(msg, self.current_game_id, None)
+                    raise self.string_app_error(self.current_game_id, True)
 
-    def get_updated_xml(self, changes: dict, source_xml_path: str, create_elements_whitelist: list) -> Tuple[ET.Element, set, list]:
-        """Wrapper function for `update_xml_element` that simplifies applying changes to an XML file."""
+    def append_additional_app(self, xml_root: ET.Element, app: ET.Element):
+        """Adds a new additional application from `create_additional_application` to the end of the tree."""
+        xml_root.append(app)
+        self.created_elements.append(app)
+        self.register_additional_app(app)
+
+    def check_xml_element(self, xml_root: ET.Element, element: Optional[ET.Element], changes: dict, game_id: str, create_elements_whitelist: list, is_additional_application: bool = False) -> List[Exception]:
+        """
+        Returns every error `update_xml_element` could run into with these changes, without changing anything.
+        An `element` of None stands for an additional application that's about to be created.
+        """
+        problems: List[Exception] = []
+
+        for key, value in changes.items():
+            key = aliased_keys.get(key, key)
+
+            if key == "Additional Applications" and not is_additional_application:
+                problems += self.check_additional_apps(xml_root, game_id, value, create_elements_whitelist)
+            elif element is None and key in NEW_APP_TAGS:
+                continue
+            elif (element is None or element.find(key) is None) and key not in create_elements_whitelist:
+                problems.append(self.missing_element_error(game_id, key))
+
+        return problems
+
+    def check_additional_apps(self, xml_root: ET.Element, game_id: str, changes: dict, create_elements_whitelist: list) -> List[Exception]:
+        """Returns every error `handle_additional_apps` could run into with these changes, without changing anything."""
+        problems: List[Exception] = []
+
+        try:
+            found_apps = self.get_additional_apps(xml_root, game_id)
+        except (self.MissingElement, self.MissingElementValue) as e:
+            return [e]
+
+        for app_name, changes_list in changes.items():
+            is_message = self.is_message(app_name, changes_list)
+
+            if app_name in found_apps:
+                try:
+                    app_id = self.try_get_element("Id", found_apps[app_name], True, True)[1]
+                except (self.MissingElement, self.MissingElementValue) as e:
+                    problems.append(e)
+                    continue
+
+                if isinstance(changes_list, dict):
+                    problems += self.check_xml_element(xml_root, found_apps[app_name], changes_list, app_id, create_elements_whitelist, True)
+                elif not is_message:
+                    problems.append(self.string_app_error(game_id, False))
+
+            elif isinstance(changes_list, dict):
+                for key in REQUIRED_APP_KEYS:
+                    if key not in changes_list:
+                        problems.append(self.missing_app_key_error(game_id, app_name, key))
+
+                problems += self.check_xml_element(xml_root, None, changes_list, game_id, create_elements_whitelist, True)
+
+            elif not is_message:
+                problems.append(self.string_app_error(game_id, True))
+
+        return problems
+
+    def check_tree(self, changes: dict, tree: ET.ElementTree, create_elements_whitelist: list) -> Tuple[set, Dict[str, List[Exception]]]:
+        """
+        Dry run of `update_tree`, which leaves the tree as it is. Returns the games that were found and every
+        problem of the ones that would fail, instead of only the first one.
+        """
+        root = tree.getroot()
+        games_found: set = set()
+        problems: Dict[str, List[Exception]] = {}
+        create_elements_whitelist = frozenset(create_elements_whitelist)
+
+        with self.instrumentation.timer("check_tree"):
+            for game, game_id in self.iter_games(root, changes):
+                games_found.add(game_id)
+                self.current_game_id = game_id
+
+                game_problems = self.check_xml_element(root, game, changes[game_id], game_id, create_elements_whitelist)
+                if game_problems:
+                    problems[game_id] = game_problems
+
+        return games_found, problems
+
+    @staticmethod
+    def parse_xml(source_xml_path: str) -> ET.ElementTree:
         parser = ET.XMLParser(remove_blank_text=True)
-        tree = ET.parse(source_xml_path, parser)
+        return ET.parse(source_xml_path, parser)
+
+    def update_tree(self, changes: dict, tree: ET.ElementTree, create_elements_whitelist: list) -> Tuple[set, dict]:
+        """Applies `changes` to an already parsed tree in place."""
         root = tree.getroot()
         # Collect game IDs that were successfully changed
         # so we can compare against the ones specified in the changes file
         games_changed: set = set()
         games_failed: Dict[str, Exception] = {}
+        # Checked for every element that's missing, which is cheaper against a set
+        create_elements_whitelist = frozenset(create_elements_whitelist)
 
-        for game in root.iter("Game"):
-            game_id_element, game_id = self.try_get_element("ID", game, True, True)
-
-            if game_id and game_id in changes:
-                changes_list = changes[game_id]
+        with self.instrumentation.timer("update_tree"):
+            for game, game_id in self.iter_games(root, changes):
                 self.current_game_id = game_id
                 try:
-                    self.update_xml_element(root, game, changes_list, game_id, create_elements_whitelist)
+                    self.update_xml_element(root, game, changes[game_id], game_id, create_elements_whitelist)
                     games_changed.add(game_id)
                 except Exception as e:
                     games_failed[game_id] = e
 
+                if self.on_game_updated is not None:
+                    self.on_game_updated(game_id)
+
+        return games_changed, games_failed
+
+    def get_updated_xml(self, changes: dict, source_xml_path: str, create_elements_whitelist: list) -> Tuple[ET.Element, set, list]:
+        """Wrapper function for `update_xml_element` that simplifies applying changes to an XML file."""
+        with self.instrumentation.timer("parse_xml"):
+            tree = self.parse_xml(source_xml_path)
+
+        games_changed, games_failed = self.update_tree(changes, tree, create_elements_whitelist)
+
         return tree, games_changed, games_failed
 
 
-def explain_changes(all_changes: dict, is_additional_application: bool = False) -> str:
-    explanation = ""
+def iter_explain_changes(all_changes: dict) -> Iterator[str]:
+    """Yields the explanation of `all_changes` one game at a time, so huge reports can be shown as they're built."""
     spacing = "      "
 
-    def changes_to_str(changes: dict, is_additional_application: bool = False):
-        explanation = ""
+    def changes_to_parts(changes: dict, is_additional_application: bool = False) -> Iterator[str]:
         for element_name in changes:
 
             val = changes[element_name]
@@ -349,13 +743,11 @@ def explain_changes(all_changes: dict, is_additional_application: bool = False)
                     app_changes = val[app_name]
 
                     if isinstance(app_changes, str):
-                        line = f"Additional application \"{app_name}\" (created or modified)\n"
-                        line += (spacing * 2) + f"\"CommandLine\" element now has a value of \"{app_changes}\"\n"
-                        explanation += "\n" + spacing + line
+                        yield "\n" + spacing + f"Additional application \"{app_name}\" (created or modified)\n"
+                        yield (spacing * 2) + f"\"CommandLine\" element now has a value of \"{app_changes}\"\n"
                     elif isinstance(app_changes, dict):
-                        line = f"Additional application \"{app_name}\" (created or modified)\n"
-                        line += changes_to_str(app_changes, is_additional_application=True)
-                        explanation += "\n" + spacing + line
+                        yield "\n" + spacing + f"Additional application \"{app_name}\" (created or modified)\n"
+                        yield from changes_to_parts(app_changes, is_additional_application=True)
                     else:
                         raise Exception(f"Invalid additional application value ({app_name}, {app_changes})")
             else:
@@ -366,19 +758,18 @@ def explain_changes(all_changes: dict, is_additional_application: bool = False)
 
                 cur_spacing = 2 * spacing if is_additional_application else spacing
                 suffix = "" if is_additional_application else "\n"
-                explanation += suffix + cur_spacing + line
-
-        return explanation
+                yield suffix + cur_spacing + line
 
     for game_id in all_changes:
-        explanation += game_id + "\n"
-        game_changes = all_changes[game_id]
+        parts = [game_id + "\n"]
+        parts.extend(changes_to_parts(all_changes[game_id]))
+        parts.append("\n")
 
-        explanation += changes_to_str(game_changes)
+        yield "".join(parts)
 
-        explanation += "\n"
 
-    return explanation
+def explain_changes(all_changes: dict, is_additional_application: bool = False) -> str:
+    return "".join(iter_explain_changes(all_changes))
 
 
 if __name__ == "__main__":
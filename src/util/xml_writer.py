@@ -0,0 +1,296 @@
+"""Writes updated platform XML trees back to disk."""
+
+from lxml import etree as ET
+
+import copy
+import os
+import re
+
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+ROOT_CHILD_TAGS = ("Game", "AdditionalApplication")
+
+# The start tag of a <Game> or <AdditionalApplication> element. Neither can contain another one, so the
+# first matching end tag closes it
+ROOT_CHILD_START_PATTERN = re.compile(rb"<(Game|AdditionalApplication)(?:\s[^>]*)?/?>")
+# The child holding the ID of each, which tells the elements apart
+ROOT_CHILD_ID_TAGS = {"Game": "ID", "AdditionalApplication": "Id"}
+XML_DECLARATION_PATTERN = re.compile(rb"<\?xml[^>]*encoding=[\"']([^\"']+)[\"']")
+
+
+def serialize_root_child(root: ET.Element, element: ET.Element) -> Tuple[bytes, bytes, bytes]:
+    """
+    Pretty prints `element` exactly as it would appear as a direct child of `root` when writing
+    the whole tree with `pretty_print=True`.
+
+    Returns the root start tag, the serialized element and the root end tag. Note that `element`
+    is moved out of its current parent.
+    """
+    wrapper = ET.Element(root.tag, root.attrib, nsmap=root.nsmap)
+    wrapper.append(element)
+
+    serialized = ET.tostring(wrapper, encoding="utf8", pretty_print=True)
+
+    start_end = serialized.index(b"\n") + 1
+    end_start = serialized.rindex(b"\n", 0, len(serialized) - 1) + 1
+
+    return serialized[:start_end], serialized[start_end:end_start], serialized[end_start:]
+
+
+def serialize_in_place(root: ET.Element, element: ET.Element) -> bytes:
+    """Like `serialize_root_child`, but leaves `element` where it is and strips the surrounding whitespace."""
+    copied = copy.deepcopy(element)
+    return serialize_root_child(root, copied)[1].strip()
+
+
+def find_element_end(data: bytes, tag: bytes, position: int) -> int:
+    """Returns where the `tag` element whose start tag ends at `position` in `data` ends, or -1 if it doesn't."""
+    # Looking for the end tag with `find` is a lot faster than matching the whole element with a regex
+    end_tag = b"</" + tag
+
+    while True:
+        end = data.find(end_tag, position)
+        if end == -1:
+            return -1
+
+        position = end + len(end_tag)
+        # Not the end of a longer tag, like </GameID>
+        if data[position:position + 1] in b" \t\r\n>":
+            break
+
+    return data.find(b">", position) + 1 or -1
+
+
+def find_root_children(data: bytes) -> Dict[str, List[Tuple[int, int]]]:
+    """Returns the byte spans of every `<Game>` and `<AdditionalApplication>` element in `data`, by tag."""
+    spans: Dict[str, List[Tuple[int, int]]] = {tag: [] for tag in ROOT_CHILD_TAGS}
+    position = 0
+
+    while True:
+        match = ROOT_CHILD_START_PATTERN.search(data, position)
+        if match is None:
+            break
+
+        position = match.end()
+        if not match.group(0).endswith(b"/>"):
+            position = find_element_end(data, match.group(1), position)
+            if position == -1:
+                break
+
+        spans[match.group(1).decode("ascii")].append((match.start(), position))
+
+    return spans
+
+
+def find_nth_root_children(data: bytes, tag: str, ordinals: List[int]) -> Optional[List[Tuple[int, int]]]:
+    """
+    Returns the byte spans of the `<tag>` elements at `ordinals` (in ascending order) in `data`, or None if
+    there aren't that many. The file is only searched as far as the last one, only for start tags without
+    attributes, and the end tags of the elements in between aren't looked for.
+    """
+    tag_bytes = tag.encode("ascii")
+    start_tag = b"<" + tag_bytes + b">"
+    spans = []
+    position = 0
+    count = -1
+
+    for ordinal in ordinals:
+        while count < ordinal:
+            start = data.find(start_tag, position)
+            if start == -1:
+                return None
+
+            position = start + len(start_tag)
+            count += 1
+
+        end = find_element_end(data, tag_bytes, position)
+        if end == -1:
+            return None
+
+        spans.append((start, end))
+
+    return spans
+
+
+def escape_text(text: str) -> bytes:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").encode("utf8")
+
+
+def has_id(data: bytes, span: Tuple[int, int], element: ET.Element) -> bool:
+    """True if the original bytes at `span` hold the ID that `element` has in the tree."""
+    id_tag = ROOT_CHILD_ID_TAGS[element.tag]
+    id_element = element.find(id_tag)
+
+    if id_element is None or not id_element.text:
+        return False
+
+    return data.find(f"<{id_tag}>".encode("ascii") + escape_text(id_element.text) + f"</{id_tag}>".encode("ascii"), *span) != -1
+
+
+def locate_modified(root: ET.Element, data: bytes, modified: Dict[ET.Element, None], created: set) -> Optional[List[Tuple[int, int, ET.Element]]]:
+    """
+    Finds the byte spans of the modified elements by counting the elements of the same tag before them,
+    only as far into the tree and the file as the last one. Every element found has to hold the same ID
+    as in the tree, otherwise (like when a game is commented out) the file is matched the slow way.
+    """
+    ordinals: Dict[str, List[Tuple[int, ET.Element]]] = {tag: [] for tag in ROOT_CHILD_TAGS}
+    counts = {tag: 0 for tag in ROOT_CHILD_TAGS}
+    remaining = len(modified)
+
+    for child in root.iterchildren(*ROOT_CHILD_TAGS):
+        if remaining == 0:
+            break
+
+        if child in created:
+            continue
+
+        if child in modified:
+            ordinals[child.tag].append((counts[child.tag], child))
+            remaining -= 1
+
+        counts[child.tag] += 1
+
+    patches: List[Tuple[int, int, ET.Element]] = []
+
+    for tag, tag_ordinals in ordinals.items():
+        if not tag_ordinals:
+            continue
+
+        spans = find_nth_root_children(data, tag, [ordinal for ordinal, _ in tag_ordinals])
+        if spans is None:
+            return None
+
+        for (start, end), (_, element) in zip(spans, tag_ordinals):
+            if not has_id(data, (start, end), element):
+                return None
+
+            patches.append((start, end, element))
+
+    return patches
+
+
+def locate_all(root: ET.Element, data: bytes, modified: Dict[ET.Element, None], created: set) -> Optional[List[Tuple[int, int, ET.Element]]]:
+    """Finds the byte spans of the modified elements by matching every element of the tree with the file."""
+    spans = find_root_children(data)
+    counts = {tag: 0 for tag in ROOT_CHILD_TAGS}
+    patches: List[Tuple[int, int, ET.Element]] = []
+
+    for child in root:
+        if child.tag not in counts or child in created:
+            continue
+
+        ordinal = counts[child.tag]
+        counts[child.tag] += 1
+
+        if child in modified:
+            if ordinal >= len(spans[child.tag]):
+                return None
+
+            start, end = spans[child.tag][ordinal]
+            patches.append((start, end, child))
+
+    # The file and the tree don't line up
+    if any(counts[tag] != len(spans[tag]) for tag in ROOT_CHILD_TAGS):
+        return None
+
+    return patches
+
+
+def get_newline(data: bytes) -> bytes:
+    return b"\r\n" if b"\r\n" in data[:4096] else b"\n"
+
+
+def write_full(tree: ET.ElementTree, file_path: str):
+    tree.write(file_path, encoding="utf8", pretty_print=True)
+
+
+def get_minimal_parts(tree: ET.ElementTree, data: bytes, modified_elements: Iterable[ET.Element], created_elements: Iterable[ET.Element]) -> Optional[List[Union[bytes, memoryview]]]:
+    """
+    Returns the parts of `data` (the original contents of the file `tree` was parsed from) with only the
+    modified `<Game>` and `<AdditionalApplication>` elements replaced and the created ones inserted before
+    the end of the root, leaving every other byte untouched. The untouched parts are views of `data`.
+
+    Returns None if the file can't be patched safely, in which case it has to be written in full.
+    """
+    root = tree.getroot()
+    created = set(created_elements)
+    modified = {element: None for element in modified_elements if element not in created}
+
+    declaration = XML_DECLARATION_PATTERN.match(data)
+    if declaration and declaration.group(1).lower().replace(b"-", b"") != b"utf8":
+        return None
+
+    if any(element.getparent() is not root or element.tag not in ROOT_CHILD_TAGS for element in modified):
+        return None
+
+    # Match the modified elements with their position in the file
+    patches = locate_modified(root, data, modified, created)
+    if patches is None:
+        patches = locate_all(root, data, modified, created)
+    if patches is None:
+        return None
+
+    newline = get_newline(data)
+    root_end = data.rfind(b"</" + root.tag.encode("utf8"))
+
+    if created and root_end == -1:
+        return None
+
+    view = memoryview(data)
+    parts: List[Union[bytes, memoryview]] = []
+    position = 0
+
+    for start, end, element in sorted(patches, key=lambda patch: patch[0]):
+        parts.append(view[position:start])
+        parts.append(serialize_in_place(root, element).replace(b"\n", newline))
+        position = end
+
+    if created:
+        parts.append(view[position:root_end])
+
+        for element in created_elements:
+            parts.append(b"  " + serialize_in_place(root, element).replace(b"\n", newline) + newline)
+
+        position = root_end
+
+    parts.append(view[position:])
+    return parts
+
+
+def get_minimal_rewrite(tree: ET.ElementTree, data: bytes, modified_elements: Iterable[ET.Element], created_elements: Iterable[ET.Element]) -> Optional[bytes]:
+    """Joins the parts returned by `get_minimal_parts`, or returns None if the file has to be written in full."""
+    parts = get_minimal_parts(tree, data, modified_elements, created_elements)
+    return None if parts is None else b"".join(parts)
+
+
+def write_minimal(tree: ET.ElementTree, file_path: str, modified_elements: Iterable[ET.Element], created_elements: Iterable[ET.Element], output_path: Optional[str] = None) -> bool:
+    """
+    Rewrites `file_path` (which `tree` was parsed from) touching only the modified and created elements,
+    falling back to writing the whole tree when that isn't possible. The result goes to `output_path`
+    instead if it's given. Returns True if only the changed elements were written.
+    """
+    with open(file_path, "rb") as file:
+        data = file.read()
+
+    # Written part by part, so the untouched parts are never copied
+    parts = get_minimal_parts(tree, data, modified_elements, created_elements)
+
+    if output_path is not None:
+        if parts is None:
+            write_full(tree, output_path)
+        else:
+            with open(output_path, "wb") as file:
+                file.writelines(parts)
+
+        return parts is not None
+
+    if parts is None:
+        write_full(tree, file_path)
+        return False
+
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.writelines(parts)
+    os.replace(temp_path, file_path)
+
+    return True
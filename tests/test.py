@@ -1,9 +1,11 @@
 import unittest
+import io
 import json
 import hashlib
+import yaml
 from lxml import etree as ET
 
-from src.util.xml_updater import ChangesParser, XmlUpdater, explain_changes
+from src.util.xml_updater import ChangesParser, XmlUpdater, YamlLoader, explain_changes, iter_explain_changes
 
 
 def get_md5(input: str):
@@ -161,8 +163,68 @@ Title: 42
         changes = "GAME:e"
         self.assertRaises(ChangesParser.InvalidChangesSyntax, fn, changes)
 
+    def test_loaders_match(self):
+        fn = ChangesParser.parse_changes_str
+
+        with open("tests/big_changes.yml", encoding="utf8") as file:
+            big_changes = file.read()
+
+        # The pure Python loader is the fallback when libyaml isn't installed
+        self.assertEqual(fn(big_changes, loader=yaml.SafeLoader), fn(big_changes, loader=YamlLoader))
+
+        invalid_changes = {
+            "GAME: 1\nTitle: 42\n---\n": ChangesParser.NotEnoughDocuments,
+            "---\nGAME: 1\nTitle: 42\n": ChangesParser.NotEnoughDocuments,
+            "": ChangesParser.NotEnoughDocuments,
+            "GAME: 1\nGAME: 1\n---\nTitle: 42\n": ChangesParser.InvalidGameId,
+            "GAME: 1\n---\nGAME: 1\n": ChangesParser.DuplicateGameId,
+            "GAME:e": ChangesParser.InvalidChangesSyntax
+        }
+
+        for changes, exception in invalid_changes.items():
+            for loader in (yaml.SafeLoader, YamlLoader):
+                self.assertRaises(exception, fn, changes, loader=loader)
+
+    def test_iter_changes(self):
+        fn = ChangesParser.iter_changes
+
+        changes = "GAME: 1\nTitle: One\n\n---\n\nGAME: 2\nTitle: Two\nGenre: [a, b]\n"
+        self.assertEqual(list(fn(changes)), [
+            (1, {"Title": "One"}, (1, 3)),
+            (2, {"Title": "Two", "Genre": "a; b"}, (6, 8))
+        ])
+
+        # Reading from a file gives the same result
+        self.assertEqual(list(fn(io.StringIO(changes))), list(fn(changes)))
+
+        # Documents are yielded before the rest of the file is read
+        documents = fn("GAME: 1\nTitle: One\n---\nGAME: 2\nID: 3\n")
+        self.assertEqual(next(documents)[0], 1)
+
+        with self.assertRaises(ChangesParser.ForbiddenElementChange) as context:
+            next(documents)
+
+        self.assertEqual(context.exception.line_range, (4, 5))
+        self.assertIn("(lines 4-5)", str(context.exception))
+
+        with self.assertRaises(ChangesParser.NotEnoughDocuments) as context:
+            list(fn("GAME: 1\nTitle: 42\n---\n"))
+
+        self.assertEqual(context.exception.line_range, (4, 4))
+
     def test_explain_changes(self):
-        pass
+        changes = ChangesParser.parse_changes_str("GAME: first\nTitle: One\nNotes: null\nAdditional Applications:\n  Extras: cmd\n---\nGAME: second\nGenre: Two\n")
+
+        chunks = list(iter_explain_changes(changes))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(explain_changes(changes), "".join(chunks))
+
+        self.assertTrue(chunks[0].startswith("first\n"))
+        self.assertIn('"Title" element was changed to "One"', chunks[0])
+        self.assertIn('"Notes" element value was removed', chunks[0])
+        self.assertIn('Additional application "Extras" (created or modified)', chunks[0])
+        self.assertIn('"CommandLine" element now has a value of "cmd"', chunks[0])
+        self.assertEqual(chunks[1], 'second\n\n      "Genre" element was changed to "Two"\n\n')
 
 
 class TestXmlUpdater(unittest.TestCase):
@@ -216,6 +278,22 @@ class TestXmlUpdater(unittest.TestCase):
         self.assertEqual(desc_el.text, "changed back")
         self.assertEqual(updater.try_get_element("Title", el, True)[1], "Orange")
 
+        # Make sure only the first of duplicate elements is changed, like with a single change
+        second_desc_el = ET.SubElement(el, "Description")
+        fn(None, el, {"Description": "first", "Title": "Orange"}, "123-4567", [])
+        fn(None, el, {"Description": "first again"}, "123-4567", [])
+        self.assertEqual(desc_el.text, "first again")
+        self.assertIsNone(second_desc_el.text)
+        self.assertIs(updater.child_elements(el)["Description"], desc_el)
+
+    def test_iter_games(self):
+        root = ET.fromstring("<LaunchBox><Game><ID>a</ID></Game><Game><Title>No ID</Title></Game><Game><ID></ID></Game><Game><ID>b</ID><ID>c</ID></Game></LaunchBox>")
+        games = root.findall("Game")
+
+        # Make sure games without an ID are skipped and only the first ID counts
+        self.assertEqual(list(XmlUpdater().iter_games(root, {"a", "b", "c"})), [(games[0], "a"), (games[3], "b")])
+        self.assertEqual(list(XmlUpdater().iter_games(root, {"b"})), [(games[3], "b")])
+
     def test_create_additional_application(self):
         updater = XmlUpdater()
         fn = updater.create_additional_application
@@ -300,6 +378,31 @@ class TestXmlUpdater(unittest.TestCase):
 
         self.assertEqual(checksum, "80c61a20ca2d1456f925505423337fe7")
 
+    def test_get_additional_apps(self):
+        updater = XmlUpdater()
+        fn = updater.get_additional_apps
+
+        parser = ET.XMLParser(remove_blank_text=True)
+        root = ET.parse("tests/sample_xml.xml", parser).getroot()
+
+        apps = fn(root, "d3d2fa4d-31d3-ee55-0df6-922f76c6efc0")
+        self.assertEqual(set(apps), {"Extras", "Message", "Version 2"})
+        self.assertEqual(fn(root, "9aeb262e-5a55-48a4-8eb1-265925880b90"), {})
+
+        # The additional applications are only grouped once per tree
+        apps_by_game = updater.additional_apps_by_game
+        fn(root, "af0a8e8b-a08b-2d56-f598-8b150ad48fc1")
+        self.assertIs(updater.additional_apps_by_game, apps_by_game)
+
+        # Created additional applications are picked up without regrouping
+        updater.handle_additional_apps(root, "9aeb262e-5a55-48a4-8eb1-265925880b90", {"Extras": "created"}, [])
+        self.assertIs(updater.additional_apps_by_game, apps_by_game)
+        self.assertEqual(updater.try_get_element("CommandLine", fn(root, "9aeb262e-5a55-48a4-8eb1-265925880b90")["Extras"], True)[1], "created")
+
+        # Renaming one regroups them
+        updater.handle_additional_apps(root, "9aeb262e-5a55-48a4-8eb1-265925880b90", {"Extras": {"Name": "Renamed"}}, [])
+        self.assertEqual(set(fn(root, "9aeb262e-5a55-48a4-8eb1-265925880b90")), {"Renamed"})
+
     def test_get_updated_xml(self):
         updater = XmlUpdater()
         fn = updater.get_updated_xml
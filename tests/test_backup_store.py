@@ -0,0 +1,141 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+
+from unittest import mock
+
+from src.util.backup_store import BackupStore, CHUNK_SIZE, PENDING_EXTENSION
+
+
+class TestBackupStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xml_dir = os.path.join(self.temp_dir, "xml")
+        os.mkdir(self.xml_dir)
+
+        self.store = BackupStore(os.path.join(self.temp_dir, "backups"), 1024 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_file(self, file_name: str, contents: bytes):
+        with open(os.path.join(self.xml_dir, file_name), "wb") as file:
+            file.write(contents)
+
+    def read_file(self, file_name: str) -> bytes:
+        with open(os.path.join(self.xml_dir, file_name), "rb") as file:
+            return file.read()
+
+    def backup_run(self, *file_names: str) -> str:
+        run = self.store.start_run(self.xml_dir)
+        for file_name in file_names:
+            run.backup_file(file_name, os.path.join(self.xml_dir, file_name))
+
+        # Run IDs come from the clock
+        time.sleep(0.001)
+        return run.finish()
+
+    def test_restore_any_run(self):
+        self.write_file("Unity.xml", b"<LaunchBox>first</LaunchBox>")
+        first_run = self.backup_run("Unity.xml")
+
+        self.write_file("Unity.xml", b"<LaunchBox>second</LaunchBox>")
+        second_run = self.backup_run("Unity.xml")
+
+        self.write_file("Unity.xml", b"<LaunchBox>third</LaunchBox>")
+
+        self.assertEqual([run["id"] for run in self.store.list_runs()], [second_run, first_run])
+
+        self.store.restore(first_run)
+        self.assertEqual(self.read_file("Unity.xml"), b"<LaunchBox>first</LaunchBox>")
+
+        self.store.restore(second_run)
+        self.assertEqual(self.read_file("Unity.xml"), b"<LaunchBox>second</LaunchBox>")
+
+        with self.assertRaises(BackupStore.UnknownRun):
+            self.store.restore("missing")
+
+    def test_deduplicated(self):
+        shutil.copy("tests/sample_xml.xml", os.path.join(self.xml_dir, "Unity.xml"))
+        shutil.copy("tests/sample_xml.xml", os.path.join(self.xml_dir, "Flash.xml"))
+
+        self.backup_run("Unity.xml", "Flash.xml")
+        self.backup_run("Unity.xml")
+
+        objects = os.listdir(self.store.objects_dir)
+        self.assertEqual(len(objects), 1)
+        self.assertLess(os.path.getsize(os.path.join(self.store.objects_dir, objects[0])), os.path.getsize("tests/sample_xml.xml"))
+
+    def test_nothing_backed_up(self):
+        self.assertIsNone(self.backup_run())
+        self.assertEqual(self.store.list_runs(), [])
+
+    def test_retention(self):
+        self.store.max_bytes = 1
+
+        self.write_file("Unity.xml", b"<LaunchBox>first</LaunchBox>")
+        self.backup_run("Unity.xml")
+        self.write_file("Unity.xml", b"<LaunchBox>second</LaunchBox>")
+        last_run = self.backup_run("Unity.xml")
+
+        # The run that was just made is always kept, even when it's over budget on its own
+        self.assertEqual([run["id"] for run in self.store.list_runs()], [last_run])
+        self.assertEqual(len(os.listdir(self.store.objects_dir)), 1)
+
+    def test_moved_files_are_compressed_when_finished(self):
+        # More than one chunk
+        contents = b"<LaunchBox>" + os.urandom(CHUNK_SIZE * 2).hex().encode("ascii") + b"</LaunchBox>"
+        self.write_file("Unity.xml", contents)
+
+        run = self.store.start_run(self.xml_dir)
+        content_hash, size = run.backup_file("Unity.xml", os.path.join(self.xml_dir, "Unity.xml"), move=True)
+
+        self.assertEqual(size, len(contents))
+        self.assertFalse(self.store.has_object(content_hash))
+        self.assertEqual(os.listdir(self.xml_dir), [f"Unity.xml.{run.id}{PENDING_EXTENSION}"])
+
+        run_id = run.finish()
+        self.assertEqual(os.listdir(self.xml_dir), [])
+
+        self.store.restore(run_id)
+        self.assertEqual(self.read_file("Unity.xml"), contents)
+        self.assertEqual(self.store.hash_file(os.path.join(self.xml_dir, "Unity.xml")), (content_hash, size))
+
+    def test_moved_files_are_kept_when_compressing_fails(self):
+        self.write_file("Unity.xml", b"<LaunchBox>original</LaunchBox>")
+
+        run = self.store.start_run(self.xml_dir)
+        run.backup_file("Unity.xml", os.path.join(self.xml_dir, "Unity.xml"), move=True)
+
+        with mock.patch.object(self.store, "write_object", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                run.finish()
+
+        # The moved file is the only copy of the original left
+        self.assertEqual(os.listdir(self.xml_dir), [f"Unity.xml.{run.id}{PENDING_EXTENSION}"])
+        self.assertEqual(self.store.list_runs(), [])
+        self.assertTrue(self.store.has_pending_runs())
+
+        self.assertEqual(self.store.recover_pending_runs(), [run.id])
+        self.assertEqual(os.listdir(self.xml_dir), [])
+        self.assertFalse(self.store.has_pending_runs())
+
+        self.store.restore(run.id)
+        self.assertEqual(self.read_file("Unity.xml"), b"<LaunchBox>original</LaunchBox>")
+
+    def test_recover_orphans(self):
+        self.write_file(f"Unity.xml.20200101-000000-000000{PENDING_EXTENSION}", b"<LaunchBox>orphan</LaunchBox>")
+
+        run_id = self.store.recover_orphans(self.xml_dir)
+        self.assertEqual(os.listdir(self.xml_dir), [])
+        self.assertIsNone(self.store.recover_orphans(self.xml_dir))
+
+        self.store.restore(run_id)
+        self.assertEqual(self.read_file("Unity.xml"), b"<LaunchBox>orphan</LaunchBox>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.util.xml_updater import ChangesParser, XmlUpdater
+from src.util.xml_index import XmlIndex
+from src.util.batch_updater import apply_changes
+from src.util.backup_store import BackupStore
+from src.util.instrumentation import Instrumentation
+
+FLASH_XML = """<LaunchBox>
+  <Game>
+    <ID>flash-game</ID>
+    <Title>Flash Game</Title>
+  </Game>
+</LaunchBox>
+"""
+
+CHANGES = """
+GAME: flash-game
+Title: Changed Flash Game
+
+---
+
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+Title: Rush Hour 2
+
+---
+
+GAME: 25a91b3a-a9e1-db58-9e97-75c33bbe25fa
+NotWhitelisted: 1
+
+---
+
+GAME: unknown-game
+Title: Nowhere
+"""
+
+
+class TestBatchUpdater(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_in_copy(self, name: str, workers: int):
+        xml_dir = os.path.join(self.temp_dir, name)
+        backup_run = BackupStore(os.path.join(self.temp_dir, name + "_backups"), 1024 * 1024).start_run(xml_dir)
+        os.mkdir(xml_dir)
+
+        shutil.copy("tests/sample_xml.xml", os.path.join(xml_dir, "Unity.xml"))
+        with open(os.path.join(xml_dir, "Flash.xml"), "w", encoding="utf8") as file:
+            file.write(FLASH_XML)
+
+        index = XmlIndex(os.path.join(self.temp_dir, name + "_index.json"))
+        index.refresh(xml_dir)
+
+        changes = ChangesParser.parse_changes_str(CHANGES)
+        game_ids_by_file, _ = index.locate(changes)
+        instrumentation = Instrumentation()
+        results, not_found = apply_changes(xml_dir, changes, game_ids_by_file, [], backup_run, os.path.join(self.temp_dir, name + "_commit.json"), workers=workers, instrumentation=instrumentation)
+        backup_run.finish()
+
+        contents = {}
+        for file_name in sorted(os.listdir(xml_dir)):
+            with open(os.path.join(xml_dir, file_name), "rb") as file:
+                contents[file_name] = file.read()
+
+        return results, not_found, contents, backup_run.files, instrumentation
+
+    def test_parallel_matches_serial(self):
+        serial_results, serial_missing, serial_contents, serial_backups, serial_instrumentation = self.run_in_copy("serial", 1)
+        parallel_results, parallel_missing, parallel_contents, parallel_backups, parallel_instrumentation = self.run_in_copy("parallel", 2)
+
+        self.assertEqual(serial_contents, parallel_contents)
+        self.assertEqual(serial_backups, parallel_backups)
+        self.assertEqual(sorted(serial_backups), ["Flash.xml", "Unity.xml"])
+        self.assertEqual(serial_missing, ["unknown-game"])
+        self.assertEqual(parallel_missing, serial_missing)
+
+        self.assertEqual([r.file_name for r in serial_results], [r.file_name for r in parallel_results])
+
+        for serial_result, parallel_result in zip(serial_results, parallel_results):
+            self.assertEqual(serial_result.games_changed, parallel_result.games_changed)
+            self.assertEqual(serial_result.changes, parallel_result.changes)
+            self.assertEqual([diff.fields for diff in serial_result.diffs], [diff.fields for diff in parallel_result.diffs])
+            self.assertEqual(serial_result.games_failed.keys(), parallel_result.games_failed.keys())
+
+            for game_id, error in parallel_result.games_failed.items():
+                # Errors coming back from the workers keep their type and details
+                self.assertIsInstance(error, XmlUpdater.MissingElement)
+                self.assertEqual(error.game_id, game_id)
+                self.assertEqual(str(error), str(serial_result.games_failed[game_id]))
+
+        self.assertIn(b"Changed Flash Game", parallel_contents["Flash.xml"])
+        self.assertIn(b"Rush Hour 2", parallel_contents["Unity.xml"])
+
+        # The counters of the workers make it back to the run
+        self.assertEqual(serial_instrumentation.counters, parallel_instrumentation.counters)
+        self.assertEqual(serial_instrumentation.counters["files_written"], 2)
+        self.assertIn("commit", parallel_instrumentation.timings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from src.util.xml_updater import ChangesParser
+from src.util.changes_cache import ChangesCache
+
+
+class TestChangesCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_changes(self, file_name: str, changes_str: str) -> str:
+        file_path = os.path.join(self.temp_dir, file_name)
+        with open(file_path, "w", encoding="utf8") as file:
+            file.write(changes_str)
+
+        return file_path
+
+    def test_hit_matches_cold_parse(self):
+        cache = ChangesCache(self.cache_dir, 1024 * 1024)
+        cold = ChangesParser.parse_changes_file("tests/big_changes.yml")
+
+        self.assertEqual(cache.parse_changes_file("tests/big_changes.yml"), cold)
+        self.assertEqual(cache.misses, 1)
+
+        # A hit must not touch the YAML parser at all
+        with mock.patch.object(ChangesParser, "iter_changes", side_effect=AssertionError("parsed on a cache hit")):
+            self.assertEqual(cache.parse_changes_file("tests/big_changes.yml"), cold)
+            self.assertEqual(ChangesCache(self.cache_dir, 1024 * 1024).parse_changes_file("tests/big_changes.yml"), cold)
+
+        self.assertEqual(cache.hits, 1)
+
+        # Line ranges are cached along with the changes
+        with open("tests/big_changes.yml", encoding="utf8") as file:
+            self.assertEqual(cache.load_entries("tests/big_changes.yml"), list(ChangesParser.iter_changes(file)))
+
+    def test_changed_contents(self):
+        cache = ChangesCache(self.cache_dir, 1024 * 1024)
+        file_path = self.write_changes("changes.yml", "GAME: 1\nTitle: One\n")
+
+        self.assertEqual(cache.parse_changes_file(file_path), {1: {"Title": "One"}})
+
+        self.write_changes("changes.yml", "GAME: 1\nTitle: Two\n")
+        self.assertEqual(cache.parse_changes_file(file_path), {1: {"Title": "Two"}})
+        self.assertEqual(cache.misses, 2)
+
+    def test_broken_entry(self):
+        cache = ChangesCache(self.cache_dir, 1024 * 1024)
+        file_path = self.write_changes("changes.yml", "GAME: 1\nTitle: One\n")
+        cache.parse_changes_file(file_path)
+
+        # Refers to a class that doesn't exist anymore
+        entry_path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(entry_path, "wb") as file:
+            file.write(b"csrc.util.removed_module\nEntries\n.")
+
+        self.assertEqual(cache.parse_changes_file(file_path), {1: {"Title": "One"}})
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.parse_changes_file(file_path), {1: {"Title": "One"}})
+        self.assertEqual(cache.hits, 1)
+
+    def test_errors_are_not_cached(self):
+        cache = ChangesCache(self.cache_dir, 1024 * 1024)
+        file_path = self.write_changes("changes.yml", "GAME: 1\nID: 2\n")
+
+        self.assertRaises(ChangesParser.ForbiddenElementChange, cache.parse_changes_file, file_path)
+        self.assertRaises(ChangesParser.ForbiddenElementChange, cache.parse_changes_file, file_path)
+        self.assertEqual(cache.hits, 0)
+
+    def test_eviction(self):
+        cache = ChangesCache(self.cache_dir, 1024 * 1024)
+        first_path = self.write_changes("first.yml", "GAME: 1\nTitle: One\n")
+        second_path = self.write_changes("second.yml", "GAME: 2\nTitle: Two\n")
+
+        cache.parse_changes_file(first_path)
+        first_entry = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        os.utime(first_entry, ns=(1, 1))
+
+        # Only room for a single entry, so the least recently used one goes
+        cache.max_bytes = os.path.getsize(first_entry)
+        cache.parse_changes_file(second_path)
+
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        self.assertFalse(os.path.exists(first_entry))
+
+
+if __name__ == "__main__":
+    unittest.main()
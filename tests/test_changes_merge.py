@@ -0,0 +1,124 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.util.xml_updater import ChangesParser
+from src.util.changes_merge import ChangesMerger, ConflictingChanges, merge_changes_files
+from src.util.runner import ChangesRunner
+from src.util.settings import DEFAULT_SETTINGS
+
+FIRST_CHANGES = """
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+Title: Merged
+Note: Same in both
+
+---
+
+GAME: af0a8e8b-a08b-2d56-f598-8b150ad48fc1
+Additional Applications:
+    Message: first message
+"""
+
+SECOND_CHANGES = """
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+Notes: Same in both
+Series: Added
+
+---
+
+GAME: af0a8e8b-a08b-2d56-f598-8b150ad48fc1
+Additional Applications:
+    Extras: second extras
+
+---
+
+GAME: ba3d2d72-6192-2925-3bae-2db312ffd4a8
+Title: Only in the second file
+"""
+
+CONFLICTING_CHANGES = """
+GAME: ba3d2d72-6192-2925-3bae-2db312ffd4a8
+Developer: Fine
+
+---
+
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+Title: Something else
+Notes: Different
+"""
+
+
+class TestChangesMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+
+        for index, changes in enumerate([FIRST_CHANGES, SECOND_CHANGES, CONFLICTING_CHANGES]):
+            path = os.path.join(self.temp_dir, f"changes{index}.yml")
+            with open(path, "w", encoding="utf8") as file:
+                file.write(changes)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_merge(self):
+        merged = merge_changes_files(self.paths[:2])
+
+        self.assertEqual(merged, {
+            "9aeb262e-5a55-48a4-8eb1-265925880b90": {"Title": "Merged", "Notes": "Same in both", "Series": "Added"},
+            "af0a8e8b-a08b-2d56-f598-8b150ad48fc1": {"Additional Applications": {"Message": "first message", "Extras": "second extras"}},
+            "ba3d2d72-6192-2925-3bae-2db312ffd4a8": {"Title": "Only in the second file"},
+        })
+
+    def test_conflicts(self):
+        with self.assertRaises(ConflictingChanges) as context:
+            merge_changes_files(self.paths)
+
+        conflicts = context.exception.conflicts
+        self.assertEqual([conflict.element for conflict in conflicts], ["Title", "Notes"])
+
+        title = conflicts[0]
+        self.assertEqual(title.sources, [(self.paths[0], "Merged"), (self.paths[2], "Something else")])
+        self.assertEqual(title.lines, {self.paths[0]: 2, self.paths[2]: 7})
+        self.assertEqual(str(title), f"9aeb262e-5a55-48a4-8eb1-265925880b90 'Title': {self.paths[0]}:2 sets 'Merged', {self.paths[2]}:7 sets 'Something else'")
+
+    def test_additional_application_conflicts(self):
+        # Aliases of the same element conflict too
+        merger = ChangesMerger()
+        merger.add("a.yml", {"game": {"Additional Applications": {"Alternate": {"Launch Command": "a", "Name": "Alternate"}, "Extras": "a"}}})
+        merger.add("b.yml", {"game": {"Additional Applications": {"Alternate": {"CommandLine": "b", "Name": "Alternate"}, "Extras": {"CommandLine": "b"}}}})
+
+        self.assertEqual(sorted(merger.conflicts), [
+            ("game", "Additional Applications", "Alternate", "CommandLine"),
+            ("game", "Additional Applications", "Extras"),
+        ])
+
+    def test_errors_name_the_file(self):
+        invalid_path = os.path.join(self.temp_dir, "invalid.yml")
+        with open(invalid_path, "w", encoding="utf8") as file:
+            file.write("GAME: game\nID: forbidden")
+
+        with self.assertRaises(ChangesParser.ForbiddenElementChange) as context:
+            merge_changes_files([self.paths[0], invalid_path])
+
+        self.assertTrue(str(context.exception).startswith(invalid_path))
+
+    def test_single_pass(self):
+        xml_dir = os.path.join(self.temp_dir, "Platforms")
+        os.mkdir(xml_dir)
+        shutil.copy("tests/sample_xml.xml", os.path.join(xml_dir, "Unity.xml"))
+
+        runner = ChangesRunner(DEFAULT_SETTINGS, ["Series"], os.path.join(self.temp_dir, "data"))
+        summary = runner.run(xml_dir, runner.parse_changes_files(self.paths[:2]))
+
+        self.assertEqual(sorted(summary.results[0].games_changed), sorted(merge_changes_files(self.paths[:2])))
+        # Parsed and backed up once for both changes files
+        self.assertEqual(runner.tree_cache.misses, 1)
+        self.assertEqual(len(runner.backup_store.list_runs()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
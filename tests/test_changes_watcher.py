@@ -0,0 +1,181 @@
+import unittest
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from unittest import mock
+
+import devtools_cli
+
+from src.util.xml_updater import ChangesParser
+from src.util.changes_watcher import IncrementalChangesParser, ChangesWatcher
+from src.util.runner import ChangesRunner
+from src.util.xml_index import XmlIndex
+from src.util.instrumentation import Instrumentation
+from src.util.settings import DEFAULT_SETTINGS
+
+CHANGES = """
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+Title: First
+
+---
+
+GAME: ba3d2d72-6192-2925-3bae-2db312ffd4a8
+Title: Second
+
+---
+
+GAME: 25a91b3a-a9e1-db58-9e97-75c33bbe25fa
+Title: Third
+"""
+
+
+class TestIncrementalChangesParser(unittest.TestCase):
+
+    def test_only_changed_documents_are_parsed(self):
+        parser = IncrementalChangesParser()
+
+        self.assertEqual(parser.parse(CHANGES), ChangesParser.parse_changes_str(CHANGES))
+        self.assertEqual(parser.documents_parsed, 3)
+
+        edited = CHANGES.replace("Second", "Edited")
+        self.assertEqual(parser.parse(edited), ChangesParser.parse_changes_str(edited))
+        self.assertEqual(parser.documents_parsed, 4)
+
+    def test_errors_match_the_full_parser(self):
+        for invalid in ["---\n" + CHANGES, CHANGES + "---\n", CHANGES.replace("Third", "["), CHANGES + "---\nGAME: 9aeb262e-5a55-48a4-8eb1-265925880b90\n"]:
+            parser = IncrementalChangesParser()
+            parser.parse(CHANGES)
+
+            with self.assertRaises(Exception) as full:
+                ChangesParser.parse_changes_str(invalid)
+            with self.assertRaises(type(full.exception)) as incremental:
+                parser.parse(invalid)
+
+            self.assertEqual(str(incremental.exception), str(full.exception))
+
+
+class TestChangesWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xml_dir = os.path.join(self.temp_dir, "Platforms")
+        os.mkdir(self.xml_dir)
+        shutil.copy("tests/sample_xml.xml", os.path.join(self.xml_dir, "Unity.xml"))
+
+        self.changes_dir = os.path.join(self.temp_dir, "changes")
+        os.mkdir(self.changes_dir)
+        self.changes_path = os.path.join(self.changes_dir, "changes.yml")
+        self.saves = 0
+        self.save(CHANGES)
+
+        data_dir = os.path.join(self.temp_dir, "data")
+        os.mkdir(data_dir)
+        self.runner = ChangesRunner(DEFAULT_SETTINGS, [], data_dir)
+
+    def tearDown(self):
+        # The backups are still being written in the background otherwise
+        self.runner.finish_backups()
+        shutil.rmtree(self.temp_dir)
+
+    def save(self, changes: str):
+        with open(self.changes_path, "w", encoding="utf8") as file:
+            file.write(changes)
+
+        # Saves within the same tick of the clock still count
+        self.saves += 1
+        os.utime(self.changes_path, ns=(self.saves, self.saves))
+
+    def test_applies_only_the_delta(self):
+        watcher = ChangesWatcher(self.runner, self.xml_dir, [self.changes_dir])
+
+        summary = watcher.poll()
+        self.assertEqual(sorted(summary.results[0].games_changed), sorted(ChangesParser.parse_changes_str(CHANGES)))
+        self.assertIsNone(watcher.poll())
+
+        self.save(CHANGES.replace("Second", "Edited"))
+        instrumentation = Instrumentation()
+        # The index was kept up to date with the file written by the first run, so it isn't read again
+        with mock.patch.object(XmlIndex, "scan_file", side_effect=AssertionError("rescanned")):
+            summary = watcher.poll(instrumentation)
+
+        self.assertEqual(summary.results[0].games_changed, {"ba3d2d72-6192-2925-3bae-2db312ffd4a8"})
+        self.assertNotIn("files_prescanned", instrumentation.counters)
+        # The tree written by the first run was still in memory
+        self.assertEqual(self.runner.tree_cache.hits, 1)
+
+        with open(os.path.join(self.xml_dir, "Unity.xml"), encoding="utf8") as file:
+            contents = file.read()
+        self.assertIn("<Title>Edited</Title>", contents)
+        self.assertIn("<Title>Third</Title>", contents)
+
+        # Saving without changing anything doesn't run again
+        self.save(CHANGES.replace("Second", "Edited"))
+        self.assertIsNone(watcher.poll())
+
+        # Both runs were backed up in the background
+        watcher.stop()
+        self.assertEqual(len(self.runner.backup_store.list_runs()), 2)
+        self.assertIsNone(self.runner.backup_executor)
+
+    def test_keeps_trees_of_streamed_files(self):
+        settings = dict(DEFAULT_SETTINGS, streaming_threshold_mb=0, tree_cache_mb=0)
+        runner = ChangesRunner(settings, [], os.path.join(self.temp_dir, "data"))
+        watcher = ChangesWatcher(runner, self.xml_dir, [self.changes_path])
+
+        watcher.poll()
+        self.save(CHANGES.replace("Second", "Edited"))
+        watcher.poll()
+
+        self.assertEqual(runner.tree_cache.hits, 1)
+
+        watcher.stop()
+        self.assertEqual(runner.tree_cache.trees, {})
+
+    def test_unfinished_backups_are_recovered(self):
+        watcher = ChangesWatcher(self.runner, self.xml_dir, [self.changes_path])
+
+        # Compressing the originals fails in the background, like it would if the process ended first
+        with mock.patch.object(self.runner.backup_store, "write_object", side_effect=OSError("disk full")):
+            run_id = watcher.poll().run_id
+            with self.assertRaises(OSError):
+                watcher.stop()
+
+        self.assertTrue(self.runner.has_pending_commit())
+        self.assertEqual(self.runner.backup_store.list_runs(), [])
+
+        runner = ChangesRunner(DEFAULT_SETTINGS, [], os.path.join(self.temp_dir, "data"))
+        runner.recover_interrupted_run(self.xml_dir)
+
+        self.assertFalse(runner.has_pending_commit())
+        self.assertEqual(os.listdir(self.xml_dir), ["Unity.xml"])
+
+        runner.backup_store.restore(run_id)
+        with open("tests/sample_xml.xml", "rb") as original, open(os.path.join(self.xml_dir, "Unity.xml"), "rb") as restored:
+            self.assertEqual(restored.read(), original.read())
+
+    def test_keeps_watching_after_errors(self):
+        watcher = ChangesWatcher(self.runner, self.xml_dir, [self.changes_path])
+        self.save(CHANGES.replace("Third", "["))
+
+        with self.assertRaises(Exception):
+            watcher.poll()
+        self.assertIsNone(watcher.poll())
+
+        self.save(CHANGES)
+        self.assertEqual(len(watcher.poll().results[0].games_changed), 3)
+
+    def test_cli(self):
+        output = io.StringIO()
+        exit_code = devtools_cli.watch_changes(self.runner, self.xml_dir, [self.changes_path], 0, output, max_polls=2)
+
+        self.assertEqual(exit_code, devtools_cli.EXIT_OK)
+
+        line, = output.getvalue().splitlines()
+        self.assertEqual(len(json.loads(line)["changed"]["Unity.xml"]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from lxml import etree as ET
+
+from src.util.xml_updater import ChangesParser, XmlUpdater
+from src.util.batch_updater import check_changes
+from src.util.tree_cache import TreeCache
+
+CHANGES = """
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+Title: Valid
+Notes: Created if whitelisted
+
+---
+
+GAME: ba3d2d72-6192-2925-3bae-2db312ffd4a8
+Foo: 1
+Bar: 2
+
+---
+
+GAME: af0a8e8b-a08b-2d56-f598-8b150ad48fc1
+Additional Applications:
+    Message:
+        CommandLine: edited
+        Baz: 3
+    Alternate:
+        Name: Alternate
+    Other: a string
+
+---
+
+GAME: unknown-game
+Title: Nowhere
+"""
+
+
+class TestCheckChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.changes = ChangesParser.parse_changes_str(CHANGES)
+
+    def test_reports_every_problem(self):
+        tree = XmlUpdater.parse_xml("tests/sample_xml.xml")
+        before = ET.tostring(tree)
+
+        games_found, problems = XmlUpdater().check_tree(self.changes, tree, [])
+
+        self.assertEqual(ET.tostring(tree), before)
+        self.assertEqual(len(games_found), 3)
+        self.assertNotIn("unknown-game", games_found)
+
+        self.assertEqual([problem.element_name for problem in problems["ba3d2d72-6192-2925-3bae-2db312ffd4a8"]], ["Foo", "Bar"])
+        # The missing element of the existing application, the two missing values of the new one and the string
+        self.assertEqual(len(problems["af0a8e8b-a08b-2d56-f598-8b150ad48fc1"]), 4)
+        # Notes exists already, everything else is fine
+        self.assertNotIn("9aeb262e-5a55-48a4-8eb1-265925880b90", problems)
+
+    def test_matches_update_tree(self):
+        games_found, problems = XmlUpdater().check_tree(self.changes, XmlUpdater.parse_xml("tests/sample_xml.xml"), [])
+        games_changed, games_failed = XmlUpdater().update_tree(self.changes, XmlUpdater.parse_xml("tests/sample_xml.xml"), [])
+
+        self.assertEqual(set(problems), set(games_failed))
+        self.assertEqual(games_found - set(problems), games_changed)
+
+        for game_id, error in games_failed.items():
+            # The first problem a run would run into is among the ones reported
+            self.assertIn(str(error), [str(problem) for problem in problems[game_id]])
+
+    def test_check_changes_writes_nothing(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(temp_dir, "Unity.xml")
+            shutil.copy("tests/sample_xml.xml", file_path)
+            game_ids_by_file = {"Unity.xml": list(self.changes)}
+
+            tree_cache = TreeCache(1024 * 1024 * 1024)
+            results = [check_changes(temp_dir, self.changes, game_ids_by_file, [], tree_cache=tree_cache) for _ in range(2)]
+            streamed = check_changes(temp_dir, self.changes, game_ids_by_file, [], streaming_threshold_mb=0)
+
+            for problems, not_found in results + [streamed]:
+                self.assertEqual(not_found, ["unknown-game"])
+                self.assertEqual(sorted(problems), ["af0a8e8b-a08b-2d56-f598-8b150ad48fc1", "ba3d2d72-6192-2925-3bae-2db312ffd4a8"])
+
+            # The tree is left as it was, so the second check reuses it
+            self.assertEqual(tree_cache.hits, 1)
+            self.assertEqual(os.listdir(temp_dir), ["Unity.xml"])
+
+            with open(file_path, "rb") as file, open("tests/sample_xml.xml", "rb") as original:
+                self.assertEqual(file.read(), original.read())
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
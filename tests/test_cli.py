@@ -0,0 +1,143 @@
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import devtools_cli
+
+ROOT_DIR = os.path.normpath(os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+FLASH_XML = """<LaunchBox>
+  <Game>
+    <ID>flash-game</ID>
+    <Title>Flash Game</Title>
+  </Game>
+</LaunchBox>
+"""
+
+FIRST_CHANGES = """
+GAME: flash-game
+Title: Changed Flash Game
+
+---
+
+GAME: unknown-game
+Title: Nowhere
+"""
+
+SECOND_CHANGES = """
+GAME: flash-game
+Title: Changed Again
+"""
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xml_dir = os.path.join(self.temp_dir, "Platforms")
+        self.data_dir = os.path.join(self.temp_dir, "data")
+        os.makedirs(self.xml_dir)
+        os.makedirs(self.data_dir)
+
+        with open(os.path.join(self.xml_dir, "Flash.xml"), "w", encoding="utf8") as file:
+            file.write(FLASH_XML)
+
+        self.changes_paths = []
+        for index, changes in enumerate([FIRST_CHANGES, SECOND_CHANGES]):
+            path = os.path.join(self.temp_dir, f"changes{index}.yml")
+            with open(path, "w", encoding="utf8") as file:
+                file.write(changes)
+            self.changes_paths.append(path)
+
+        self.whitelist_path = os.path.join(self.temp_dir, "whitelist.txt")
+        with open(self.whitelist_path, "w", encoding="utf8") as file:
+            file.write("Title\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def get_args(self, changes_paths):
+        return [
+            self.xml_dir, *changes_paths,
+            "--whitelist", self.whitelist_path,
+            "--settings", os.path.join(self.temp_dir, "settings.json"),
+            "--data-dir", self.data_dir,
+            "--summary", os.path.join(self.temp_dir, "summary.json")
+        ]
+
+    def read_summary(self):
+        with open(os.path.join(self.temp_dir, "summary.json"), encoding="utf8") as file:
+            return json.load(file)
+
+    def test_applies_every_changeset(self):
+        exit_code = devtools_cli.main(self.get_args(self.changes_paths))
+        summary = self.read_summary()
+
+        self.assertEqual(exit_code, devtools_cli.EXIT_GAMES_FAILED)
+        self.assertEqual(summary["exit_code"], exit_code)
+
+        first, second = summary["changesets"]
+        self.assertEqual(first["changed"], {"Flash.xml": ["flash-game"]})
+        self.assertEqual(first["missing"], ["unknown-game"])
+        self.assertEqual(second["changed"], {"Flash.xml": ["flash-game"]})
+        self.assertEqual(second["missing"], [])
+        self.assertIn("parse_changes", first["timings"])
+        self.assertIn("apply", first["timings"])
+        self.assertEqual(first["counters"]["games_in_changes"], 2)
+
+        # The tree written by the first changeset is picked up by the second one
+        self.assertEqual(summary["tree_cache"]["hits"], 1)
+
+        with open(os.path.join(self.xml_dir, "Flash.xml"), encoding="utf8") as file:
+            self.assertIn("<Title>Changed Again</Title>", file.read())
+
+    def test_invalid_changeset_doesnt_stop_the_others(self):
+        invalid_path = os.path.join(self.temp_dir, "invalid.yml")
+        with open(invalid_path, "w", encoding="utf8") as file:
+            file.write("GAME: flash-game\nTitle: [")
+
+        exit_code = devtools_cli.main(self.get_args([invalid_path, self.changes_paths[1]]))
+        summary = self.read_summary()
+
+        self.assertEqual(exit_code, devtools_cli.EXIT_ERROR)
+        self.assertIn("error", summary["changesets"][0])
+        self.assertEqual(summary["changesets"][1]["changed"], {"Flash.xml": ["flash-game"]})
+
+    def test_dry_run_writes_nothing(self):
+        exit_code = devtools_cli.main(self.get_args(self.changes_paths[:1]) + ["--dry-run"])
+        summary = self.read_summary()
+
+        self.assertEqual(exit_code, devtools_cli.EXIT_GAMES_FAILED)
+        self.assertEqual(summary["changesets"][0]["problems"], [])
+        self.assertEqual(summary["changesets"][0]["missing"], ["unknown-game"])
+
+        with open(os.path.join(self.xml_dir, "Flash.xml"), encoding="utf8") as file:
+            self.assertEqual(file.read(), FLASH_XML)
+
+    def test_merge_refuses_conflicts(self):
+        exit_code = devtools_cli.main(self.get_args(self.changes_paths) + ["--merge"])
+        summary = self.read_summary()
+
+        self.assertEqual(exit_code, devtools_cli.EXIT_ERROR)
+
+        changeset, = summary["changesets"]
+        self.assertEqual(changeset["changes_files"], self.changes_paths)
+        self.assertEqual(changeset["error"]["type"], "ConflictingChanges")
+        self.assertIn(f"{self.changes_paths[0]}:2 sets 'Changed Flash Game'", changeset["error"]["error"])
+
+        with open(os.path.join(self.xml_dir, "Flash.xml"), encoding="utf8") as file:
+            self.assertEqual(file.read(), FLASH_XML)
+
+    def test_never_imports_tkinter(self):
+        code = "import sys, devtools_cli; exit_code = devtools_cli.main(sys.argv[1:]); sys.exit(3 if 'tkinter' in sys.modules else exit_code)"
+        process = subprocess.run([sys.executable, "-c", code, *self.get_args(self.changes_paths[1:])], cwd=ROOT_DIR)
+
+        self.assertEqual(process.returncode, devtools_cli.EXIT_OK)
+        self.assertEqual(self.read_summary()["changesets"][0]["changed"], {"Flash.xml": ["flash-game"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
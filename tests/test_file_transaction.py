@@ -0,0 +1,167 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from unittest import mock
+
+from src.util.xml_updater import ChangesParser
+from src.util.batch_updater import apply_changes
+from src.util.backup_store import BackupStore
+from src.util.file_transaction import FileTransaction, get_staged_path, get_old_path
+
+
+class TestFileTransaction(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.temp_dir, "commit.json")
+
+        self.paths = [os.path.join(self.temp_dir, name) for name in ("Unity.xml", "Flash.xml")]
+        for path in self.paths:
+            self.write(path, "original")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def write(path: str, contents: str):
+        with open(path, "w", encoding="utf8") as file:
+            file.write(contents)
+
+    @staticmethod
+    def read(path: str) -> str:
+        with open(path, "r", encoding="utf8") as file:
+            return file.read()
+
+    def stage_all(self) -> FileTransaction:
+        transaction = FileTransaction(self.journal_path)
+
+        for path in self.paths:
+            self.write(get_staged_path(path), "updated")
+            transaction.stage(path)
+
+        return transaction
+
+    def test_commit(self):
+        transaction = self.stage_all()
+        replaced = transaction.commit()
+
+        self.assertEqual(replaced, [(path, get_old_path(path)) for path in self.paths])
+        for path in self.paths:
+            self.assertEqual(self.read(path), "updated")
+            self.assertEqual(self.read(get_old_path(path)), "original")
+
+        transaction.finish()
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["Flash.xml", "Unity.xml"])
+
+    def test_rollback(self):
+        self.stage_all().rollback()
+
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["Flash.xml", "Unity.xml"])
+        for path in self.paths:
+            self.assertEqual(self.read(path), "original")
+
+    def test_refuses_to_overwrite_old_files(self):
+        self.write(get_old_path(self.paths[1]), "unrelated")
+        transaction = FileTransaction(self.journal_path)
+
+        self.write(get_staged_path(self.paths[0]), "updated")
+        transaction.stage(self.paths[0])
+
+        self.write(get_staged_path(self.paths[1]), "updated")
+        with self.assertRaises(FileTransaction.OldFileExists):
+            transaction.stage(self.paths[1])
+
+        transaction.rollback()
+
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["Flash.xml", "Flash.xml.old", "Unity.xml"])
+        self.assertEqual(self.read(get_old_path(self.paths[1])), "unrelated")
+
+    def test_recover_while_staging(self):
+        self.stage_all()
+
+        transaction = FileTransaction.recover(self.journal_path)
+
+        self.assertEqual(transaction.files, [])
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["Flash.xml", "Unity.xml"])
+
+    def test_recover_while_replacing(self):
+        transaction = self.stage_all()
+        transaction.state = "prepared"
+        transaction.write_journal()
+
+        # Interrupted right after replacing the first file
+        os.replace(self.paths[0], get_old_path(self.paths[0]))
+        os.replace(get_staged_path(self.paths[0]), self.paths[0])
+
+        recovered = FileTransaction.recover(self.journal_path)
+        self.assertEqual(recovered.files, self.paths)
+
+        for path in self.paths:
+            self.assertEqual(self.read(path), "updated")
+            self.assertEqual(self.read(get_old_path(path)), "original")
+
+        recovered.finish()
+        self.assertFalse(os.path.exists(self.journal_path))
+        self.assertEqual(FileTransaction.recover(self.journal_path).files, [])
+
+    def test_failed_commit_puts_the_originals_back(self):
+        transaction = self.stage_all()
+        replace = os.replace
+
+        def fail_on_second_file(source, destination):
+            if source == get_staged_path(self.paths[1]):
+                raise OSError("disk full")
+            replace(source, destination)
+
+        with mock.patch("src.util.file_transaction.os.replace", side_effect=fail_on_second_file):
+            with self.assertRaises(OSError):
+                transaction.commit()
+
+        transaction.rollback()
+
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["Flash.xml", "Unity.xml"])
+        for path in self.paths:
+            self.assertEqual(self.read(path), "original")
+
+    def test_recover_while_undoing(self):
+        transaction = self.stage_all()
+        transaction.state = "undoing"
+        transaction.write_journal()
+
+        # Interrupted after the first file was replaced, and then the second one failed to be
+        os.replace(self.paths[0], get_old_path(self.paths[0]))
+        os.replace(get_staged_path(self.paths[0]), self.paths[0])
+        os.replace(self.paths[1], get_old_path(self.paths[1]))
+
+        self.assertEqual(FileTransaction.recover(self.journal_path).files, [])
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["Flash.xml", "Unity.xml"])
+        for path in self.paths:
+            self.assertEqual(self.read(path), "original")
+
+    def test_failed_run_changes_nothing(self):
+        xml_dir = os.path.join(self.temp_dir, "xml")
+        os.mkdir(xml_dir)
+
+        shutil.copy("tests/sample_xml.xml", os.path.join(xml_dir, "Unity.xml"))
+        self.write(os.path.join(xml_dir, "Broken.xml"), "<LaunchBox><Game>")
+
+        changes = ChangesParser.parse_changes_str("GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90\nTitle: Never Written\n---\nGAME: broken-game\nTitle: Broken\n")
+        # Unity.xml is staged before Broken.xml fails to parse
+        game_ids_by_file = {"Unity.xml": ["9aeb262e-5a55-48a4-8eb1-265925880b90"], "Broken.xml": ["broken-game"]}
+        backup_run = BackupStore(os.path.join(self.temp_dir, "backups"), 1024 * 1024).start_run(xml_dir)
+
+        with self.assertRaises(Exception):
+            apply_changes(xml_dir, changes, game_ids_by_file, [], backup_run, self.journal_path)
+
+        self.assertIsNone(backup_run.finish())
+        self.assertEqual(sorted(os.listdir(xml_dir)), ["Broken.xml", "Unity.xml"])
+
+        with open("tests/sample_xml.xml", "rb") as file:
+            with open(os.path.join(xml_dir, "Unity.xml"), "rb") as updated_file:
+                self.assertEqual(file.read(), updated_file.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
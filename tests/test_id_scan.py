@@ -0,0 +1,72 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.util.id_scan import scan_file, locate_games
+from src.util.xml_index import XmlIndex
+from src.util.instrumentation import Instrumentation
+
+
+class TestIdScan(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+        shutil.copy("tests/sample_xml.xml", os.path.join(self.temp_dir, "Unity.xml"))
+        with open(os.path.join(self.temp_dir, "Flash.xml"), "w", encoding="utf8") as file:
+            file.write("<LaunchBox><Game><ID>flash-game</ID></Game></LaunchBox>")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_scan_file(self):
+        game_ids = {b"9aeb262e-5a55-48a4-8eb1-265925880b90", b"unknown"}
+        self.assertEqual(scan_file("tests/sample_xml.xml", game_ids), {b"9aeb262e-5a55-48a4-8eb1-265925880b90"})
+
+        # Additional applications aren't games
+        self.assertEqual(scan_file("tests/sample_xml.xml", {b"7172bd63-2cf2-4d6b-aeac-9128706c4c67"}), set())
+
+        # Every game the index finds is found
+        all_ids = {game_id.encode("utf8") for game_id in XmlIndex.scan_file("tests/sample_xml.xml")}
+        self.assertEqual(scan_file("tests/sample_xml.xml", all_ids), all_ids)
+
+        empty_path = os.path.join(self.temp_dir, "Empty.xml")
+        open(empty_path, "w").close()
+        self.assertEqual(scan_file(empty_path, all_ids), set())
+
+    def test_locate_games(self):
+        game_ids = ["flash-game", "unknown", "9aeb262e-5a55-48a4-8eb1-265925880b90", "ba3d2d72-6192-2925-3bae-2db312ffd4a8"]
+        located, missing = locate_games(self.temp_dir, game_ids)
+
+        self.assertEqual(located, {"Flash.xml": ["flash-game"], "Unity.xml": ["9aeb262e-5a55-48a4-8eb1-265925880b90", "ba3d2d72-6192-2925-3bae-2db312ffd4a8"]})
+        self.assertEqual(missing, ["unknown"])
+
+        # Same result as the index
+        index = XmlIndex(os.path.join(self.temp_dir, "xml_index.json"))
+        index.refresh(self.temp_dir)
+        self.assertEqual(index.locate(game_ids), (located, missing))
+
+    def test_numeric_ids(self):
+        located, missing = locate_games(self.temp_dir, [12345, "flash-game"])
+
+        self.assertEqual(located, {"Flash.xml": ["flash-game"]})
+        self.assertEqual(missing, [12345])
+
+        index = XmlIndex(os.path.join(self.temp_dir, "xml_index.json"))
+        index.refresh(self.temp_dir)
+        self.assertEqual(index.locate([12345, "flash-game"]), (located, missing))
+
+    def test_stops_once_everything_is_found(self):
+        first_file = XmlIndex.list_xml_files(self.temp_dir)[0]
+        game_id = "flash-game" if first_file == "Flash.xml" else "9aeb262e-5a55-48a4-8eb1-265925880b90"
+
+        instrumentation = Instrumentation()
+        located, missing = locate_games(self.temp_dir, [game_id], instrumentation)
+
+        self.assertEqual(located, {first_file: [game_id]})
+        self.assertEqual(instrumentation.counters["files_prescanned"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
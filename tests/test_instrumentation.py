@@ -0,0 +1,63 @@
+import unittest
+
+from src.util.instrumentation import Instrumentation, NULL_INSTRUMENTATION, render_report
+from src.util.xml_updater import ChangesParser, XmlUpdater
+
+CHANGES = """
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+Title: Rush Hour 2
+Publisher: Someone
+Additional Applications:
+    Extras: extras
+"""
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_timers_and_counters_add_up(self):
+        instrumentation = Instrumentation()
+
+        for _ in range(2):
+            with instrumentation.timer("phase"):
+                pass
+            instrumentation.count("things", 3)
+
+        other = Instrumentation()
+        other.count("things")
+        other.count("others")
+        instrumentation.merge(other)
+
+        self.assertEqual(instrumentation.counters, {"things": 7, "others": 1})
+        self.assertGreaterEqual(instrumentation.timings["phase"], 0)
+        self.assertEqual(list(instrumentation.to_json()), ["timings", "counters"])
+        self.assertIn("things: 7", render_report(instrumentation.to_json()))
+
+    def test_null_instrumentation_records_nothing(self):
+        with NULL_INSTRUMENTATION.timer("phase"):
+            NULL_INSTRUMENTATION.count("things")
+
+        NULL_INSTRUMENTATION.merge(Instrumentation())
+
+        self.assertEqual(NULL_INSTRUMENTATION.to_json(), {"timings": {}, "counters": {}})
+        self.assertFalse(NULL_INSTRUMENTATION.enabled)
+
+    def test_updater_counts(self):
+        instrumentation = Instrumentation()
+        changes = ChangesParser.parse_changes_str(CHANGES, instrumentation=instrumentation)
+
+        updater = XmlUpdater(instrumentation)
+        _, games_changed, _ = updater.get_updated_xml(changes, "tests/sample_xml.xml", [])
+
+        self.assertEqual(len(games_changed), 1)
+        self.assertEqual(instrumentation.counters["games_in_changes"], 1)
+        self.assertEqual(instrumentation.counters["elements_updated"], 2)
+        self.assertEqual(instrumentation.counters["additional_apps_created"], 1)
+        self.assertEqual(instrumentation.counters["additional_apps_scans"], 1)
+        self.assertGreater(instrumentation.counters["games_scanned"], 1)
+
+        for phase in ("parse_changes", "parse_xml", "update_tree", "additional_apps_scan"):
+            self.assertIn(phase, instrumentation.timings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from src.util.lazy_lines import LazyLines
+
+
+class TestLazyLines(unittest.TestCase):
+
+    def test_same_lines_as_split(self):
+        chunks = ["first line\nsec", "ond line\n", "", "\nlast", " line\n"]
+        lines = LazyLines(chunks)
+        lines.load_all()
+
+        self.assertEqual(lines.lines, "".join(chunks).split("\n"))
+        self.assertEqual(LazyLines(["single"]).get(0, 10), ["single"])
+
+    def test_pulls_only_what_is_needed(self):
+        pulled = []
+
+        def chunks():
+            for index in range(1000):
+                pulled.append(index)
+                yield f"line {index}\n"
+
+        lines = LazyLines(chunks())
+
+        self.assertEqual(lines.get(10, 12), ["line 10", "line 11"])
+        self.assertEqual(len(pulled), 12)
+        self.assertFalse(lines.exhausted)
+
+    def test_find(self):
+        lines = LazyLines(["Alpha\nbeta ALPHA\n", "gamma\n"])
+
+        self.assertEqual(lines.find("alpha"), (0, 0))
+        self.assertEqual(lines.find("alpha", 0, 1), (1, 5))
+        # Wraps around to the start
+        self.assertEqual(lines.find("alpha", 1, 6), (0, 0))
+        self.assertEqual(lines.find("gam"), (2, 0))
+        self.assertIsNone(lines.find("delta"))
+        self.assertIsNone(lines.find(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
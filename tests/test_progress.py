@@ -0,0 +1,92 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.util.batch_updater import apply_changes
+from src.util.backup_store import BackupStore
+from src.util.progress import Progress, Cancelled, format_progress
+
+GAME_XML = """<LaunchBox>
+  <Game>
+    <ID>{0}</ID>
+    <Title>Original</Title>
+  </Game>
+</LaunchBox>
+"""
+
+FILE_NAMES = ["Flash.xml", "Unity.xml", "HTML5.xml"]
+
+
+class TestProgress(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xml_dir = os.path.join(self.temp_dir, "Platforms")
+        os.mkdir(self.xml_dir)
+
+        self.contents = {}
+        for file_name in FILE_NAMES:
+            self.contents[file_name] = GAME_XML.format(file_name)
+            with open(os.path.join(self.xml_dir, file_name), "w", encoding="utf8") as file:
+                file.write(self.contents[file_name])
+
+        self.changes = {file_name: {"Title": "Changed"} for file_name in FILE_NAMES}
+        self.game_ids_by_file = {file_name: [file_name] for file_name in FILE_NAMES}
+        self.store = BackupStore(os.path.join(self.temp_dir, "backups"), 1024 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def apply(self, progress: Progress, workers: int = 1):
+        backup_run = self.store.start_run(self.xml_dir)
+        try:
+            return apply_changes(self.xml_dir, self.changes, self.game_ids_by_file, [], backup_run, os.path.join(self.temp_dir, "commit.json"), workers=workers, progress=progress)
+        finally:
+            backup_run.finish()
+
+    def assert_unchanged(self):
+        self.assertEqual(sorted(os.listdir(self.xml_dir)), sorted(FILE_NAMES))
+
+        for file_name in FILE_NAMES:
+            with open(os.path.join(self.xml_dir, file_name), encoding="utf8") as file:
+                self.assertEqual(file.read(), self.contents[file_name])
+
+    def test_reports_files_and_games(self):
+        snapshots = []
+        self.apply(Progress(snapshots.append, interval=0))
+
+        last = snapshots[-1]
+        self.assertEqual((last["files_done"], last["total_files"]), (3, 3))
+        self.assertEqual((last["games_done"], last["total_games"]), (3, 3))
+        self.assertEqual(last["bytes_done"], last["total_bytes"])
+        self.assertEqual(last["eta"], 0)
+        self.assertIn("3/3 files", format_progress(last))
+
+    def test_cancel_between_files(self):
+        progress = None
+
+        def cancel_after_first_file(snapshot: dict):
+            if snapshot["files_done"] == 1:
+                progress.cancel()
+
+        progress = Progress(cancel_after_first_file)
+
+        with self.assertRaises(Cancelled):
+            self.apply(progress)
+
+        self.assertEqual(progress.files_done, 1)
+        self.assert_unchanged()
+
+    def test_cancel_parallel(self):
+        progress = Progress()
+        progress.cancel()
+
+        with self.assertRaises(Cancelled):
+            self.apply(progress, workers=2)
+
+        self.assert_unchanged()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.util.xml_updater import ChangesParser, XmlUpdater
+from src.util.tree_cache import TreeCache, TREE_MEMORY_FACTOR
+from src.util.batch_updater import apply_changes
+from src.util.backup_store import BackupStore
+
+
+class TestTreeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xml_path = os.path.join(self.temp_dir, "Unity.xml")
+        shutil.copy("tests/sample_xml.xml", self.xml_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_take_and_put(self):
+        cache = TreeCache(1024 * 1024)
+        self.assertIsNone(cache.take(self.xml_path))
+
+        tree = XmlUpdater.parse_xml(self.xml_path)
+        cache.put(self.xml_path, tree)
+        self.assertEqual(cache.used_bytes, os.path.getsize(self.xml_path) * TREE_MEMORY_FACTOR)
+
+        self.assertIs(cache.take(self.xml_path), tree)
+        # Taken trees have to be put back
+        self.assertIsNone(cache.take(self.xml_path))
+        self.assertEqual(cache.used_bytes, 0)
+
+    def test_changed_file(self):
+        cache = TreeCache(1024 * 1024)
+        cache.put(self.xml_path, XmlUpdater.parse_xml(self.xml_path))
+
+        with open(self.xml_path, "a", encoding="utf8") as file:
+            file.write("\n")
+
+        self.assertIsNone(cache.take(self.xml_path))
+
+    def test_memory_budget(self):
+        other_path = os.path.join(self.temp_dir, "Flash.xml")
+        shutil.copy("tests/sample_xml.xml", other_path)
+
+        # Only room for one of them
+        cache = TreeCache(os.path.getsize(self.xml_path) * TREE_MEMORY_FACTOR)
+        cache.put(self.xml_path, XmlUpdater.parse_xml(self.xml_path))
+        cache.put(other_path, XmlUpdater.parse_xml(other_path))
+
+        self.assertIsNone(cache.take(self.xml_path))
+        self.assertIsNotNone(cache.take(other_path))
+
+    def test_pinned(self):
+        other_path = os.path.join(self.temp_dir, "Flash.xml")
+        shutil.copy("tests/sample_xml.xml", other_path)
+
+        # Too small for either of them
+        cache = TreeCache(os.path.getsize(self.xml_path))
+        cache.pin(self.xml_path)
+        cache.put(self.xml_path, XmlUpdater.parse_xml(self.xml_path))
+        cache.put(other_path, XmlUpdater.parse_xml(other_path))
+
+        self.assertEqual(list(cache.trees), [os.path.abspath(self.xml_path)])
+
+        cache.unpin_all()
+        self.assertEqual(cache.used_bytes, 0)
+
+    def test_reused_across_runs(self):
+        cache = TreeCache(1024 * 1024)
+        backup_store = BackupStore(os.path.join(self.temp_dir, "backups"), 1024 * 1024)
+
+        def run(changes_str: str):
+            changes = ChangesParser.parse_changes_str(changes_str)
+            backup_run = backup_store.start_run(self.temp_dir)
+            results = apply_changes(self.temp_dir, changes, {"Unity.xml": list(changes)}, [], backup_run, os.path.join(self.temp_dir, "commit.json"), tree_cache=cache)
+            backup_run.finish()
+            return results
+
+        run("GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90\nTitle: First\n")
+        run("GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90\nPublisher: Second\n")
+        self.assertEqual(cache.hits, 1)
+
+        # A failed game leaves the tree out of the cache, since it may not match the file anymore
+        results, _ = run("GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90\nNotWhitelisted: Third\n")
+        self.assertEqual(len(results[0].games_failed), 1)
+        self.assertEqual(len(cache.trees), 0)
+
+        with open(self.xml_path, "rb") as file:
+            written = file.read()
+
+        # Both runs were written on top of each other
+        self.assertIn(b"<Title>First</Title>", written)
+        self.assertIn(b"<Publisher>Second</Publisher>", written)
+        self.assertNotIn(b"Third", written)
+
+
+if __name__ == "__main__":
+    unittest.main()
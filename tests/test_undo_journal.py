@@ -0,0 +1,121 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.util.xml_updater import ChangesParser, XmlUpdater
+from src.util.batch_updater import apply_changes
+from src.util.backup_store import BackupStore
+from src.util.undo_journal import get_reverse_patch, find_element_spans
+
+CHANGES = """
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+Title: Undone Title
+Publisher: Undone Publisher
+Orange: Created element
+Additional Applications:
+  Extras: Created extra
+
+---
+
+GAME: d3d2fa4d-31d3-ee55-0df6-922f76c6efc0
+Title: Both Duplicates
+Additional Applications:
+  Message:
+    CommandLine: Changed message
+"""
+
+
+class TestUndoJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xml_path = os.path.join(self.temp_dir, "Unity.xml")
+        shutil.copy("tests/sample_xml.xml", self.xml_path)
+
+        with open(self.xml_path, "rb") as file:
+            self.original = file.read()
+
+        self.store = BackupStore(os.path.join(self.temp_dir, "backups"), 1024 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_changes(self, changes_str: str, minimal_rewrite: bool = True) -> str:
+        changes = ChangesParser.parse_changes_str(changes_str)
+
+        backup_run = self.store.start_run(self.temp_dir)
+        apply_changes(self.temp_dir, changes, {"Unity.xml": list(changes)}, ["Orange"], backup_run, os.path.join(self.temp_dir, "commit.json"), minimal_rewrite=minimal_rewrite)
+
+        return backup_run.finish()
+
+    def read_xml(self) -> bytes:
+        with open(self.xml_path, "rb") as file:
+            return file.read()
+
+    def test_journal(self):
+        updater = XmlUpdater()
+        changes = ChangesParser.parse_changes_str(CHANGES)
+        updater.get_updated_xml(changes, self.xml_path, ["Orange"])
+
+        game_id = "9aeb262e-5a55-48a4-8eb1-265925880b90"
+        self.assertEqual(updater.journal[0], ["set", "Game", game_id, "Title", "Rush Rush", "Undone Title"])
+        self.assertEqual(updater.journal[1], ["set", "Game", game_id, "Publisher", None, "Undone Publisher"])
+        self.assertEqual(updater.journal[2], ["create", "Game", game_id, "Orange", "Created element"])
+
+        # The children of a created additional application aren't journaled one by one
+        self.assertEqual(updater.journal[3][0], "create_app")
+        self.assertEqual(len([entry for entry in updater.journal if entry[0] == "create_app"]), 1)
+
+    def test_undo_restores_original(self):
+        for minimal_rewrite in (True, False):
+            run_id = self.run_changes(CHANGES, minimal_rewrite)
+            self.assertNotEqual(self.read_xml(), self.original)
+
+            self.assertEqual(self.store.undo(run_id), {})
+            self.assertEqual(self.read_xml(), self.original)
+
+    def test_undo_keeps_later_edits(self):
+        run_id = self.run_changes(CHANGES)
+
+        # Edited after the run: an unrelated game and one of the values the run changed
+        self.run_changes("GAME: ba3d2d72-6192-2925-3bae-2db312ffd4a8\nTitle: Later Edit\n---\nGAME: 9aeb262e-5a55-48a4-8eb1-265925880b90\nPublisher: Later Publisher\n")
+
+        conflicts = self.store.undo(run_id)
+        self.assertEqual(list(conflicts), ["Unity.xml"])
+        self.assertEqual(len(conflicts["Unity.xml"]), 1)
+        self.assertIn("Publisher", conflicts["Unity.xml"][0])
+
+        tree = XmlUpdater.parse_xml(self.xml_path)
+        titles = [game.findtext("Title") for game in tree.getroot().iter("Game")]
+
+        self.assertIn("Later Edit", titles)
+        self.assertIn("Rush Rush", titles)
+        self.assertNotIn("Undone Title", titles)
+        self.assertNotIn("Both Duplicates", titles)
+        self.assertIsNone(tree.getroot().find("Game/Orange"))
+        self.assertEqual(tree.getroot().find("Game").findtext("Publisher"), "Later Publisher")
+        self.assertEqual(len(tree.getroot().findall("AdditionalApplication")), self.original.count(b"<AdditionalApplication>"))
+
+    def test_find_element_spans(self):
+        spans = find_element_spans(self.original, "Game", "d3d2fa4d-31d3-ee55-0df6-922f76c6efc0")
+
+        self.assertEqual(len(spans), 2)
+        for start, end in spans:
+            self.assertTrue(self.original[start:end].startswith(b"<Game>"))
+            self.assertTrue(self.original[start:end].endswith(b"</Game>"))
+
+        # <GameID> inside of an additional application isn't mistaken for a <Game>
+        (start, end), = find_element_spans(self.original, "Game", "af0a8e8b-a08b-2d56-f598-8b150ad48fc1")
+        self.assertTrue(self.original[start:end].startswith(b"<Game>"))
+        self.assertNotIn(b"<AdditionalApplication>", self.original[start:end])
+
+    def test_nothing_to_undo(self):
+        patched, conflicts = get_reverse_patch(self.original, [["set", "Game", "missing", "Title", "Old", "New"]])
+
+        self.assertEqual(patched, self.original)
+        self.assertEqual(len(conflicts), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from src.util.xml_updater import ChangesParser, XmlUpdater
+from src.util.xml_diff import diff_updater, render_diffs
+
+CHANGES = """
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+Title: Changed Title
+Publisher: Someone
+Notes: null
+Orange: Created element
+Additional Applications:
+  Extras: Created extra
+
+---
+
+GAME: 25a91b3a-a9e1-db58-9e97-75c33bbe25fa
+Title: Changed Too
+"""
+
+
+class TestXmlDiff(unittest.TestCase):
+
+    def get_diffs(self, changes_str: str):
+        updater = XmlUpdater()
+        changes = ChangesParser.parse_changes_str(changes_str)
+        updater.get_updated_xml(changes, "tests/sample_xml.xml", ["Orange"])
+
+        return diff_updater(updater)
+
+    def test_field_diff(self):
+        diffs = self.get_diffs(CHANGES)
+
+        self.assertEqual([diff.tag for diff in diffs], ["Game", "AdditionalApplication", "Game"])
+
+        game = diffs[0]
+        self.assertEqual(game.element_id, "9aeb262e-5a55-48a4-8eb1-265925880b90")
+        self.assertEqual(game.name, "Changed Title")
+        self.assertFalse(game.created)
+        # Notes was already empty, so it isn't a change
+        self.assertEqual(game.fields, [
+            ("Title", "Rush Rush", "Changed Title"),
+            ("Publisher", "", "Someone"),
+            ("Orange", None, "Created element")
+        ])
+
+        app = diffs[1]
+        self.assertTrue(app.created)
+        self.assertEqual(app.game_id, "9aeb262e-5a55-48a4-8eb1-265925880b90")
+        self.assertEqual(app.name, "Extras")
+        self.assertIn(("CommandLine", None, "Created extra"), app.fields)
+
+    def test_unchanged_values(self):
+        self.assertEqual(self.get_diffs("GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90\nTitle: Rush Rush\n"), [])
+
+    def test_render(self):
+        rendered = render_diffs(self.get_diffs(CHANGES))
+
+        self.assertIn("9aeb262e-5a55-48a4-8eb1-265925880b90 \"Changed Title\"", rendered)
+        self.assertIn("\"Title\": \"Rush Rush\" -> \"Changed Title\"", rendered)
+        self.assertIn("\"Orange\": (missing) -> \"Created element\"", rendered)
+        self.assertIn("Additional application \"Extras\" (created)", rendered)
+
+
+if __name__ == "__main__":
+    unittest.main()
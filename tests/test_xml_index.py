@@ -0,0 +1,99 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.util.xml_index import XmlIndex
+from src.util.xml_updater import ChangesParser
+from src.util.runner import ChangesRunner
+from src.util.settings import DEFAULT_SETTINGS
+
+
+class TestXmlIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xml_dir = os.path.join(self.temp_dir, "platforms")
+        os.mkdir(self.xml_dir)
+
+        shutil.copy("tests/sample_xml.xml", os.path.join(self.xml_dir, "Unity.xml"))
+        with open(os.path.join(self.xml_dir, "Flash.xml"), "w", encoding="utf8") as file:
+            file.write("<LaunchBox><Game><ID>flash-game</ID></Game></LaunchBox>")
+
+        self.index_path = os.path.join(self.temp_dir, "xml_index.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_scan_file(self):
+        game_ids = XmlIndex.scan_file("tests/sample_xml.xml")
+
+        self.assertEqual(len(game_ids), 7)
+        self.assertIn("9aeb262e-5a55-48a4-8eb1-265925880b90", game_ids)
+        # Additional applications aren't games
+        self.assertNotIn("7172bd63-2cf2-4d6b-aeac-9128706c4c67", game_ids)
+
+    def test_locate(self):
+        index = XmlIndex(self.index_path)
+        self.assertTrue(index.refresh(self.xml_dir))
+
+        located, missing = index.locate(["flash-game", "9aeb262e-5a55-48a4-8eb1-265925880b90", "unknown"])
+        self.assertEqual(located, {"Flash.xml": ["flash-game"], "Unity.xml": ["9aeb262e-5a55-48a4-8eb1-265925880b90"]})
+        self.assertEqual(missing, ["unknown"])
+
+    def test_incremental_refresh(self):
+        index = XmlIndex(self.index_path)
+        index.refresh(self.xml_dir)
+
+        # A second index loaded from disk shouldn't need to rescan anything
+        index = XmlIndex(self.index_path)
+        self.assertFalse(index.refresh(self.xml_dir))
+        self.assertEqual(index.games["flash-game"], "Flash.xml")
+
+        flash_path = os.path.join(self.xml_dir, "Flash.xml")
+        with open(flash_path, "w", encoding="utf8") as file:
+            file.write("<LaunchBox><Game><ID>new-flash-game</ID></Game></LaunchBox>")
+        os.utime(flash_path, ns=(1, 1))
+
+        self.assertTrue(index.refresh(self.xml_dir))
+        self.assertNotIn("flash-game", index.games)
+        self.assertEqual(index.games["new-flash-game"], "Flash.xml")
+
+        os.remove(flash_path)
+        self.assertTrue(index.refresh(self.xml_dir))
+        self.assertNotIn("new-flash-game", index.games)
+
+    def test_written_files_arent_rescanned(self):
+        data_dir = os.path.join(self.temp_dir, "data")
+        os.mkdir(data_dir)
+        runner = ChangesRunner(DEFAULT_SETTINGS, [], data_dir)
+        changes = ChangesParser.parse_changes_str("GAME: flash-game\nTitle: Changed\n")
+
+        runner.run(self.xml_dir, changes)
+        self.assertFalse(runner.xml_index.refresh(self.xml_dir))
+
+        # Unless the index wasn't up to date with the file before it was written
+        flash_path = os.path.join(self.xml_dir, "Flash.xml")
+        with open(flash_path, "w", encoding="utf8") as file:
+            file.write("<LaunchBox><Game><ID>flash-game</ID></Game><Game><ID>new-flash-game</ID></Game></LaunchBox>")
+        os.utime(flash_path, ns=(1, 1))
+
+        runner.apply(self.xml_dir, changes, {"Flash.xml": ["flash-game"]})
+        self.assertTrue(runner.xml_index.refresh(self.xml_dir))
+        self.assertEqual(runner.xml_index.games["new-flash-game"], "Flash.xml")
+
+    def test_unindexable_file(self):
+        with open(os.path.join(self.xml_dir, "Broken.xml"), "w", encoding="utf8") as file:
+            file.write("<LaunchBox><Game>")
+
+        index = XmlIndex(self.index_path)
+        index.refresh(self.xml_dir)
+
+        # Unknown games might be inside the broken file, so they can't be reported as missing
+        located, missing = index.locate(["unknown"])
+        self.assertEqual(located, {"Broken.xml": ["unknown"]})
+        self.assertEqual(missing, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
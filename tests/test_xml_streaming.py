@@ -0,0 +1,146 @@
+import unittest
+import io
+import os
+import tempfile
+
+from src.util.xml_updater import ChangesParser, XmlUpdater
+from src.util.xml_streaming import StreamingXmlUpdater
+from src.util.xml_diff import diff_updater, render_diffs
+
+CHANGES = """
+GAME: 25a91b3a-a9e1-db58-9e97-75c33bbe25fa
+Title: Changed Title
+Genre: [Coloring, RPG]
+NewElement: created
+
+---
+
+GAME: d3d2fa4d-31d3-ee55-0df6-922f76c6efc0
+Broken: Yes
+Additional Applications:
+  Extras:
+    Id: static uuid extras
+    CommandLine: changed extras
+  Version 2:
+    Command Line: launchv3
+  Message: changed with a string
+  New Alternate:
+    Id: static uuid alternate
+    Application Path: FPSoftware\\\\Flash\\\\flashplayer_32_sa.exe
+    Launch Command: http://example.com/game.swf
+
+---
+
+GAME: 9aeb262e-5a55-48a4-8eb1-265925880b90
+MissingElement: not whitelisted
+"""
+
+# Gets a random ID, so it can only be checked separately
+CREATED_EXTRAS = """
+---
+
+GAME: ba3d2d72-6192-2925-3bae-2db312ffd4a8
+Additional Applications:
+  Extras: a new extra
+"""
+
+
+# An additional application before its game, and a game without an ID
+UNORDERED_XML = b"""<LaunchBox>
+  <AdditionalApplication>
+    <Id>app-id</Id>
+    <GameID>game-id</GameID>
+    <Name>Extras</Name>
+    <CommandLine>old</CommandLine>
+  </AdditionalApplication>
+  <Game>
+    <Title>No ID</Title>
+  </Game>
+  <Game>
+    <ID>game-id</ID>
+    <Title>Game</Title>
+  </Game>
+</LaunchBox>
+"""
+
+
+class TestStreamingXmlUpdater(unittest.TestCase):
+
+    def get_tree_output(self, changes: dict):
+        updated_xml, games_changed, games_failed = XmlUpdater().get_updated_xml(changes, "tests/sample_xml.xml", ["NewElement"])
+
+        output = io.BytesIO()
+        updated_xml.write(output, encoding="utf8", pretty_print=True)
+        return output.getvalue(), games_changed, games_failed
+
+    def get_streamed_output(self, changes: dict):
+        output = io.BytesIO()
+        games_changed, games_failed = StreamingXmlUpdater().write_updated_xml(changes, "tests/sample_xml.xml", output, ["NewElement"])
+        return output.getvalue(), games_changed, games_failed
+
+    def test_matches_tree_output(self):
+        tree_output, tree_changed, tree_failed = self.get_tree_output(ChangesParser.parse_changes_str(CHANGES))
+        streamed_output, streamed_changed, streamed_failed = self.get_streamed_output(ChangesParser.parse_changes_str(CHANGES))
+
+        self.assertEqual(streamed_output, tree_output)
+        self.assertEqual(streamed_changed, tree_changed)
+        self.assertEqual(streamed_failed.keys(), tree_failed.keys())
+        self.assertIsInstance(streamed_failed["9aeb262e-5a55-48a4-8eb1-265925880b90"], XmlUpdater.MissingElement)
+
+    def test_created_additional_apps(self):
+        changes = ChangesParser.parse_changes_str(CHANGES + CREATED_EXTRAS)
+        streamed_output, games_changed, _ = self.get_streamed_output(changes)
+
+        self.assertIn("ba3d2d72-6192-2925-3bae-2db312ffd4a8", games_changed)
+        self.assertIn(b"<Name>New Alternate</Name>", streamed_output)
+        self.assertIn(b"<CommandLine>a new extra</CommandLine>", streamed_output)
+        self.assertTrue(streamed_output.endswith(b"  </AdditionalApplication>\n</LaunchBox>\n"))
+
+    def test_frees_unchanged_elements(self):
+        changes = ChangesParser.parse_changes_str(CHANGES)
+        tree_updater = XmlUpdater()
+        tree_updater.get_updated_xml(changes, "tests/sample_xml.xml", ["NewElement"])
+
+        streaming_updater = StreamingXmlUpdater()
+        streaming_updater.write_updated_xml(changes, "tests/sample_xml.xml", io.BytesIO(), ["NewElement"])
+
+        # Changed elements are diffed as they're written, and then cleared like the others. Changes to existing
+        # additional applications are made later while streaming, so the order is different.
+        def rendered(diffs):
+            return sorted(render_diffs([diff]) for diff in diffs)
+
+        self.assertEqual(rendered(streaming_updater.diffs), rendered(diff_updater(tree_updater)))
+        self.assertEqual(streaming_updater.modified_elements, {})
+        self.assertEqual(streaming_updater.original_elements, {})
+
+    def test_app_before_its_game(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            xml_path = os.path.join(temp_dir, "Unordered.xml")
+            with open(xml_path, "wb") as file:
+                file.write(UNORDERED_XML)
+
+            changes = ChangesParser.parse_changes_str("GAME: game-id\nTitle: Changed\nAdditional Applications:\n  Extras: new")
+            _, tree_changed, _ = XmlUpdater().get_updated_xml(changes, xml_path, [])
+
+            output = io.BytesIO()
+            games_changed, games_failed = StreamingXmlUpdater().write_updated_xml(changes, xml_path, output, [])
+
+        # The tree can change the application, streaming has already written it
+        self.assertEqual(tree_changed, {"game-id"})
+        self.assertEqual(games_changed, set())
+        self.assertIsInstance(games_failed["game-id"], StreamingXmlUpdater.AppAlreadyWritten)
+        self.assertIn(b"<CommandLine>old</CommandLine>", output.getvalue())
+        # The game without an ID was skipped instead of failing the file
+        self.assertIn(b"<Title>No ID</Title>", output.getvalue())
+
+    def test_unchanged_file(self):
+        tree_output, _, _ = self.get_tree_output({})
+        streamed_output, games_changed, games_failed = self.get_streamed_output({})
+
+        self.assertEqual(streamed_output, tree_output)
+        self.assertEqual(len(games_changed), 0)
+        self.assertEqual(len(games_failed), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
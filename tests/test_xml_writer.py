@@ -0,0 +1,118 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+
+from lxml import etree as ET
+
+from src.util.xml_updater import ChangesParser, XmlUpdater
+from src.util.xml_writer import get_minimal_rewrite, write_minimal, locate_modified, locate_all
+
+CHANGES = """
+GAME: 25a91b3a-a9e1-db58-9e97-75c33bbe25fa
+Title: Changed Title
+NewElement: created
+
+---
+
+GAME: d3d2fa4d-31d3-ee55-0df6-922f76c6efc0
+Additional Applications:
+  Extras: changed extras
+  New Alternate:
+    Id: static uuid alternate
+    Application Path: FPSoftware\\\\Flash\\\\flashplayer_32_sa.exe
+    Launch Command: http://example.com/game.swf
+"""
+
+
+def update(data: bytes):
+    tree = ET.ElementTree(ET.fromstring(data, ET.XMLParser(remove_blank_text=True)))
+    updater = XmlUpdater()
+    updater.update_tree(ChangesParser.parse_changes_str(CHANGES), tree, ["NewElement"])
+
+    return tree, updater
+
+
+class TestXmlWriter(unittest.TestCase):
+
+    def setUp(self):
+        with open("tests/sample_xml.xml", "rb") as file:
+            self.sample = file.read()
+
+    def test_matches_full_write(self):
+        # The sample is already formatted the way lxml pretty prints it
+        tree, updater = update(self.sample)
+        patched = get_minimal_rewrite(tree, self.sample, updater.modified_elements, updater.created_elements)
+
+        full = io.BytesIO()
+        tree.write(full, encoding="utf8", pretty_print=True)
+        self.assertEqual(patched, full.getvalue())
+
+    def test_untouched_content_is_kept(self):
+        # Formatting lxml would change when writing the whole file
+        original = self.sample.replace(b"<Series/>", b"<Series></Series>").replace(b"\n", b"\r\n")
+
+        tree, updater = update(original)
+        patched = get_minimal_rewrite(tree, original, updater.modified_elements, updater.created_elements)
+
+        # The first game wasn't changed, so it's exactly the same
+        first_game_end = original.index(b"</Game>") + len(b"</Game>")
+        self.assertEqual(patched[:first_game_end], original[:first_game_end])
+        self.assertNotIn(b"\n", patched.replace(b"\r\n", b""))
+
+        self.assertIn(b"<Title>Changed Title</Title>\r\n", patched)
+        self.assertIn(b"<Name>New Alternate</Name>", patched)
+        self.assertTrue(patched.endswith(b"  </AdditionalApplication>\r\n</LaunchBox>\r\n"))
+
+        # Only the changed elements differ
+        self.assertEqual(ET.tostring(ET.fromstring(patched, ET.XMLParser(remove_blank_text=True))), ET.tostring(tree.getroot()))
+
+    def test_only_searches_up_to_the_last_change(self):
+        tree, updater = update(self.sample)
+        root = tree.getroot()
+        modified = {element: None for element in updater.modified_elements if element not in updater.created_elements}
+
+        patches = locate_modified(root, self.sample, modified, set(updater.created_elements))
+        self.assertEqual(sorted(patches, key=lambda patch: patch[0]), locate_all(root, self.sample, modified, set(updater.created_elements)))
+
+        # Whatever comes after the last changed element isn't looked at
+        last_end = max(end for _, end, _ in patches)
+        truncated = self.sample[:last_end]
+        self.assertEqual(locate_modified(root, truncated, modified, set(updater.created_elements)), patches)
+
+    def test_start_tags_with_attributes(self):
+        # Start tags with attributes aren't counted when searching up to the last change, so the file is matched the slow way
+        original = self.sample.replace(b"<Game>", b'<Game foo="bar">', 1)
+
+        tree, updater = update(original)
+        modified = {element: None for element in updater.modified_elements if element not in updater.created_elements}
+        self.assertIsNone(locate_modified(tree.getroot(), original, modified, set(updater.created_elements)))
+
+        patched = get_minimal_rewrite(tree, original, updater.modified_elements, updater.created_elements)
+        self.assertIn(b'<Game foo="bar">', patched)
+        self.assertIn(b"<Title>Changed Title</Title>", patched)
+
+    def test_falls_back_when_file_does_not_line_up(self):
+        # A game inside of a comment can't be told apart from a real one without parsing
+        original = self.sample.replace(b"<LaunchBox>", b"<LaunchBox>\n  <!-- <Game><ID>commented</ID></Game> -->", 1)
+
+        tree, updater = update(original)
+        self.assertIsNone(get_minimal_rewrite(tree, original, updater.modified_elements, updater.created_elements))
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(temp_dir, "Unity.xml")
+            with open(file_path, "wb") as file:
+                file.write(original)
+
+            self.assertFalse(write_minimal(tree, file_path, updater.modified_elements, updater.created_elements))
+
+            with open(file_path, "rb") as file:
+                self.assertIn(b"<Title>Changed Title</Title>", file.read())
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()